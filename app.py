@@ -12,11 +12,10 @@ Interface web com Flask para:
 - Dashboard com estatísticas
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, Response
 import json
 import os
 import time
-import requests
 import webbrowser
 import threading
 from datetime import datetime, timedelta
@@ -27,6 +26,7 @@ from config import Config
 from settings_manager import settings_manager
 from environment_manager import environment_manager
 from backup_manager import perform_backup, start_periodic_backups
+from sync_worker import enqueue_sync, stream_sync_job_events
 
 app = Flask(__name__)
 app.secret_key = Config.FLASK_SECRET_KEY
@@ -147,7 +147,7 @@ def index():
 
 @app.route('/sync', methods=['POST'])
 def sync_account():
-    """Sincroniza dados com Meu Pluggy com atualização forçada"""
+    """Enfileira a sincronização de todas as conexões (acompanhar em /api/sync_jobs/<job_id>)"""
     try:
         # Validação das configurações obrigatórias
         config_valid, missing_fields = settings_manager.validate_required_settings()
@@ -158,29 +158,20 @@ def sync_account():
                 'redirect': '/settings'
             })
         
-        finance_app = FinanceApp()
-        
         # Verifica se já tem conexão OAuth
         if oauth_manager.has_valid_connection():
-            print("🚀 Iniciando sincronização com atualização forçada...")
+            print("🚀 Enfileirando sincronização com atualização forçada...")
             
-            # Sincronização completa com atualização forçada
-            success, message = finance_app.sync_existing_connection()
-            
-            if success:
-                # Reconciliar categorias após sincronização completa
-                new_cats = db.reconcile_category_mappings()
-                notice = ''
-                if new_cats:
-                    notice = f" - {len(new_cats)} novas categorias aguardam classificação (De-Para)"
-                flash(message + notice, 'success')
-                return jsonify({
-                    'success': True, 
-                    'message': f'✅ {message}{notice}'
-                })
-            else:
-                flash(f'Erro na sincronização: {message}', 'error')
-                return jsonify({'success': False, 'message': message})
+            # Sincronização completa executada pelo sync_worker, fora desta requisição
+            job_id, attached = enqueue_sync('all')
+            if not job_id:
+                return jsonify({'success': False, 'message': 'Erro ao enfileirar sincronização'})
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'attached': attached,
+                'message': 'Sincronização já em andamento' if attached else 'Sincronização iniciada'
+            }), 202
         else:
             # Precisa fazer OAuth primeiro
             return jsonify({
@@ -212,7 +203,7 @@ def start_oauth():
             return jsonify({'success': False, 'message': 'Erro na autenticação'})
         
         # Cria item OAuth
-        response = requests.post(
+        response = finance_app.api_request('POST',
             f"{finance_app.base_url}/items",
             headers={"Content-Type": "application/json", "X-API-KEY": finance_app.api_key},
             json={"connectorId": 200, "parameters": {}}
@@ -229,7 +220,7 @@ def start_oauth():
         for attempt in range(10):
             time.sleep(2)
             
-            status_response = requests.get(
+            status_response = finance_app.api_request('GET',
                 f"{finance_app.base_url}/items/{item_id}",
                 headers={"X-API-KEY": finance_app.api_key}
             )
@@ -271,50 +262,45 @@ def reset_oauth():
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro ao resetar OAuth: {e}'})
 
+def _parse_transaction_filters():
+    """Lê da query string os filtros da tela de transações (usado pela página e pela API)"""
+    # Suporte a múltiplas descrições: pode vir como parâmetro repetido description_filter=desc1&description_filter=desc2
+    description_filter_raw = request.args.getlist('description_filter')
+    if len(description_filter_raw) <= 1:
+        # Também suportar caso venha como string única separada por ; ou ,
+        single_val = description_filter_raw[0] if description_filter_raw else request.args.get('description_filter', '')
+        if single_val and (',' in single_val or ';' in single_val):
+            description_filter = [v.strip() for v in single_val.replace(';', ',').split(',') if v.strip()]
+        else:
+            description_filter = single_val.strip() or None
+    else:
+        description_filter = [v.strip() for v in description_filter_raw if v and v.strip()]
+
+    return {
+        'account_id': request.args.getlist('account_id') or None,  # Lista de IDs
+        'start_date': request.args.get('start_date'),
+        'end_date': request.args.get('end_date'),
+        'category': request.args.get('category'),  # Manter por compatibilidade
+        'user_category': request.args.getlist('user_category') or None,  # Lista de categorias
+        'user_subcategory': request.args.getlist('user_subcategory') or None,  # Lista de subcategorias
+        'modification_start_date': request.args.get('modification_start_date'),
+        'modification_end_date': request.args.get('modification_end_date'),
+        'verification_filter': request.args.getlist('verification_filter') or None,  # Lista de status
+        'type_filter': request.args.getlist('type_filter') or None,  # Lista de tipos de transação
+        'description_filter': description_filter,
+    }
+
 @app.route('/transactions')
 def transactions():
-    """Página de transações com filtros e informações de conexão"""
+    """Página de transações com filtros e informações de conexão (primeira página; demais via /api/transactions)"""
     try:
-        # Parâmetros de filtro - suporte a valores múltiplos
-        account_id = request.args.getlist('account_id')  # Lista de IDs
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        category = request.args.get('category')  # Manter por compatibilidade
-        user_category = request.args.getlist('user_category')  # Lista de categorias
-        user_subcategory = request.args.getlist('user_subcategory')  # Lista de subcategorias
-        modification_start_date = request.args.get('modification_start_date')
-        modification_end_date = request.args.get('modification_end_date')
-        verification_filter = request.args.getlist('verification_filter')  # Lista de status
-        type_filter = request.args.getlist('type_filter')  # Lista de tipos de transação
+        query_filters = _parse_transaction_filters()
         limit = int(request.args.get('limit', 100))
-        # Suporte a múltiplas descrições: pode vir como parâmetro repetido description_filter=desc1&description_filter=desc2
-        description_filter_raw = request.args.getlist('description_filter')
-        if len(description_filter_raw) <= 1:
-            # Também suportar caso venha como string única separada por ; ou ,
-            single_val = description_filter_raw[0] if description_filter_raw else request.args.get('description_filter', '')
-            if single_val and (',' in single_val or ';' in single_val):
-                description_filter = [v.strip() for v in single_val.replace(';', ',').split(',') if v.strip()]
-            else:
-                description_filter = single_val.strip() or None
-        else:
-            description_filter = [v.strip() for v in description_filter_raw if v and v.strip()]
-
-        # Busca transações com informações de conexão
-        transactions_list = db.get_transactions_with_connection_info(
-            limit=limit,
-            account_id=account_id if account_id else None,
-            connection_id=None,
-            start_date=start_date,
-            end_date=end_date,
-            category=category,
-            user_category=user_category if user_category else None,
-            user_subcategory=user_subcategory if user_subcategory else None,
-            modification_start_date=modification_start_date,
-            modification_end_date=modification_end_date,
-            verification_filter=verification_filter if verification_filter else None,
-            type_filter=type_filter if type_filter else None,
-            description_filter=description_filter
-        )
+        sort = request.args.get('sort', 'date')
+        direction = request.args.get('direction', 'desc')
+
+        # Primeira página (keyset); as próximas são carregadas sob demanda pelo template
+        page = db.get_transactions_page(page_size=limit, sort=sort, direction=direction, **query_filters)
 
         # Dados auxiliares para filtros e exibição
         accounts = db.get_accounts_summary()
@@ -326,14 +312,17 @@ def transactions():
         user_categories_list = list(set([cat['name'] for cat in all_user_categories if cat['name']]))
         user_subcategories_list = list(set([cat['subcategory'] for cat in all_user_categories if cat['subcategory']]))
 
-        # Estatísticas gerais e nomes dos usuários para divisão
-        all_transactions = db.get_transactions_with_connection_info(limit=10000)
+        # Estatísticas gerais (agregadas no banco) e nomes dos usuários para divisão
+        transaction_counters = db.get_transaction_counters()
         division_names = db.get_division_user_names()
 
         return render_template(
             'transactions.html',
-            transactions=transactions_list,
-            all_transactions=all_transactions,
+            transactions=page['transactions'],
+            next_cursor=page['next_cursor'],
+            sort=page['sort'],
+            direction=page['direction'],
+            transaction_counters=transaction_counters,
             accounts=accounts,
             connections=connections,
             categories=categories,
@@ -341,19 +330,19 @@ def transactions():
             user_subcategories=user_subcategories_list,
             division_names=division_names,
             filters={
-                'account_id': account_id,
+                'account_id': query_filters['account_id'] or [],
                 'connection_id': None,
-                'start_date': start_date,
-                'end_date': end_date,
-                'category': category,
-                'user_category': user_category,
-                'user_subcategory': user_subcategory,
-                'modification_start_date': modification_start_date,
-                'modification_end_date': modification_end_date,
-                'verification_filter': verification_filter,
-                'type_filter': type_filter,
+                'start_date': query_filters['start_date'],
+                'end_date': query_filters['end_date'],
+                'category': query_filters['category'],
+                'user_category': query_filters['user_category'] or [],
+                'user_subcategory': query_filters['user_subcategory'] or [],
+                'modification_start_date': query_filters['modification_start_date'],
+                'modification_end_date': query_filters['modification_end_date'],
+                'verification_filter': query_filters['verification_filter'] or [],
+                'type_filter': query_filters['type_filter'] or [],
                 'limit': limit,
-                'description_filter': description_filter,
+                'description_filter': query_filters['description_filter'],
             },
         )
     except Exception as e:
@@ -366,6 +355,50 @@ def transactions():
             filters={},
         )
 
+@app.route('/api/transactions')
+def api_transactions():
+    """Página de transações com cursor (keyset), ordenação no servidor e os mesmos filtros da tela.
+
+    Parâmetros: cursor, limit, sort, direction e format=html (inclui as linhas já renderizadas).
+    """
+    try:
+        page = db.get_transactions_page(
+            page_size=int(request.args.get('limit', 100)),
+            cursor=request.args.get('cursor'),
+            sort=request.args.get('sort', 'date'),
+            direction=request.args.get('direction', 'desc'),
+            **_parse_transaction_filters()
+        )
+        response = {
+            'success': True,
+            'transactions': page['transactions'],
+            'next_cursor': page['next_cursor'],
+            'has_more': page['has_more'],
+            'sort': page['sort'],
+            'direction': page['direction'],
+        }
+        if request.args.get('format') == 'html':
+            response['html'] = render_template(
+                '_transaction_rows.html',
+                transactions=page['transactions'],
+                division_names=db.get_division_user_names(),
+            )
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro ao carregar transações: {e}'}), 500
+
+@app.route('/api/transactions/descriptions')
+def api_transaction_descriptions():
+    """Sugestões do filtro de descrição (?q=termo&limit=20), servidas pelo índice FTS"""
+    try:
+        descriptions = db.search_descriptions(
+            request.args.get('q', ''),
+            limit=int(request.args.get('limit', 20))
+        )
+        return jsonify({'success': True, 'descriptions': descriptions})
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro ao buscar descrições: {e}'}), 500
+
 @app.route('/transactions/<transaction_id>/split', methods=['POST'])
 def update_transaction_split(transaction_id):
     """Atualiza percentuais de divisão da transação via AJAX (JSON)."""
@@ -633,20 +666,8 @@ def rename_account(account_id):
         if new_name == '':
             # Permitir limpar (remove custom_name)
             new_name = None
-        import sqlite3
-        conn = sqlite3.connect(db.db_path)
-        cur = conn.cursor()
-        # Garante coluna
-        try:
-            cur.execute('ALTER TABLE accounts ADD COLUMN custom_name TEXT')
-        except Exception:
-            pass
-        if new_name is None:
-            cur.execute('UPDATE accounts SET custom_name = NULL, modification_date = ? WHERE id = ?', (datetime.now().isoformat(), account_id))
-        else:
-            cur.execute('UPDATE accounts SET custom_name = ?, modification_date = ? WHERE id = ?', (new_name, datetime.now().isoformat(), account_id))
-        conn.commit()
-        conn.close()
+        if not db.update_account_custom_name(account_id, new_name):
+            return jsonify({'success': False, 'message': 'Erro ao atualizar nome'})
         return jsonify({'success': True, 'message': 'Nome personalizado atualizado', 'custom_name': new_name})
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro ao atualizar nome: {e}'})
@@ -800,6 +821,34 @@ def api_statistics():
     except Exception as e:
         return jsonify({'error': str(e)})
 
+@app.route('/api/cache_stats')
+def api_cache_stats():
+    """Contadores do cache de leitura do banco (hits/misses)"""
+    try:
+        return jsonify({'success': True, **db.get_cache_stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/api/sync_jobs/<job_id>')
+def api_sync_job(job_id):
+    """Progresso de um job de sincronização: status, fase, páginas, linhas gravadas e tempos"""
+    job = db.get_sync_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job de sincronização não encontrado'}), 404
+    return jsonify({'success': True, **job})
+
+@app.route('/api/sync/stream')
+def api_sync_stream():
+    """Stream SSE do progresso de um job (?job_id=...; padrão: o job mais recente)"""
+    job_id = request.args.get('job_id') or db.get_latest_sync_job_id()
+    if not job_id:
+        return jsonify({'success': False, 'message': 'Nenhum job de sincronização encontrado'}), 404
+    return Response(
+        stream_sync_job_events(job_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/sync_status')
 def api_sync_status():
     """API para verificar status da última sincronização"""
@@ -898,56 +947,27 @@ def remove_connection(item_id):
         connection_info = oauth_manager.get_connection_info(item_id)
         bank_name = connection_info.get('bank_name', 'Conexão') if connection_info else 'Conexão'
         
-        # Remove a conexão OAuth
-        success = oauth_manager.remove_connection(item_id)
+        # Remove a conexão OAuth (e, se pedido, contas e transações dela pelo connection_id)
+        removed = oauth_manager.remove_connection(item_id, remove_data=remove_data)
         
-        if success and remove_data:
-            # Remove também contas e transações associadas a esta conexão específica
-            try:
-                import sqlite3
-                conn = sqlite3.connect('data/finance_app.db')
-                cursor = conn.cursor()
-                
-                # Conta quantos registros serão removidos antes (usando connection_name)
-                cursor.execute('SELECT COUNT(*) FROM transactions WHERE connection_name = ?', (bank_name,))
-                transactions_count = cursor.fetchone()[0]
-                
-                cursor.execute('SELECT COUNT(*) FROM accounts WHERE connection_name = ?', (bank_name,))
-                accounts_count = cursor.fetchone()[0]
-                
-                # Remove transações apenas desta conexão específica
-                cursor.execute('DELETE FROM transactions WHERE connection_name = ?', (bank_name,))
-                transactions_removed = cursor.rowcount
-                
-                # Remove contas apenas desta conexão específica  
-                cursor.execute('DELETE FROM accounts WHERE connection_name = ?', (bank_name,))
-                accounts_removed = cursor.rowcount
-                
-                conn.commit()
-                conn.close()
-                
-                if accounts_removed > 0 or transactions_removed > 0:
-                    return jsonify({
-                        'success': True, 
-                        'message': f'{accounts_removed} contas e {transactions_removed} transações da conexão "{bank_name}" foram removidas permanentemente.'
-                    })
-                else:
-                    return jsonify({
-                        'success': True, 
-                        'message': f'Conexão "{bank_name}" removida. Nenhum dado financeiro foi encontrado para esta conexão.'
-                    })
-            except Exception as e:
+        if removed is None:
+            return jsonify({'success': False, 'message': f'Conexão "{bank_name}" não encontrada'})
+        if remove_data:
+            accounts_removed = removed['accounts_removed']
+            transactions_removed = removed['transactions_removed']
+            if accounts_removed > 0 or transactions_removed > 0:
                 return jsonify({
                     'success': True, 
-                    'message': f'Conexão "{bank_name}" removida, mas erro ao remover dados: {e}'
+                    'message': f'{accounts_removed} contas e {transactions_removed} transações da conexão "{bank_name}" foram removidas permanentemente.'
                 })
-        elif success:
             return jsonify({
                 'success': True, 
-                'message': f'Conexão "{bank_name}" removida com sucesso. Dados financeiros foram mantidos no histórico.'
+                'message': f'Conexão "{bank_name}" removida. Nenhum dado financeiro foi encontrado para esta conexão.'
             })
-        else:
-            return jsonify({'success': False, 'message': f'Conexão "{bank_name}" não encontrada'})
+        return jsonify({
+            'success': True, 
+            'message': f'Conexão "{bank_name}" removida com sucesso. Dados financeiros foram mantidos no histórico.'
+        })
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro: {e}'})
 
@@ -969,66 +989,81 @@ def update_connection_name(item_id):
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro: {e}'})
 
+def _oauth_status_response(item_id, item_status, connections):
+    """Traduz o status do item na Pluggy (FinanceApp.get_items_status) na resposta de verificação do OAuth"""
+    if item_status.get('error'):
+        return {'success': False, 'message': 'Erro ao verificar status'}
+
+    status = item_status.get('status')
+    if status in ['CONNECTED', 'UPDATED']:
+        connection_info = connections.get(item_id)
+        # Só grava quando muda: a verificação é repetida a cada poucos segundos pelas páginas
+        if connection_info and connection_info.get('status') != 'active':
+            oauth_manager.update_status(item_id, 'active')
+        bank_name = connection_info.get('bank_name', 'Conta') if connection_info else 'Conta'
+        return {
+            'success': True,
+            'status': 'completed',
+            'message': f'✅ {bank_name} conectado com sucesso!'
+        }
+    elif status in ['WAITING_USER_INPUT', 'LOGIN_IN_PROGRESS', 'UPDATING']:
+        return {
+            'success': True,
+            'status': 'pending',
+            'message': 'Aguardando autorização do usuário...'
+        }
+    elif status in ['LOGIN_ERROR', 'OUTDATED']:
+        return {
+            'success': True,
+            'status': 'error',
+            'message': 'Erro na autorização. Tente novamente.'
+        }
+    return {
+        'success': True,
+        'status': 'pending',
+        'message': f'Status: {status}'
+    }
+
+def _check_oauth_statuses(item_ids):
+    """Verifica o OAuth de vários itens de uma vez (consultas paralelas e memorizadas por alguns segundos)"""
+    connections = oauth_manager.load_all_connections()
+    items_status = FinanceApp().get_items_status(item_ids)
+    return {
+        item_id: _oauth_status_response(item_id, item_status, connections)
+        for item_id, item_status in items_status.items()
+    }
+
+@app.route('/api/connections/status')
+def api_connections_status():
+    """Status OAuth de várias conexões em uma chamada.
+
+    ?item_ids=a,b limita aos itens informados; sem o parâmetro verifica as conexões pendentes e ativas.
+    """
+    try:
+        item_ids = [i.strip() for i in request.args.get('item_ids', '').split(',') if i.strip()]
+        if not item_ids:
+            item_ids = [
+                item_id for item_id, connection in oauth_manager.load_all_connections().items()
+                if connection.get('status') in ('pending', 'active')
+            ]
+        return jsonify({'success': True, 'connections': _check_oauth_statuses(item_ids)})
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro: {e}'})
+
 @app.route('/check_oauth_status/<item_id>')
 def check_oauth_status(item_id):
-    """Verifica status de uma conexão OAuth específica"""
+    """Verifica status de uma conexão OAuth específica (ver /api/connections/status)"""
     try:
-        finance_app = FinanceApp()
-        
-        if not finance_app.authenticate():
-            return jsonify({'success': False, 'message': 'Erro na autenticação'})
-        
-        # Verifica status do item no Pluggy
-        response = requests.get(
-            f"{finance_app.base_url}/items/{item_id}",
-            headers={"X-API-KEY": finance_app.api_key}
-        )
-        
-        if response.status_code == 200:
-            item_data = response.json()
-            status = item_data.get('status')
-            
-            print(f"🔍 Debug - Status retornado da API: {status}")
-            print(f"🔍 Debug - Item data: {item_data}")
-            
-            if status in ['CONNECTED', 'UPDATED']:
-                # Atualiza status local
-                oauth_manager.update_status(item_id, 'active')
-                connection_info = oauth_manager.get_connection_info(item_id)
-                bank_name = connection_info.get('bank_name', 'Conta') if connection_info else 'Conta'
-                
-                return jsonify({
-                    'success': True, 
-                    'status': 'completed',
-                    'message': f'✅ {bank_name} conectado com sucesso!'
-                })
-            elif status in ['WAITING_USER_INPUT', 'LOGIN_IN_PROGRESS', 'UPDATING']:
-                return jsonify({
-                    'success': True, 
-                    'status': 'pending',
-                    'message': 'Aguardando autorização do usuário...'
-                })
-            elif status in ['LOGIN_ERROR', 'OUTDATED']:
-                return jsonify({
-                    'success': True, 
-                    'status': 'error',
-                    'message': 'Erro na autorização. Tente novamente.'
-                })
-            else:
-                return jsonify({
-                    'success': True, 
-                    'status': 'pending',
-                    'message': f'Status: {status}'
-                })
-        else:
-            return jsonify({'success': False, 'message': 'Erro ao verificar status'})
-    
+        return jsonify(_check_oauth_statuses([item_id])[item_id])
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro: {e}'})
 
 @app.route('/sync_connection/<item_id>', methods=['POST'])
 def sync_connection(item_id):
-    """Força sincronização de uma conexão específica"""
+    """Enfileira a sincronização de uma conexão específica (acompanhar em /api/sync_jobs/<job_id>).
+
+    A busca é incremental; ?full=1 pede a reconciliação completa das contas da conexão.
+    """
     try:
         # Validação das configurações obrigatórias
         config_valid, missing_fields = settings_manager.validate_required_settings()
@@ -1039,65 +1074,35 @@ def sync_connection(item_id):
                 'redirect': '/settings'
             })
         
-        finance_app = FinanceApp()
-        result = finance_app.sync_single_connection(item_id)
-        
-        if result:
-            new_cats = db.reconcile_category_mappings()
-            stats = result.get('stats', {})
-            new_notice = f"\n⚠️ {len(new_cats)} novas categorias aguardam De-Para" if new_cats else ''
-            if stats:
-                accounts_msg = f"{stats.get('accounts_inserted', 0)} novas, {stats.get('accounts_updated', 0)} atualizadas, {stats.get('accounts_unchanged', 0)} inalteradas"
-                transactions_msg = f"{stats.get('transactions_inserted', 0)} novas, {stats.get('transactions_updated', 0)} atualizadas, {stats.get('transactions_unchanged', 0)} inalteradas"
-                message = f"Sincronização incremental concluída{new_notice}\n"
-                message += f"💳 Contas: {accounts_msg}\n"
-                message += f"💰 Transações: {transactions_msg}"
-            else:
-                message = 'Sincronização iniciada com sucesso' + new_notice
-            return jsonify({
-                'success': True, 
-                'message': message,
-                'accounts': result.get('accounts', 0),
-                'transactions': result.get('transactions', 0)
-            })
-        else:
-            return jsonify({'success': False, 'message': 'Erro na sincronização'})
+        full = request.args.get('full', '').lower() in ('1', 'true', 'sim')
+        job_id, attached = enqueue_sync('connection_full' if full else 'connection', item_id)
+        if not job_id:
+            return jsonify({'success': False, 'message': 'Erro ao enfileirar sincronização'})
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'attached': attached,
+            'message': 'Sincronização já em andamento' if attached else 'Sincronização iniciada'
+        }), 202
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro: {e}'})
+
+@app.route('/api/connections/stats')
+def api_connections_stats():
+    """Estatísticas de todas as conexões (contas, saldo, transações, primeira/última data) em uma chamada"""
+    try:
+        return jsonify({'success': True, 'connections': db.get_connection_stats()})
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro: {e}'})
 
 @app.route('/connection_stats/<item_id>')
 def connection_stats(item_id):
-    """Retorna estatísticas de uma conexão específica"""
+    """Retorna estatísticas de uma conexão específica (ver /api/connections/stats)"""
     try:
-        import sqlite3
-        conn = sqlite3.connect('data/finance_app.db')
-        cursor = conn.cursor()
-        
-        # Conta contas
-        cursor.execute('SELECT COUNT(*) FROM accounts WHERE item_id = ?', (item_id,))
-        accounts_count = cursor.fetchone()[0]
-        
-        # Conta transações
-        cursor.execute('SELECT COUNT(*) FROM transactions WHERE item_id = ?', (item_id,))
-        transactions_count = cursor.fetchone()[0]
-        
-        # Última transação
-        cursor.execute('SELECT MAX(date) FROM transactions WHERE item_id = ?', (item_id,))
-        last_transaction = cursor.fetchone()[0]
-        
-        # Saldo total das contas
-        cursor.execute('SELECT SUM(balance) FROM accounts WHERE item_id = ?', (item_id,))
-        total_balance = cursor.fetchone()[0] or 0
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'accounts': accounts_count,
-            'transactions': transactions_count,
-            'last_transaction': last_transaction,
-            'total_balance': total_balance
-        })
+        stats = db.get_connection_stats().get(item_id)
+        if stats is None:
+            return jsonify({'success': False, 'message': 'Conexão não encontrada'})
+        return jsonify({'success': True, **stats})
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro: {e}'})
 
@@ -11,7 +11,7 @@ CONFIG_FILES = [
     # Arquivos de configuração por ambiente
     "data/app_settings_prod.json",
     "data/app_settings_dev.json",
-    # Conexões OAuth legadas e por ambiente (inclui legada para migração)
+    # Conexões OAuth legadas e por ambiente (só existem até a importação para a tabela connections)
     "data/oauth_connections.json",
     "data/oauth_connections_prod.json",
     "data/oauth_connections_dev.json",
@@ -47,6 +47,47 @@ class Config:
     
     # Configurações que vêm das variáveis de ambiente
     PLUGGY_BASE_URL = os.getenv("PLUGGY_BASE_URL", "https://api.pluggy.ai")
+
+    # Cliente HTTP compartilhado (keep-alive) para a API Pluggy
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+
+    # API key da Pluggy: validade (2h) e antecedência da renovação em segundo plano
+    PLUGGY_API_KEY_TTL_SECONDS = int(os.getenv("PLUGGY_API_KEY_TTL_SECONDS", "7200"))
+    PLUGGY_API_KEY_REFRESH_AHEAD_SECONDS = int(os.getenv("PLUGGY_API_KEY_REFRESH_AHEAD_SECONDS", "600"))
+
+    # Sincronização paralela: conexões buscadas ao mesmo tempo e tempo máximo de espera por conexão
+    SYNC_MAX_WORKERS = int(os.getenv("SYNC_MAX_WORKERS", "4"))
+    SYNC_CONNECTION_TIMEOUT = float(os.getenv("SYNC_CONNECTION_TIMEOUT", "300"))
+    # Limite global de páginas de transações buscadas ao mesmo tempo
+    SYNC_MAX_PAGE_REQUESTS = int(os.getenv("SYNC_MAX_PAGE_REQUESTS", "6"))
+    # Gravação em fluxo: transações por lote gravado e lotes aguardando o escritor (a busca
+    # espera quando a fila está cheia, limitando a memória da sincronização)
+    SYNC_WRITE_BATCH_SIZE = int(os.getenv("SYNC_WRITE_BATCH_SIZE", "5000"))
+    SYNC_WRITE_QUEUE_BATCHES = int(os.getenv("SYNC_WRITE_QUEUE_BATCHES", "4"))
+    # Busca incremental por marca d'água: janela de sobreposição e intervalo entre reconciliações completas
+    SYNC_WATERMARK_OVERLAP_DAYS = int(os.getenv("SYNC_WATERMARK_OVERLAP_DAYS", "7"))
+    SYNC_FULL_RECONCILE_DAYS = int(os.getenv("SYNC_FULL_RECONCILE_DAYS", "7"))
+    # Monitoramento do refresh na Pluggy: intervalo inicial e máximo entre consultas (backoff
+    # exponencial com jitter) e tempo máximo de espera por item
+    REFRESH_POLL_INITIAL_SECONDS = float(os.getenv("REFRESH_POLL_INITIAL_SECONDS", "1"))
+    REFRESH_POLL_MAX_SECONDS = float(os.getenv("REFRESH_POLL_MAX_SECONDS", "10"))
+    REFRESH_MONITOR_TIMEOUT = float(os.getenv("REFRESH_MONITOR_TIMEOUT", "150"))
+    # Por quanto tempo o status de um item (GET /items/<id>) é reaproveitado entre verificações de OAuth
+    ITEM_STATUS_TTL_SECONDS = float(os.getenv("ITEM_STATUS_TTL_SECONDS", "5"))
+    # Threads do pool próprio das verificações de status (separado do pool de páginas da sincronização)
+    ITEM_STATUS_MAX_WORKERS = int(os.getenv("ITEM_STATUS_MAX_WORKERS", "4"))
+    # Dias até verificar de novo todos os endpoints de refresh de um conector
+    REFRESH_ENDPOINT_REPROBE_DAYS = int(os.getenv("REFRESH_ENDPOINT_REPROBE_DAYS", "7"))
+    # Fila de sincronização (sync_worker): worker em thread do app (false = processo separado
+    # "python sync_worker.py"), intervalo de consulta da fila e intervalo mínimo entre gravações de progresso
+    SYNC_WORKER_IN_PROCESS = os.getenv("SYNC_WORKER_IN_PROCESS", "true").lower() in ("1", "true", "yes")
+    SYNC_JOB_POLL_SECONDS = float(os.getenv("SYNC_JOB_POLL_SECONDS", "2"))
+    SYNC_JOB_PROGRESS_INTERVAL = float(os.getenv("SYNC_JOB_PROGRESS_INTERVAL", "1"))
+    # Validade das leases de sincronização por conexão (renovadas por heartbeat a cada 1/3 do prazo);
+    # job em execução sem heartbeat por esse tempo é considerado interrompido
+    SYNC_LEASE_TTL_SECONDS = float(os.getenv("SYNC_LEASE_TTL_SECONDS", "60"))
     
     @classmethod
     def get_database_path(cls):
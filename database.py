@@ -4,7 +4,7 @@
 
 Sistema de banco de dados SQLite para armazenar:
 - C        try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Usar hor├írio de Bras├¡lia para timestamps
@@ -21,10 +21,19 @@ Sistema de banco de dados SQLite para armazenar:
 
 import sqlite3
 import json
+import base64
 import uuid
 import os
+import threading
+import time
+import copy
+import functools
+import hashlib
+import unicodedata
 from datetime import datetime, timezone, timedelta
+from time import perf_counter
 from typing import List, Dict, Optional
+from collections import OrderedDict
 
 def get_brasilia_time():
     """Retorna o horário atual de Brasília (UTC-3)"""
@@ -32,6 +41,7 @@ def get_brasilia_time():
     brasilia_tz = timezone(timedelta(hours=-3))
     return utc_now.astimezone(brasilia_tz).strftime('%Y-%m-%d %H:%M:%S')
 
+@functools.lru_cache(maxsize=4096)
 def convert_iso_to_standard_format(iso_date_str):
     """
     Converte data do formato ISO 8601 (2025-08-06T22:57:30.102Z) 
@@ -70,6 +80,7 @@ def convert_iso_to_standard_format(iso_date_str):
         print(f"Erro ao converter data '{iso_date_str}': {e}")
         return iso_date_str  # Retorna original se houver erro
 
+@functools.lru_cache(maxsize=4096)
 def normalize_date_for_comparison(date_str):
     """
     Normaliza datas para comparação, garantindo mesmo formato e lidando com timezones
@@ -170,6 +181,280 @@ def generate_conflict_log(existing_data: dict, new_data: dict) -> str:
         lines.append(f"• {label}: {old} → {new}")
     return "\n".join(lines)
 
+# ========================================
+#  BUSCA TEXTUAL (FTS5)
+# ========================================
+# Letras acentuadas do português dobradas para ASCII quando o SQLite não tem
+# "remove_diacritics" no tokenizer trigram (SQLite < 3.45). Usado só nos triggers do
+# índice FTS; a lista é curta de propósito (REPLACE aninhado tem limite de profundidade).
+_ACCENT_FOLD_MAP = {
+    'a': 'áàâãÁÀÂÃ', 'e': 'éêÉÊ', 'i': 'íÍ', 'o': 'óôõÓÔÕ',
+    'u': 'úüÚÜ', 'c': 'çÇ',
+}
+
+
+def fold_accents(text: str) -> str:
+    """Remove acentos (CAFÉ -> CAFE) para montar termos de busca compatíveis com o índice FTS"""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def accent_fold_sql(expr: str) -> str:
+    """Expressão SQL (REPLACE aninhados) equivalente a fold_accents para as letras de _ACCENT_FOLD_MAP"""
+    for plain, accented in _ACCENT_FOLD_MAP.items():
+        for ch in accented:
+            expr = f"REPLACE({expr}, '{ch}', '{plain}')"
+    return expr
+
+
+def transaction_content_hash(transaction: Dict) -> str:
+    """Impressão digital dos campos da API comparados na sincronização (valor, descrição, data, tipo,
+    categoria e estabelecimento); igual à gravada significa transação inalterada desde a última escrita"""
+    payload = '\x1f'.join(str(value) for value in (
+        transaction.get('amount'), transaction.get('description'), transaction.get('date'),
+        transaction.get('type'), transaction.get('category'), (transaction.get('merchant') or {}).get('name')
+    ))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def build_fts_match(term: str) -> str:
+    """Converte um termo livre em frase FTS5 (substring via trigram), escapando aspas"""
+    folded = fold_accents(term).strip()
+    return '"' + folded.replace('"', '""') + '"'
+
+
+class ConnectionManager:
+    """Mantém uma conexão SQLite configurada por thread para um arquivo de banco.
+
+    Cada thread reutiliza a mesma conexão (WAL, busy_timeout, foreign_keys e
+    cache de statements) em vez de abrir uma nova a cada método, evitando o custo
+    de conexão e de parse do schema. Conexões de threads já encerradas são
+    fechadas na próxima vez que uma nova conexão for criada.
+    """
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = 5000, cached_statements: int = 256):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # thread -> conexão (para fechar conexões de threads mortas / close_all)
+        self._connections: dict[threading.Thread, sqlite3.Connection] = {}
+
+    def _create_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False  # permite close_all a partir de outra thread
+        )
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ {get_brasilia_time()} Não foi possível ativar WAL em {self.db_path}: {e}")
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute('PRAGMA foreign_keys=ON')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        # INSERT OR REPLACE dispara os triggers de DELETE (monthly_rollup / transactions_fts)
+        conn.execute('PRAGMA recursive_triggers=ON')
+        return conn
+
+    def _prune_dead_threads(self):
+        """Fecha conexões pertencentes a threads que já terminaram"""
+        for thread in [t for t in self._connections if not t.is_alive()]:
+            try:
+                self._connections.pop(thread).close()
+            except Exception:
+                pass
+
+    def acquire(self) -> sqlite3.Connection:
+        """Retorna a conexão da thread atual, criando-a se necessário.
+
+        Reentrante: um acquire dentro de outro (um método de Database chamado por outro que já tem
+        a conexão) recebe a mesma conexão, com a transação em andamento. Só o acquire mais externo
+        entrega a conexão "limpa" (sem transação pendente e sem row_factory); cada acquire precisa
+        do seu release.
+        """
+        conn = getattr(self._local, 'conn', None)
+        depth = getattr(self._local, 'depth', 0)
+        if conn is not None and depth == 0:
+            self._reset(conn)
+            conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._create_connection()
+            with self._lock:
+                self._prune_dead_threads()
+                self._connections[threading.current_thread()] = conn
+            self._local.conn = conn
+        self._local.depth = depth + 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Devolve a conexão. Só o release do acquire mais externo descarta transação não confirmada
+        (mesma semântica de close()); os aninhados não desfazem o trabalho de quem os chamou."""
+        depth = getattr(self._local, 'depth', 0) - 1
+        self._local.depth = max(depth, 0)
+        if depth <= 0:
+            self._reset(conn)
+
+    def _reset(self, conn: sqlite3.Connection):
+        """Descarta transação não confirmada e row_factory da conexão da thread"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+        except sqlite3.ProgrammingError:
+            # Conexão fechada por close_all - será recriada no próximo acquire
+            self._local.conn = None
+
+    def close_all(self):
+        """Fecha todas as conexões do pool (ex.: troca de ambiente)"""
+        with self._lock:
+            for conn in self._connections.values():
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
+
+_connection_managers: dict[str, ConnectionManager] = {}
+_connection_managers_lock = threading.Lock()
+
+def get_connection_manager(db_path: str) -> ConnectionManager:
+    """Obtém (ou cria) o ConnectionManager compartilhado de um arquivo de banco"""
+    key = os.path.abspath(db_path)
+    manager = _connection_managers.get(key)
+    if manager is None:
+        with _connection_managers_lock:
+            manager = _connection_managers.get(key)
+            if manager is None:
+                manager = ConnectionManager(db_path)
+                _connection_managers[key] = manager
+    return manager
+
+# ========================================
+#  CACHE DE LEITURA (data_version)
+# ========================================
+class QueryCache:
+    """Cache LRU de resultados de leitura, compartilhado por arquivo de banco.
+
+    Validade controlada por PRAGMA data_version numa conexão "vigia" dedicada: qualquer
+    commit de outra conexão (desta ou de outro processo) muda o valor e esvazia o cache.
+    As escritas do próprio Database também invalidam explicitamente (ver note_release).
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 128):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._watcher: Optional[sqlite3.Connection] = None
+        self._data_version = None
+        self._generation = 0
+        self._total_changes: dict[int, int] = {}
+
+    def _check_data_version(self):
+        """Esvazia o cache se o banco mudou desde a última leitura (chamar com _lock)"""
+        try:
+            if self._watcher is None:
+                self._watcher = sqlite3.connect(self.db_path, check_same_thread=False)
+            version = self._watcher.execute('PRAGMA data_version').fetchone()[0]
+        except sqlite3.Error:
+            self._watcher = None
+            version = None
+        if version is None or version != self._data_version:
+            self._entries.clear()
+            self._generation += 1
+            self._data_version = version
+
+    def get(self, key, loader):
+        """Retorna uma cópia do valor em cache ou executa loader() e guarda o resultado"""
+        with self._lock:
+            self._check_data_version()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(self._entries[key])
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            # Só guarda se nada foi invalidado enquanto o loader rodava
+            if generation == self._generation:
+                self._entries[key] = copy.deepcopy(value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def note_release(self, conn: sqlite3.Connection):
+        """Invalida se a conexão devolvida escreveu algo desde a última devolução"""
+        try:
+            changes = conn.total_changes
+        except sqlite3.ProgrammingError:
+            return
+        if self._total_changes.get(id(conn), 0) != changes:
+            self._total_changes[id(conn)] = changes
+            self.invalidate()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+    def close(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            if self._watcher is not None:
+                try:
+                    self._watcher.close()
+                except Exception:
+                    pass
+                self._watcher = None
+
+
+_query_caches: dict[str, QueryCache] = {}
+
+def get_query_cache(db_path: str) -> QueryCache:
+    """Obtém (ou cria) o QueryCache compartilhado de um arquivo de banco"""
+    key = os.path.abspath(db_path)
+    cache = _query_caches.get(key)
+    if cache is None:
+        with _connection_managers_lock:
+            cache = _query_caches.get(key)
+            if cache is None:
+                cache = QueryCache(db_path)
+                _query_caches[key] = cache
+    return cache
+
+def cached_read(method):
+    """Decorator para leituras quentes do Database: resultado servido pelo QueryCache"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        return get_query_cache(self.db_path).get(key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
 class Database:
     def __init__(self, db_path: str | None = None):
         # Permite injetar caminho; se não informado usa variável de ambiente (via Config)
@@ -182,9 +467,92 @@ class Database:
         else:
             self.db_path = db_path
         self.init_database()
-    
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Obtém a conexão reutilizável da thread atual (ver ConnectionManager)"""
+        return get_connection_manager(self.db_path).acquire()
+
+    def _release_connection(self, conn: sqlite3.Connection):
+        """Devolve a conexão ao pool sem fechá-la (descarta transação não confirmada)"""
+        get_connection_manager(self.db_path).release(conn)
+        # Escritas feitas por esta conexão invalidam o cache de leitura
+        get_query_cache(self.db_path).note_release(conn)
+
+    def get_cache_stats(self) -> Dict:
+        """Contadores do cache de leitura (hits/misses/entradas)"""
+        return get_query_cache(self.db_path).stats()
+
+    # ========================================
+    #  MIGRAÇÕES VERSIONADAS DE SCHEMA
+    # ========================================
+    # Cada migração roda uma única vez por banco e fica registrada em schema_version.
+    # Todas são idempotentes: um banco legado (sem schema_version) executa a lista inteira.
+    SCHEMA_MIGRATIONS = [
+        (1, 'Tabelas base e colunas incrementais', '_migration_base_schema'),
+        (2, 'Backfill de datas de auditoria e valores absolutos', '_migration_backfill_legacy_values'),
+        (3, 'Índices secundários de transações', '_migration_transaction_indexes'),
+        (4, 'Colunas tx_day/tx_ts para filtros de data indexáveis', '_migration_transaction_day_columns'),
+        (5, 'Índice (transaction_date, id) para paginação por cursor', '_migration_keyset_index'),
+        (6, 'Índice FTS5 de descrição/estabelecimento', '_migration_transactions_fts'),
+        (7, 'Agregado mensal monthly_rollup', '_migration_monthly_rollup'),
+        (8, 'Triggers FTS compatíveis com UPSERT', '_migration_fts_upsert_triggers'),
+        (9, 'Impressão digital (content_hash) e updatedAt da Pluggy', '_migration_transaction_fingerprint'),
+        (10, 'Marcas d\'água de sincronização por conta (sync_watermarks)', '_migration_sync_watermarks'),
+        (11, 'Fila de jobs de sincronização (sync_jobs)', '_migration_sync_jobs'),
+        (12, 'Leases de sincronização por conexão (sync_leases)', '_migration_sync_leases'),
+        (13, 'Perfil de tempo de refresh por conector (connector_refresh_profile)', '_migration_connector_refresh_profile'),
+        (14, 'Endpoints de refresh por conector', '_migration_connector_refresh_endpoints'),
+        (15, 'Registro de conexões (connections) e connection_id em contas/transações', '_migration_connections'),
+        (16, 'Índice (connection_id, tx_day) para estatísticas por conexão', '_migration_connection_stats_index'),
+        (17, 'Índices de filtros terminando em (transaction_date, id), a ordem da listagem', '_migration_listing_order_indexes'),
+        (18, 'Triggers de transactions desativáveis por sync_bulk_mode', '_migration_sync_bulk_mode'),
+        (19, 'Remove índices redundantes de transactions (item, tx_day, tx_ts)', '_migration_retire_transaction_indexes'),
+        (20, 'Transações novas em espera de uma sincronização em lotes (sync_staged_transactions)', '_migration_sync_staging'),
+    ]
+    BACKFILL_CHUNK_SIZE = 5000
+    # A partir deste número de linhas afetadas a sincronização troca os triggers por linha de
+    # transactions por manutenção em conjunto de transactions_fts/monthly_rollup
+    BULK_SYNC_TRIGGER_THRESHOLD = 1000
+    # Lote grande com novas >= total de transações / BULK_SYNC_INDEX_REBUILD_RATIO: os índices secundários
+    # são removidos antes da escrita e recriados depois (ver scripts/benchmark_sync_persist.py)
+    BULK_SYNC_INDEX_REBUILD_RATIO = 4
+
+    # Índices gerenciados da tabela transactions (nome, colunas, condição parcial)
+    # Cobrem a matriz de filtros de /transactions e as consultas por conexão.
+    TRANSACTION_INDEXES = [
+        # Listagem sem filtro, cursor e filtros de período (faixa em transaction_date)
+        ('idx_transactions_date_id', 'transaction_date, id', None),
+        ('idx_transactions_account_date_id', 'account_id, transaction_date, id', None),
+        ('idx_transactions_connection_name_date_id', 'connection_name, transaction_date, id', None),
+        ('idx_transactions_type_date_id', 'type, transaction_date, id', None),
+        ('idx_transactions_modification', 'modification_date', None),
+        ('idx_transactions_user_category_date_id', 'user_category, user_subcategory, transaction_date, id', None),
+        ('idx_transactions_not_verified_date_id', 'transaction_date, id', 'verified = 0'),
+        ('idx_transactions_conflicts_date_id', 'transaction_date, id', 'conflict_detected = 1'),
+        # get_connection_stats (contagem e primeira/última data por conexão)
+        ('idx_transactions_connection_day', 'connection_id, tx_day', None),
+    ]
+    # Índices de transactions que saíram da lista (removidos pela migração 19)
+    RETIRED_TRANSACTION_INDEXES = ('idx_transactions_item', 'idx_transactions_tx_day', 'idx_transactions_tx_ts')
+
+    # Ordenações aceitas pela listagem paginada (coluna da tela -> expressão SQL sem NULLs).
+    # O desempate é sempre t.id, formando a chave do cursor (keyset).
+    TRANSACTION_SORT_COLUMNS = {
+        'date': 't.transaction_date',
+        'description': "LOWER(COALESCE(t.description, ''))",
+        'account': "LOWER(COALESCE(a.custom_name, t.account_name, a.name, ''))",
+        'user_category': "LOWER(COALESCE(t.user_category, ''))",
+        'amount': "(CASE WHEN t.type = 'CREDIT' THEN COALESCE(t.amount, 0) ELSE -COALESCE(t.amount, 0) END)",
+        'modification_date': "COALESCE(t.modification_date, '')",
+        'verified': 'COALESCE(t.verified, 0)',
+        'ignored': 'COALESCE(t.ignorar_transacao, 0)',
+    }
+    TRANSACTIONS_PAGE_MAX = 500
+    # Trigram só indexa sequências de 3+ caracteres; termos menores usam LIKE
+    FTS_MIN_TERM_LENGTH = 3
+
     def init_database(self):
-        """Inicializa o banco de dados com as tabelas necess├írias"""
+        """Inicializa o banco: verifica a versão do schema e aplica apenas migrações pendentes"""
         # Garante que o diretório do arquivo do banco existe antes de conectar
         try:
             db_dir = os.path.dirname(self.db_path)
@@ -192,7 +560,86 @@ class Database:
                 os.makedirs(db_dir, exist_ok=True)
         except Exception as e:
             print(f"⚠️ {get_brasilia_time()} Falha ao criar diretório do banco: {e}")
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
+        try:
+            # Caminho normal: uma única consulta de versão
+            current_version = self.get_schema_version(conn)
+            if current_version >= self.SCHEMA_MIGRATIONS[-1][0]:
+                return
+            self._run_migrations(conn, current_version)
+        finally:
+            self._release_connection(conn)
+
+    def get_schema_version(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        """Retorna a versão de schema aplicada (0 para bancos sem schema_version)"""
+        own_conn = conn is None
+        if own_conn:
+            conn = self._get_connection()
+        try:
+            row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+            return row[0] or 0
+        except sqlite3.OperationalError:
+            return 0
+        finally:
+            if own_conn:
+                self._release_connection(conn)
+
+    def _run_migrations(self, conn: sqlite3.Connection, current_version: int):
+        """Executa, em ordem, as migrações com versão maior que current_version"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+        for version, description, method_name in self.SCHEMA_MIGRATIONS:
+            if version <= current_version:
+                continue
+            # Outro processo pode ter aplicado a migração enquanto isso
+            if self.get_schema_version(conn) >= version:
+                continue
+            print(f"🛠️ {get_brasilia_time()} Aplicando migração {version}: {description}")
+            t_start = perf_counter()
+            try:
+                getattr(self, method_name)(conn)
+                conn.execute(
+                    'INSERT OR IGNORE INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)',
+                    (version, description, get_brasilia_time())
+                )
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️ {get_brasilia_time()} Falha na migração {version} ({description}): {e}")
+                return
+            print(f"✅ Migração {version} aplicada em {perf_counter() - t_start:.2f}s")
+
+    def _run_chunked_backfill(self, conn: sqlite3.Connection, label: str, table: str,
+                              set_clause: str, where_clause: str) -> int:
+        """Aplica um UPDATE em lotes de BACKFILL_CHUNK_SIZE linhas, com commit e progresso por lote.
+
+        O where_clause deve deixar de ser verdadeiro após o SET (senão o lote se repetiria).
+        """
+        total = conn.execute(f'SELECT COUNT(*) FROM {table} WHERE {where_clause}').fetchone()[0]
+        if not total:
+            return 0
+        done = 0
+        while done < total:
+            cursor = conn.execute(
+                f'UPDATE {table} SET {set_clause} WHERE rowid IN '
+                f'(SELECT rowid FROM {table} WHERE {where_clause} LIMIT ?)',
+                (self.BACKFILL_CHUNK_SIZE,)
+            )
+            conn.commit()
+            if cursor.rowcount <= 0:
+                break
+            done += cursor.rowcount
+            print(f"   ↳ {label}: {min(done, total)}/{total} linhas")
+        return done
+
+    def _migration_base_schema(self, conn: sqlite3.Connection):
+        """Migração 1: cria as tabelas base e adiciona colunas criadas ao longo do tempo"""
         cursor = conn.cursor()
         
         # Tabela de sincroniza├º├╡es
@@ -299,14 +746,7 @@ class Database:
             # Em caso de corrida de migração
             pass
         
-        # Migration: Add new columns and rename existing ones
-        self._migrate_database_schema(cursor)
-        
-        conn.commit()
-        conn.close()
-    
-    def _migrate_database_schema(self, cursor):
-        """Migrates existing database schema to new requirements"""
+        # Colunas adicionadas ao longo do tempo (bancos legados)
         try:
             # Add connection_name columns if not exist (for existing databases)
             try:
@@ -405,22 +845,13 @@ class Database:
             if 'date' in columns and 'transaction_date' not in columns:
                 # SQLite doesn't support column renaming directly, so we need to:
                 # 1. Add new column
-                # 2. Copy data
+                # 2. Copy data (migração 2, em lotes)
                 # 3. Keep old column for backward compatibility
                 cursor.execute('ALTER TABLE transactions ADD COLUMN transaction_date TIMESTAMP')
-                cursor.execute('UPDATE transactions SET transaction_date = date WHERE transaction_date IS NULL')
-            
-            # Update modification_date for existing records that don't have it
-            cursor.execute('UPDATE sync_history SET modification_date = sync_date WHERE modification_date IS NULL')
-            cursor.execute('UPDATE accounts SET modification_date = last_updated WHERE modification_date IS NULL')
-            cursor.execute('UPDATE accounts SET creation_date = last_updated WHERE creation_date IS NULL')
-            cursor.execute('UPDATE transactions SET modification_date = transaction_date WHERE modification_date IS NULL')
-            cursor.execute('UPDATE transactions SET creation_date = transaction_date WHERE creation_date IS NULL')
 
-            # NORMALIZAÇÃO: garantir que todos os valores de transações fiquem armazenados como absolutos (>=0)
-            # Idempotente: pode ser executado múltiplas vezes sem efeitos colaterais
+            # Nome personalizado das contas
             try:
-                cursor.execute('UPDATE transactions SET amount = ABS(amount)')
+                cursor.execute('ALTER TABLE accounts ADD COLUMN custom_name TEXT')
             except sqlite3.OperationalError:
                 pass
 
@@ -444,11 +875,616 @@ class Database:
             
         except Exception as e:
             print(f"ΓÜá∩╕Å Warning during database migration: {e}")
+
+    def _migration_backfill_legacy_values(self, conn: sqlite3.Connection):
+        """Migração 2: preenche datas de auditoria ausentes e normaliza valores para absolutos.
+
+        Executada em lotes (commit por lote) para não travar bancos grandes; cada passo
+        só toca linhas que ainda precisam de ajuste, então pode ser retomada com segurança.
+        """
+        def columns_of(table):
+            return {row[1] for row in conn.execute(f'PRAGMA table_info({table})').fetchall()}
+
+        # (tabela, coluna destino, coluna origem) – só roda se ambas existirem no banco
+        date_backfills = [
+            ('transactions', 'transaction_date', 'date'),
+            ('sync_history', 'modification_date', 'sync_date'),
+            ('accounts', 'modification_date', 'last_updated'),
+            ('accounts', 'creation_date', 'last_updated'),
+            ('transactions', 'modification_date', 'transaction_date'),
+            ('transactions', 'creation_date', 'transaction_date'),
+        ]
+        for table, target, source in date_backfills:
+            columns = columns_of(table)
+            if target not in columns or source not in columns:
+                continue
+            self._run_chunked_backfill(conn, f'{table}.{target}', table,
+                                       f'{target} = {source}',
+                                       f'{target} IS NULL AND {source} IS NOT NULL')
+
+        # NORMALIZAÇÃO: valores de transações armazenados sempre como absolutos (>=0)
+        self._run_chunked_backfill(conn, 'transactions.amount (ABS)', 'transactions',
+                                   'amount = ABS(amount)', 'amount < 0')
+
+    def _migration_transaction_indexes(self, conn: sqlite3.Connection):
+        """Migração 3: normaliza flags nulas e cria os índices gerenciados de transações"""
+        # verified/conflict_detected nulos viram 0 para que os filtros usem igualdade simples
+        # (e o índice parcial verified = 0 seja elegível)
+        self._run_chunked_backfill(conn, 'transactions.verified', 'transactions',
+                                   'verified = 0', 'verified IS NULL')
+        self._run_chunked_backfill(conn, 'transactions.conflict_detected', 'transactions',
+                                   'conflict_detected = 0', 'conflict_detected IS NULL')
+        self.ensure_transaction_indexes(conn)
+
+    def _migration_transaction_day_columns(self, conn: sqlite3.Connection):
+        """Migração 4: adiciona tx_day (YYYY-MM-DD) e tx_ts (epoch) derivados de transaction_date.
+
+        Os filtros de período comparam essas colunas diretamente (sem date()/datetime()
+        sobre a coluna), o que permite usar índice. Os writers preenchem ambas na gravação.
+        """
+        for ddl in ('ALTER TABLE transactions ADD COLUMN tx_day TEXT',
+                    'ALTER TABLE transactions ADD COLUMN tx_ts INTEGER'):
+            try:
+                conn.execute(ddl)
+            except sqlite3.OperationalError:
+                pass
+        conn.commit()
+        self._run_chunked_backfill(conn, 'transactions.tx_day/tx_ts', 'transactions',
+                                   "tx_day = date(transaction_date), "
+                                   "tx_ts = CAST(strftime('%s', transaction_date) AS INTEGER)",
+                                   'tx_day IS NULL AND date(transaction_date) IS NOT NULL')
+        self.ensure_transaction_indexes(conn)
+
+    def _migration_keyset_index(self, conn: sqlite3.Connection):
+        """Migração 5: troca o índice de data por (transaction_date, id), chave da paginação por cursor"""
+        conn.execute('DROP INDEX IF EXISTS idx_transactions_date')
+        self.ensure_transaction_indexes(conn)
+
+    def _migration_transactions_fts(self, conn: sqlite3.Connection):
+        """Migração 6: coluna merchant_name e índice FTS5 (trigram) sobre descrição e estabelecimento.
+
+        transactions_fts usa o mesmo rowid de transactions e é mantido pelos triggers abaixo.
+        Com SQLite >= 3.45 o próprio tokenizer remove acentos; antes disso os triggers gravam
+        o texto já sem acentos (accent_fold_sql).
+        """
+        try:
+            conn.execute('ALTER TABLE transactions ADD COLUMN merchant_name TEXT')
+        except sqlite3.OperationalError:
+            pass
+
+        try:
+            conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+                    description, merchant, tokenize = 'trigram remove_diacritics 1'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+                    description, merchant, tokenize = 'trigram'
+                )
+            ''')
+        fold = self._create_transactions_fts_triggers(conn)
+
+        # Carga inicial em lotes por faixa de rowid
+        total = conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+        last_rowid, done = 0, 0
+        while True:
+            row = conn.execute(
+                'SELECT MAX(rowid) FROM (SELECT rowid FROM transactions WHERE rowid > ? ORDER BY rowid LIMIT ?)',
+                (last_rowid, self.BACKFILL_CHUNK_SIZE)
+            ).fetchone()
+            if not row or row[0] is None:
+                break
+            cursor = conn.execute(
+                f'INSERT OR REPLACE INTO transactions_fts (rowid, description, merchant) '
+                f'SELECT rowid, {fold("description")}, {fold("merchant_name")} FROM transactions '
+                f'WHERE rowid > ? AND rowid <= ?',
+                (last_rowid, row[0])
+            )
+            conn.commit()
+            last_rowid = row[0]
+            done += cursor.rowcount
+            print(f"   ↳ transactions_fts: {min(done, total)}/{total} linhas")
+
+    def _create_transactions_fts_triggers(self, conn: sqlite3.Connection):
+        """(Re)cria os triggers que mantêm transactions_fts e retorna a função de normalização usada.
+
+        As escritas no índice usam DELETE + INSERT em vez de INSERT OR REPLACE: dentro de um
+        UPSERT (INSERT ... ON CONFLICT DO UPDATE) o REPLACE do trigger não é aplicado e a
+        atualização falharia com "constraint failed".
+        """
+        fold = self._transactions_fts_fold(conn)
+        if fold is accent_fold_sql:
+            print("   ↳ tokenizer sem remove_diacritics: acentos removidos pelos triggers")
+
+        new_description, new_merchant = fold('new.description'), fold('new.merchant_name')
+        when = self._ensure_sync_bulk_mode(conn)
+        conn.executescript(f'''
+            DROP TRIGGER IF EXISTS transactions_fts_ai;
+            DROP TRIGGER IF EXISTS transactions_fts_ad;
+            DROP TRIGGER IF EXISTS transactions_fts_au;
+            CREATE TRIGGER transactions_fts_ai AFTER INSERT ON transactions {when} BEGIN
+                DELETE FROM transactions_fts WHERE rowid = new.rowid;
+                INSERT INTO transactions_fts (rowid, description, merchant)
+                VALUES (new.rowid, {new_description}, {new_merchant});
+            END;
+            CREATE TRIGGER transactions_fts_ad AFTER DELETE ON transactions {when} BEGIN
+                DELETE FROM transactions_fts WHERE rowid = old.rowid;
+            END;
+            CREATE TRIGGER transactions_fts_au AFTER UPDATE OF description, merchant_name ON transactions {when} BEGIN
+                DELETE FROM transactions_fts WHERE rowid = old.rowid;
+                INSERT INTO transactions_fts (rowid, description, merchant)
+                VALUES (new.rowid, {new_description}, {new_merchant});
+            END;
+        ''')
+        return fold
+
+    @staticmethod
+    def _transactions_fts_fold(conn: sqlite3.Connection):
+        """Normalização aplicada ao texto indexado: nenhuma se o tokenizer já remove acentos"""
+        fts_sql = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transactions_fts'"
+        ).fetchone()[0]
+        if 'remove_diacritics' in fts_sql:
+            return lambda expr: expr
+        return accent_fold_sql
+
+    def _migration_monthly_rollup(self, conn: sqlite3.Connection):
+        """Migração 7: tabela monthly_rollup mantida por triggers e carga inicial"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS monthly_rollup (
+                month TEXT NOT NULL,
+                account_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                user_category TEXT NOT NULL,
+                tx_count INTEGER NOT NULL DEFAULT 0,
+                total_amount REAL NOT NULL DEFAULT 0,
+                ignored_count INTEGER NOT NULL DEFAULT 0,
+                ignored_amount REAL NOT NULL DEFAULT 0,
+                verified_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (month, account_id, type, user_category)
+            )
+        ''')
+        self._create_monthly_rollup_triggers(conn)
+        if not self.rebuild_monthly_rollup(conn):
+            raise RuntimeError('carga inicial do monthly_rollup falhou')
+
+    def _migration_fts_upsert_triggers(self, conn: sqlite3.Connection):
+        """Migração 8: recria os triggers de transactions_fts sem INSERT OR REPLACE"""
+        self._create_transactions_fts_triggers(conn)
+
+    def _migration_transaction_fingerprint(self, conn: sqlite3.Connection):
+        """Migração 9: colunas content_hash e pluggy_updated_at.
+
+        Sem carga inicial: o payload bruto da API não é armazenado, então a primeira sincronização
+        após a migração compara as linhas campo a campo e grava a impressão digital de cada uma.
+        """
+        for column in ('content_hash', 'pluggy_updated_at'):
+            try:
+                conn.execute(f'ALTER TABLE transactions ADD COLUMN {column} TEXT')
+            except sqlite3.OperationalError:
+                pass
+
+    def _migration_sync_watermarks(self, conn: sqlite3.Connection):
+        """Migração 10: tabela sync_watermarks (última data sincronizada e última reconciliação completa por conta)"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_watermarks (
+                item_id TEXT NOT NULL,
+                account_id TEXT NOT NULL,
+                last_transaction_date TEXT,
+                data_since TEXT,
+                last_synced_at TEXT,
+                last_full_sync_at TEXT,
+                PRIMARY KEY (item_id, account_id)
+            )
+        ''')
+
+    def _migration_sync_jobs(self, conn: sqlite3.Connection):
+        """Migração 11: tabela sync_jobs (sincronizações executadas em segundo plano pelo sync_worker)"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                item_id TEXT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                phase TEXT,
+                pages_fetched INTEGER DEFAULT 0,
+                rows_written INTEGER DEFAULT 0,
+                message TEXT,
+                result_json TEXT,
+                timings_json TEXT,
+                created_at TEXT,
+                started_at TEXT,
+                finished_at TEXT,
+                updated_at TEXT
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_sync_jobs_status ON sync_jobs (status, created_at)')
+
+    def _migration_sync_leases(self, conn: sqlite3.Connection):
+        """Migração 12: tabela sync_leases (uma sincronização por conexão entre threads e processos).
+
+        expires_at é um epoch (time.time()) renovado pelo heartbeat do dono da lease.
+        """
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_leases (
+                item_id TEXT PRIMARY KEY,
+                job_id TEXT,
+                owner TEXT NOT NULL,
+                acquired_at TEXT,
+                expires_at REAL NOT NULL
+            )
+        ''')
+
+    def _migration_connector_refresh_profile(self, conn: sqlite3.Connection):
+        """Migração 13: tabela connector_refresh_profile (tempo até o refresh ficar pronto, por conector)"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS connector_refresh_profile (
+                connector_id TEXT PRIMARY KEY,
+                connector_name TEXT,
+                samples INTEGER DEFAULT 0,
+                avg_ready_seconds REAL,
+                last_ready_seconds REAL,
+                max_ready_seconds REAL,
+                last_outcome TEXT,
+                updated_at TEXT
+            )
+        ''')
+
+    def _migration_connector_refresh_endpoints(self, conn: sqlite3.Connection):
+        """Migração 14: endpoint de refresh que funcionou, endpoints recusados (403/400) e data da verificação"""
+        for column in ('refresh_endpoint', 'failed_endpoints', 'endpoints_probed_at'):
+            try:
+                conn.execute(f'ALTER TABLE connector_refresh_profile ADD COLUMN {column} TEXT')
+            except sqlite3.OperationalError:
+                pass
+
+    def _migration_connections(self, conn: sqlite3.Connection):
+        """Migração 15: tabela connections (antes oauth_connections_{env}.json) e connection_id em accounts/transactions.
+
+        As linhas são importadas uma única vez do JSON pelo OAuthManager (import_connections), que
+        também preenche connection_id das contas e transações existentes a partir do item_id.
+        Removida a conexão, connection_id volta a NULL (dados mantidos no histórico).
+        """
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS connections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                item_id TEXT NOT NULL UNIQUE,
+                bank_name TEXT,
+                status TEXT NOT NULL DEFAULT 'active',
+                oauth_url TEXT,
+                expires_at TEXT,
+                data_since TEXT,
+                created_at TEXT,
+                last_updated TEXT
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_connections_status ON connections (status)')
+        for table in ('accounts', 'transactions'):
+            try:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN connection_id INTEGER '
+                             'REFERENCES connections(id) ON DELETE SET NULL')
+            except sqlite3.OperationalError:
+                pass
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_accounts_connection ON accounts (connection_id)')
+        self.ensure_transaction_indexes(conn)
+
+    def _migration_connection_stats_index(self, conn: sqlite3.Connection):
+        """Migração 16: troca o índice de connection_id por (connection_id, tx_day), que cobre
+        contagem e primeira/última data por conexão (get_connection_stats) sem ler a tabela"""
+        conn.execute('DROP INDEX IF EXISTS idx_transactions_connection')
+        self.ensure_transaction_indexes(conn)
+
+    def _migration_listing_order_indexes(self, conn: sqlite3.Connection):
+        """Migração 17: índices de conta, conexão, tipo, categoria, não verificadas e conflitos terminando em
+        (transaction_date, id), a ordem da listagem, para que o filtro e o ORDER BY usem o mesmo índice"""
+        for name in ('idx_transactions_account_date', 'idx_transactions_user_category',
+                     'idx_transactions_not_verified', 'idx_transactions_conflicts'):
+            conn.execute(f'DROP INDEX IF EXISTS {name}')
+        self.ensure_transaction_indexes(conn)
+
+    def _migration_sync_bulk_mode(self, conn: sqlite3.Connection):
+        """Migração 18: recria os triggers de monthly_rollup e transactions_fts com a condição de
+        sync_bulk_mode, que substitui o DROP/CREATE TRIGGER da gravação em lote"""
+        self._create_monthly_rollup_triggers(conn)
+        self._create_transactions_fts_triggers(conn)
+
+    def _migration_retire_transaction_indexes(self, conn: sqlite3.Connection):
+        """Migração 19: remove idx_transactions_item, idx_transactions_tx_day e idx_transactions_tx_ts.
+
+        Os filtros de período passam a limitar a faixa de transaction_date (idx_transactions_date_id e os
+        índices terminados em (transaction_date, id)); item_id só era lido ao vincular uma conexão nova.
+        """
+        for name in self.RETIRED_TRANSACTION_INDEXES:
+            conn.execute(f'DROP INDEX IF EXISTS {name}')
+
+    def _migration_sync_staging(self, conn: sqlite3.Connection):
+        """Migração 20: tabela sync_staged_transactions.
+
+        Numa sincronização gravada em lotes as transações novas esperam aqui (só a chave primária é
+        mantida) e entram em transactions de uma vez no fim, em merge_staged_transactions.
+        """
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_staged_transactions (
+                sync_item_id TEXT NOT NULL,
+                id TEXT NOT NULL,
+                account_id TEXT,
+                account_name TEXT,
+                amount REAL,
+                description TEXT,
+                transaction_date TIMESTAMP,
+                category TEXT,
+                type TEXT,
+                item_id TEXT,
+                connection_name TEXT,
+                connection_id INTEGER,
+                merchant_name TEXT,
+                content_hash TEXT,
+                pluggy_updated_at TEXT,
+                creation_date TIMESTAMP,
+                modification_date TIMESTAMP,
+                PRIMARY KEY (sync_item_id, id)
+            )
+        ''')
+
+    @staticmethod
+    def _monthly_rollup_delta_sql(row: str, sign: str) -> str:
+        """Upsert que soma (sign '+') ou subtrai (sign '-') a linha new/old do agregado mensal"""
+        key = (f"COALESCE(substr({row}.tx_day, 1, 7), ''), COALESCE({row}.account_id, ''), "
+               f"COALESCE({row}.type, ''), COALESCE({row}.user_category, '')")
+        ignored = f"(COALESCE({row}.ignorar_transacao, 0) = 1)"
+        return f'''
+                INSERT INTO monthly_rollup
+                    (month, account_id, type, user_category, tx_count, total_amount,
+                     ignored_count, ignored_amount, verified_count)
+                VALUES ({key}, {sign}1, {sign}COALESCE({row}.amount, 0),
+                        {sign}{ignored}, {sign}(CASE WHEN {ignored} THEN COALESCE({row}.amount, 0) ELSE 0 END),
+                        {sign}(COALESCE({row}.verified, 0) = 1))
+                ON CONFLICT (month, account_id, type, user_category) DO UPDATE SET
+                    tx_count = tx_count + excluded.tx_count,
+                    total_amount = total_amount + excluded.total_amount,
+                    ignored_count = ignored_count + excluded.ignored_count,
+                    ignored_amount = ignored_amount + excluded.ignored_amount,
+                    verified_count = verified_count + excluded.verified_count;
+                DELETE FROM monthly_rollup
+                WHERE (month, account_id, type, user_category) = ({key}) AND tx_count <= 0;'''
+
+    def _create_monthly_rollup_triggers(self, conn: sqlite3.Connection):
+        """(Re)cria os triggers que mantêm monthly_rollup em qualquer escrita em transactions"""
+        when = self._ensure_sync_bulk_mode(conn)
+        conn.executescript(f'''
+            DROP TRIGGER IF EXISTS monthly_rollup_ai;
+            DROP TRIGGER IF EXISTS monthly_rollup_ad;
+            DROP TRIGGER IF EXISTS monthly_rollup_au;
+            CREATE TRIGGER monthly_rollup_ai AFTER INSERT ON transactions {when} BEGIN
+                {self._monthly_rollup_delta_sql('new', '+')}
+            END;
+            CREATE TRIGGER monthly_rollup_ad AFTER DELETE ON transactions {when} BEGIN
+                {self._monthly_rollup_delta_sql('old', '-')}
+            END;
+            CREATE TRIGGER monthly_rollup_au
+            AFTER UPDATE OF tx_day, account_id, type, user_category, amount, ignorar_transacao, verified
+            ON transactions {when} BEGIN
+                {self._monthly_rollup_delta_sql('old', '-')}
+                {self._monthly_rollup_delta_sql('new', '+')}
+            END;
+        ''')
+
+    @staticmethod
+    def _ensure_sync_bulk_mode(conn: sqlite3.Connection) -> str:
+        """Cria a tabela sync_bulk_mode e retorna a condição WHEN dos triggers de transactions.
+
+        A gravação em lote de uma sincronização insere uma linha nela dentro da própria transação
+        (e a remove antes do commit): os triggers por linha ficam inativos só para essa escrita,
+        sem DDL, e as outras conexões nunca veem a linha.
+        """
+        conn.execute('CREATE TABLE IF NOT EXISTS sync_bulk_mode (active INTEGER PRIMARY KEY)')
+        return 'WHEN NOT EXISTS (SELECT 1 FROM sync_bulk_mode)'
+
+    def rebuild_monthly_rollup(self, conn: Optional[sqlite3.Connection] = None) -> bool:
+        """Recalcula monthly_rollup do zero a partir de transactions (recuperação/consistência)"""
+        own_conn = conn is None
+        if own_conn:
+            conn = self._get_connection()
+        try:
+            t_start = perf_counter()
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM monthly_rollup')
+            conn.execute('''
+                INSERT INTO monthly_rollup
+                    (month, account_id, type, user_category, tx_count, total_amount,
+                     ignored_count, ignored_amount, verified_count)
+                SELECT COALESCE(substr(tx_day, 1, 7), ''), COALESCE(account_id, ''),
+                       COALESCE(type, ''), COALESCE(user_category, ''),
+                       COUNT(*), SUM(COALESCE(amount, 0)),
+                       SUM(COALESCE(ignorar_transacao, 0) = 1),
+                       SUM(CASE WHEN COALESCE(ignorar_transacao, 0) = 1 THEN COALESCE(amount, 0) ELSE 0 END),
+                       SUM(COALESCE(verified, 0) = 1)
+                FROM transactions
+                GROUP BY 1, 2, 3, 4
+            ''')
+            conn.commit()
+            print(f"📊 monthly_rollup reconstruído em {perf_counter() - t_start:.2f}s")
+            return True
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Erro ao reconstruir monthly_rollup: {e}")
+            return False
+        finally:
+            if own_conn:
+                self._release_connection(conn)
+
+    @staticmethod
+    def _fill_lookup_ids(cursor: sqlite3.Cursor, ids) -> None:
+        """Recarrega a tabela temporária sync_lookup_ids com os ids informados.
+
+        As consultas usam CROSS JOIN a partir dela: a temporária não tem estatísticas e, com ANALYZE em
+        transactions, o planner preferiria percorrer transactions inteira e buscar cada id nela.
+        """
+        cursor.execute('CREATE TEMP TABLE IF NOT EXISTS sync_lookup_ids (id TEXT PRIMARY KEY)')
+        cursor.execute('DELETE FROM sync_lookup_ids')
+        cursor.executemany('INSERT OR IGNORE INTO sync_lookup_ids (id) VALUES (?)', ((i,) for i in ids))
+
+    @staticmethod
+    def _monthly_rollup_apply_lookup(cursor: sqlite3.Cursor, sign: str, after_rowid: Optional[int] = None) -> None:
+        """Soma (sign '+') ou subtrai (sign '-') do agregado mensal as transações de sync_lookup_ids, por grupo.
+
+        Com after_rowid inclui também as linhas inseridas depois dele (rowid maior).
+        """
+        cursor.execute(f'''
+            INSERT INTO monthly_rollup
+                (month, account_id, type, user_category, tx_count, total_amount,
+                 ignored_count, ignored_amount, verified_count)
+            SELECT COALESCE(substr(t.tx_day, 1, 7), ''), COALESCE(t.account_id, ''),
+                   COALESCE(t.type, ''), COALESCE(t.user_category, ''),
+                   {sign}COUNT(*), {sign}SUM(COALESCE(t.amount, 0)),
+                   {sign}SUM(COALESCE(t.ignorar_transacao, 0) = 1),
+                   {sign}SUM(CASE WHEN COALESCE(t.ignorar_transacao, 0) = 1 THEN COALESCE(t.amount, 0) ELSE 0 END),
+                   {sign}SUM(COALESCE(t.verified, 0) = 1)
+            FROM (
+                SELECT t.* FROM sync_lookup_ids l CROSS JOIN transactions t ON t.id = l.id
+                UNION ALL
+                SELECT * FROM transactions WHERE rowid > ?
+            ) t
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT (month, account_id, type, user_category) DO UPDATE SET
+                tx_count = tx_count + excluded.tx_count,
+                total_amount = total_amount + excluded.total_amount,
+                ignored_count = ignored_count + excluded.ignored_count,
+                ignored_amount = ignored_amount + excluded.ignored_amount,
+                verified_count = verified_count + excluded.verified_count
+        ''', (after_rowid,))
+        cursor.execute('DELETE FROM monthly_rollup WHERE tx_count <= 0')
+
+    def _transactions_fts_refresh_lookup(self, cursor: sqlite3.Cursor, after_rowid: Optional[int] = None) -> None:
+        """Regrava em transactions_fts as transações de sync_lookup_ids com dois comandos por conjunto.
+
+        Com after_rowid também indexa as linhas inseridas depois dele (ainda ausentes do índice).
+        """
+        fold = self._transactions_fts_fold(cursor.connection)
+        cursor.execute('''
+            DELETE FROM transactions_fts
+            WHERE rowid IN (SELECT t.rowid FROM sync_lookup_ids l CROSS JOIN transactions t ON t.id = l.id)
+        ''')
+        cursor.execute(f'''
+            INSERT INTO transactions_fts (rowid, description, merchant)
+            SELECT t.rowid, {fold('t.description')}, {fold('t.merchant_name')}
+            FROM sync_lookup_ids l CROSS JOIN transactions t ON t.id = l.id
+            UNION ALL
+            SELECT rowid, {fold('description')}, {fold('merchant_name')} FROM transactions WHERE rowid > ?
+        ''', (after_rowid,))
+
+    @staticmethod
+    def _transaction_index_ddl(name: str, columns: str, where: Optional[str]) -> str:
+        """CREATE INDEX de um item de TRANSACTION_INDEXES"""
+        ddl = f'CREATE INDEX IF NOT EXISTS {name} ON transactions ({columns})'
+        if where:
+            ddl += f' WHERE {where}'
+        return ddl
+
+    def _drop_transaction_indexes(self, cursor: sqlite3.Cursor) -> List[tuple]:
+        """Remove (na transação corrente) os índices secundários de transactions e retorna os removidos,
+        para _recreate_transaction_indexes"""
+        existing = {
+            row[0] for row in cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transactions'"
+            ).fetchall()
+        }
+        dropped = [index for index in self.TRANSACTION_INDEXES if index[0] in existing]
+        for name, _, _ in dropped:
+            cursor.execute(f'DROP INDEX {name}')
+        return dropped
+
+    def _recreate_transaction_indexes(self, cursor: sqlite3.Cursor, indexes: List[tuple]) -> None:
+        """Recria os índices removidos por _drop_transaction_indexes (uma ordenação por índice) e
+        renova as estatísticas do planner, apagadas com eles"""
+        for name, columns, where in indexes:
+            cursor.execute(self._transaction_index_ddl(name, columns, where))
+        if indexes:
+            cursor.execute('ANALYZE transactions')
+
+    def ensure_transaction_indexes(self, conn: Optional[sqlite3.Connection] = None) -> List[str]:
+        """Cria (se ausentes) os índices de TRANSACTION_INDEXES e retorna os nomes criados"""
+        own_conn = conn is None
+        if own_conn:
+            conn = self._get_connection()
+        created = []
+        try:
+            existing = {
+                row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transactions'"
+                ).fetchall()
+            }
+            table_columns = {row[1] for row in conn.execute('PRAGMA table_info(transactions)').fetchall()}
+            for name, columns, where in self.TRANSACTION_INDEXES:
+                if name in existing:
+                    continue
+                # Colunas criadas por migrações posteriores: o índice entra quando elas existirem
+                if any(col.strip() not in table_columns for col in columns.split(',')):
+                    continue
+                conn.execute(self._transaction_index_ddl(name, columns, where))
+                created.append(name)
+            if created:
+                conn.execute('ANALYZE transactions')
+                print(f"🗂️ Índices criados: {', '.join(created)}")
+            if own_conn:
+                conn.commit()
+        finally:
+            if own_conn:
+                self._release_connection(conn)
+        return created
+
+    def check_index_usage(self) -> List[Dict]:
+        """Roda EXPLAIN QUERY PLAN sobre os filtros de /transactions e aponta varreduras completas.
+
+        Usa o mesmo SQL de get_transactions_with_connection_info; retorna uma lista com
+        o nome do cenário, o plano e a flag full_scan. Sem filtro, só o SCAN de transactions
+        sem índice conta como varredura completa (a ordem por (transaction_date, id) com LIMIT
+        lê só a página). Com filtro, qualquer SCAN conta, a não ser por um índice parcial:
+        percorrer idx_transactions_date_id filtrando linha a linha lê a tabela inteira.
+        """
+        scenarios = [
+            ('sem filtros', {}),
+            ('conta', {'account_id': ['acc-1']}),
+            ('período', {'start_date': '2024-01-01', 'end_date': '2024-12-31'}),
+            ('período com horário', {'start_date': '2024-01-01T08:00', 'end_date': '2024-01-31T18:30'}),
+            ('data de modificação', {'modification_start_date': '2024-01-01', 'modification_end_date': '2024-12-31'}),
+            ('categoria do usuário', {'user_category': ['Alimentação'], 'user_subcategory': ['Mercado']}),
+            ('não verificadas', {'verification_filter': ['not_verified']}),
+            ('com conflitos', {'verification_filter': ['with_conflicts']}),
+            ('tipo', {'type_filter': ['DEBIT']}),
+            ('conexão', {'connection_id': 'Banco'}),
+            ('página seguinte (cursor)', {'after': ('2024-06-01 00:00:00', 'tx-id')}),
+            ('descrição (FTS)', {'description_filter': ['mercado', 'café']}),
+        ]
+        partial_indexes = [name for name, _, where in self.TRANSACTION_INDEXES if where]
+        results = []
+        try:
+            # Conexão própria e sem cache de statements: um EXPLAIN preparado não é invalidado
+            # por mudança de schema e mostraria o plano de antes de criar/remover um índice
+            conn = sqlite3.connect(self.db_path, cached_statements=0)
+            for label, filters in scenarios:
+                query, params = self._build_transactions_query(**filters)
+                plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, params).fetchall()]
+                filtered = any(key != 'after' for key in filters)
+                full_scan = any(
+                    (detail == 'SCAN t' or detail.startswith('SCAN t '))
+                    and ('USING' not in detail
+                         or (filtered and not any(f'INDEX {name}' in detail for name in partial_indexes)))
+                    for detail in plan
+                )
+                results.append({'scenario': label, 'plan': plan, 'full_scan': full_scan})
+            conn.close()
+        except Exception as e:
+            print(f"❌ Erro ao analisar planos de consulta: {e}")
+        return results
     
     def save_sync_data(self, item_id: str, accounts: List[Dict], transactions: List[Dict]) -> bool:
         """Salva dados de sincroniza├º├úo no banco"""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             current_timestamp = datetime.now().isoformat()
@@ -460,8 +1496,8 @@ class Database:
             ''', (item_id, len(accounts), len(transactions), current_timestamp, current_timestamp))
             
             # Limpa dados antigos por item_id (mant├⌐m compatibilidade)
-            cursor.execute('DELETE FROM accounts WHERE item_id = ?', (item_id,))
             cursor.execute('DELETE FROM transactions WHERE item_id = ?', (item_id,))
+            cursor.execute('DELETE FROM accounts WHERE item_id = ?', (item_id,))
             
             # Salva contas
             for account in accounts:
@@ -504,8 +1540,8 @@ class Database:
                     transaction_date = convert_iso_to_standard_format(transaction.get('date'))
                     cursor.execute('''
                         INSERT OR REPLACE INTO transactions 
-                        (id, account_id, account_name, amount, description, transaction_date, category, type, item_id, connection_name, creation_date, modification_date, manual_modification)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+                        (id, account_id, account_name, amount, description, transaction_date, tx_day, tx_ts, category, type, item_id, connection_name, creation_date, modification_date, manual_modification)
+                        VALUES (?, ?, ?, ?, ?, ?, date(?), CAST(strftime('%s', ?) AS INTEGER), ?, ?, ?, ?, ?, ?, 0)
                     ''', (
                         transaction.get('id'),
                         transaction.get('accountId'),
@@ -513,6 +1549,8 @@ class Database:
                         abs(transaction.get('amount', 0) or 0),  # sempre valor absoluto
                         transaction.get('description'),
                         transaction_date,
+                        transaction_date,
+                        transaction_date,
                         transaction.get('category'),
                         transaction.get('type'),
                         item_id,
@@ -522,17 +1560,22 @@ class Database:
                     ))
             
             conn.commit()
-            conn.close()
             return True
             
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"Γ¥î Erro ao salvar no banco: {e}")
             return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
     
     def get_last_sync(self) -> Optional[Dict]:
         """Obt├⌐m informa├º├╡es da ├║ltima sincroniza├º├úo"""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -543,7 +1586,6 @@ class Database:
             ''')
             
             result = cursor.fetchone()
-            conn.close()
             
             if result:
                 return {
@@ -557,19 +1599,18 @@ class Database:
         except Exception as e:
             print(f"Γ¥î Erro ao buscar ├║ltima sincroniza├º├úo: {e}")
             return None
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
     
+    @cached_read
     def get_accounts_summary(self) -> List[Dict]:
         """Obtém resumo das contas com informação se é manual ou de conexão"""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
 
-            # Garante coluna custom_name (migração leve) – ignora erro se já existir
-            try:
-                cursor.execute('ALTER TABLE accounts ADD COLUMN custom_name TEXT')
-            except Exception:
-                pass
-            
             cursor.execute('''
                 SELECT id, name, COALESCE(custom_name, '') as custom_name, type, subtype, balance, currency_code, last_updated, 
                        creation_date, modification_date, connection_name, item_id
@@ -604,21 +1645,60 @@ class Database:
                     'source_type': 'Manual' if is_manual else 'Conexão'
                 })
             
-            conn.close()
             return accounts
             
         except Exception as e:
             print(f"❌ Erro ao buscar contas: {e}")
             return []
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
     
-    def get_transactions(self, limit: int = 100, account_id: str = None, 
-                        start_date: str = None, end_date: str = None) -> List[Dict]:
-        """Obt├⌐m transa├º├╡es com filtros"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            query = '''
+    @staticmethod
+    def _transaction_date_condition(alias: Optional[str], value: str, is_start: bool) -> str:
+        """Condição indexável de período sobre transaction_date (dois parâmetros: value, value).
+
+        Um limite textual sobre transaction_date, folgado em um dia para cobrir o fuso das datas ISO,
+        restringe a faixa nos índices terminados em (transaction_date, id); a comparação exata usa
+        tx_day (datas simples) ou tx_ts (datetime-local, com 'T'), como o antigo date()/datetime().
+        """
+        prefix = f'{alias}.' if alias else ''
+        if is_start:
+            coarse = f"{prefix}transaction_date >= date(?, '-1 day')"
+        else:
+            coarse = f"{prefix}transaction_date < date(?, '+2 day')"
+        op = '>=' if is_start else '<='
+        if 'T' in value:
+            exact = f"{prefix}tx_ts {op} CAST(strftime('%s', ?) AS INTEGER)"
+        else:
+            exact = f'{prefix}tx_day {op} ?'
+        return f'({coarse} AND {exact})'
+
+    @staticmethod
+    def _modification_date_condition(alias: Optional[str], value: str, is_start: bool) -> str:
+        """Condição de período sobre modification_date (dois parâmetros: value, value).
+
+        Um limite textual por dia (sargável, usa idx_transactions_modification) restringe a faixa
+        e a comparação original com date()/datetime() garante exatamente a mesma semântica.
+        """
+        col = f'{alias}.modification_date' if alias else 'modification_date'
+        if is_start:
+            coarse = f'{col} >= date(?)'
+            exact = f'datetime({col}) >= datetime(?)' if 'T' in value else f'date({col}) >= ?'
+        else:
+            coarse = f"{col} < date(?, '+1 day')"
+            exact = f'datetime({col}) <= datetime(?)' if 'T' in value else f'date({col}) <= ?'
+        return f'({coarse} AND {exact})'
+
+    def get_transactions(self, limit: int = 100, account_id: str = None, 
+                        start_date: str = None, end_date: str = None) -> List[Dict]:
+        """Obt├⌐m transa├º├╡es com filtros"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            query = '''
                 SELECT id, account_id, account_name, amount, description, 
                        transaction_date, 
                        category, type, creation_date, modification_date,
@@ -634,20 +1714,12 @@ class Database:
                 params.append(account_id)
             
             if start_date:
-                # Se o formato incluir 'T' (datetime-local), usar datetime completo
-                if 'T' in start_date:
-                    query += ' AND datetime(transaction_date) >= datetime(?)'
-                else:
-                    query += ' AND date(transaction_date) >= ?'
-                params.append(start_date)
+                query += ' AND ' + self._transaction_date_condition(None, start_date, is_start=True)
+                params.extend([start_date, start_date])
             
             if end_date:
-                # Se o formato incluir 'T' (datetime-local), usar datetime completo
-                if 'T' in end_date:
-                    query += ' AND datetime(transaction_date) <= datetime(?)'
-                else:
-                    query += ' AND date(transaction_date) <= ?'
-                params.append(end_date)
+                query += ' AND ' + self._transaction_date_condition(None, end_date, is_start=False)
+                params.extend([end_date, end_date])
             
             query += ' ORDER BY transaction_date DESC LIMIT ?'
             params.append(limit)
@@ -671,13 +1743,219 @@ class Database:
                     'time_only': row[11]
                 })
             
-            conn.close()
             return transactions
             
         except Exception as e:
             print(f"Γ¥î Erro ao buscar transa├º├╡es: {e}")
             return []
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
     
+    def _build_transactions_query(self, limit: int = 100, account_id: List[str] = None,
+                                  connection_id: str = None, start_date: str = None,
+                                  end_date: str = None, category: str = None,
+                                  user_category: List[str] = None, user_subcategory: List[str] = None,
+                                  modification_start_date: str = None,
+                                  modification_end_date: str = None,
+                                  verification_filter: List[str] = None, type_filter: List[str] = None,
+                                  description_filter: List[str] | str | None = None,
+                                  sort: str = 'date', direction: str = 'desc',
+                                  after: Optional[tuple] = None) -> tuple:
+        """Monta o SQL (e parâmetros) da listagem de transações com os filtros da tela /transactions.
+
+        sort/direction escolhem a ordenação (TRANSACTION_SORT_COLUMNS) e after=(sort_key, id)
+        continua a partir da última linha da página anterior.
+        """
+        sort_expr = self.TRANSACTION_SORT_COLUMNS.get(sort, self.TRANSACTION_SORT_COLUMNS['date'])
+        direction = 'ASC' if str(direction).lower() == 'asc' else 'DESC'
+        query = f'''
+            SELECT 
+                t.id, t.account_id, t.account_name, t.amount, t.description, 
+                t.transaction_date, 
+                t.category, t.type, t.creation_date, t.modification_date,
+                t.connection_name as connection_name,
+                a.name as account_full_name,
+                a.custom_name as account_custom_name,
+                date(t.transaction_date) as date_only,
+                time(t.transaction_date) as time_only,
+                COALESCE(t.verified, 0) as verified,
+                COALESCE(t.conflict_detected, 0) as conflict_detected,
+                COALESCE(t.conflict_log, '') as conflict_log,
+                COALESCE(t.ignorar_transacao, 0) as ignorar_transacao,
+                COALESCE(t.manual_modification, 0) as manual_modification,
+                t.user_category,
+                t.user_subcategory,
+                COALESCE(t.user1_percent, s.user1_percent, 50.0) AS user1_percent,
+                COALESCE(t.user2_percent, s.user2_percent, 50.0) AS user2_percent,
+                {sort_expr} AS sort_key
+            FROM transactions t
+            LEFT JOIN accounts a ON t.account_id = a.id
+            LEFT JOIN account_splits s ON s.account_id = t.account_id
+            WHERE 1=1
+        '''
+        params = []
+        
+        if account_id and len(account_id) > 0:
+            # Filtro múltiplo para contas
+            placeholders = ','.join('?' * len(account_id))
+            query += f' AND t.account_id IN ({placeholders})'
+            params.extend(account_id)
+            
+        if connection_id:
+            query += ' AND t.connection_name = ?'
+            params.append(connection_id)
+        
+        if start_date:
+            query += ' AND ' + self._transaction_date_condition('t', start_date, is_start=True)
+            params.extend([start_date, start_date])
+        
+        if end_date:
+            query += ' AND ' + self._transaction_date_condition('t', end_date, is_start=False)
+            params.extend([end_date, end_date])
+        
+        if category:
+            query += ' AND t.category = ?'
+            params.append(category)
+
+        if description_filter:
+            # Permite lista de descrições (OR) ou string única
+            if isinstance(description_filter, str):
+                description_filter = [description_filter]
+            # Limita quantidade para evitar query excessivamente longa
+            cleaned = [d.strip() for d in description_filter if d and d.strip()][:25]
+            if cleaned:
+                # Termos com 3+ caracteres vão para o índice FTS (substring, sem acento/caixa);
+                # termos curtos não geram trigramas e continuam no LIKE
+                fts_terms = [d for d in cleaned if len(fold_accents(d)) >= self.FTS_MIN_TERM_LENGTH]
+                like_terms = [d for d in cleaned if d not in fts_terms]
+                conds = []
+                if fts_terms:
+                    conds.append('t.rowid IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)')
+                    params.append(' OR '.join(build_fts_match(d) for d in fts_terms))
+                for d in like_terms:
+                    conds.append('LOWER(t.description) LIKE LOWER(?)')
+                    params.append(f'%{d}%')
+                query += ' AND (' + ' OR '.join(conds) + ')'
+        
+        if user_category and len(user_category) > 0:
+            # Filtro múltiplo para categorias de usuário
+            conditions = []
+            for cat in user_category:
+                if cat == '__sem_categoria__':
+                    conditions.append('(t.user_category IS NULL OR t.user_category = "")')
+                else:
+                    conditions.append('t.user_category = ?')
+                    params.append(cat)
+            
+            if conditions:
+                query += f' AND ({" OR ".join(conditions)})'
+        
+        if user_subcategory and len(user_subcategory) > 0:
+            # Filtro múltiplo para subcategorias de usuário
+            conditions = []
+            for subcat in user_subcategory:
+                if subcat == '__sem_subcategoria__':
+                    conditions.append('(t.user_subcategory IS NULL OR t.user_subcategory = "")')
+                else:
+                    conditions.append('t.user_subcategory = ?')
+                    params.append(subcat)
+            
+            if conditions:
+                query += f' AND ({" OR ".join(conditions)})'
+        
+        if modification_start_date:
+            query += ' AND ' + self._modification_date_condition('t', modification_start_date, is_start=True)
+            params.extend([modification_start_date, modification_start_date])
+        
+        if modification_end_date:
+            query += ' AND ' + self._modification_date_condition('t', modification_end_date, is_start=False)
+            params.extend([modification_end_date, modification_end_date])
+        
+        if verification_filter and len(verification_filter) > 0:
+            # Filtro múltiplo para status de verificação
+            conditions = []
+            for status in verification_filter:
+                if status == 'verified':
+                    conditions.append('t.verified = 1')
+                elif status == 'not_verified':
+                    conditions.append('t.verified = 0')
+                elif status == 'with_conflicts':
+                    conditions.append('t.conflict_detected = 1')
+            
+            if conditions:
+                query += f' AND ({" OR ".join(conditions)})'
+        
+        if type_filter and len(type_filter) > 0:
+            # Filtro múltiplo para tipo de transação
+            conditions = []
+            for trans_type in type_filter:
+                if trans_type in ['CREDIT', 'DEBIT']:
+                    conditions.append('t.type = ?')
+                    params.append(trans_type)
+            
+            if conditions:
+                query += f' AND ({" OR ".join(conditions)})'
+        
+        if after is not None:
+            # Keyset: (chave de ordenação, id) estritamente após a última linha já entregue
+            op = '>' if direction == 'ASC' else '<'
+            query += f' AND ({sort_expr}, t.id) {op} (?, ?)'
+            params.extend([after[0], after[1]])
+        
+        query += f' ORDER BY {sort_expr} {direction}, t.id {direction} LIMIT ?'
+        params.append(limit)
+        return query, params
+
+    @staticmethod
+    def _row_to_transaction_dict(row) -> Dict:
+        """Converte uma linha de _build_transactions_query no dicionário usado pelos templates"""
+        # row indices after adding account_custom_name:
+        # 0 id, 1 account_id, 2 original stored account_name, 3 amount, 4 description,
+        # 5 transaction_date, 6 category, 7 type, 8 creation_date, 9 modification_date,
+        # 10 connection_name, 11 account_full_name (a.name), 12 account_custom_name,
+        # 13 date_only, 14 time_only, 15 verified, 16 conflict_detected, 17 conflict_log,
+        # 18 ignorar_transacao, 19 manual_modification, 20 user_category, 21 user_subcategory,
+        # 22 user1_percent, 23 user2_percent, 24 sort_key (chave do cursor)
+        display_account_name = row[12] if row[12] else (row[11] or row[2])
+        # Calcula dia da semana (Seg, Ter, Qua, Qui, Sex, Sáb, Dom) baseado em date_only
+        weekday_label = ''
+        try:
+            from datetime import datetime as _dt
+            if row[13]:
+                wd = _dt.strptime(row[13], '%Y-%m-%d').weekday()  # Monday=0
+                weekday_map = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+                weekday_label = weekday_map[wd]
+        except Exception:
+            pass
+        return {
+            'id': row[0],
+            'account_id': row[1],
+            'account_name': display_account_name,
+            'amount': row[3],
+            'description': row[4],
+            'transaction_date': row[5],
+            'category': row[6],
+            'type': row[7],
+            'creation_date': row[8],
+            'modification_date': row[9],
+            'connection_name': row[10] or 'N/A',
+            'account_full_name': row[11] or row[2],
+            'account_custom_name': row[12],
+            'date_only': row[13],
+            'time_only': row[14],
+            'weekday': weekday_label,
+            'verified': row[15],
+            'conflict_detected': row[16],
+            'conflict_log': row[17] or '',
+            'ignorar_transacao': row[18],
+            'manual_modification': row[19],
+            'user_category': row[20],
+            'user_subcategory': row[21],
+            'user1_percent': row[22],
+            'user2_percent': row[23]
+        }
+
     def get_transactions_with_connection_info(self, limit: int = 100, account_id: List[str] = None, 
                                              connection_id: str = None, start_date: str = None, 
                                              end_date: str = None, category: str = None,
@@ -687,219 +1965,162 @@ class Database:
                                              verification_filter: List[str] = None, type_filter: List[str] = None,
                                              description_filter: List[str] | str | None = None) -> List[Dict]:
         """Obt├⌐m transa├º├╡es com informa├º├╡es da conex├úo e conta, incluindo filtro por data de modifica├º├úo"""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
 
-            # Garante que a coluna custom_name exista (migração leve e idempotente)
-            try:
-                cursor.execute('ALTER TABLE accounts ADD COLUMN custom_name TEXT')
-            except sqlite3.OperationalError:
-                pass
-            
-            query = '''
-                SELECT 
-                    t.id, t.account_id, t.account_name, t.amount, t.description, 
-                    t.transaction_date, 
-                    t.category, t.type, t.creation_date, t.modification_date,
-                    t.connection_name as connection_name,
-                    a.name as account_full_name,
-                    a.custom_name as account_custom_name,
-                    date(t.transaction_date) as date_only,
-                    time(t.transaction_date) as time_only,
-                    COALESCE(t.verified, 0) as verified,
-                    COALESCE(t.conflict_detected, 0) as conflict_detected,
-                    COALESCE(t.conflict_log, '') as conflict_log,
-                    COALESCE(t.ignorar_transacao, 0) as ignorar_transacao,
-                    COALESCE(t.manual_modification, 0) as manual_modification,
-                    t.user_category,
-                    t.user_subcategory,
-                    COALESCE(t.user1_percent, s.user1_percent, 50.0) AS user1_percent,
-                    COALESCE(t.user2_percent, s.user2_percent, 50.0) AS user2_percent
-                FROM transactions t
-                LEFT JOIN accounts a ON t.account_id = a.id
-                LEFT JOIN account_splits s ON s.account_id = t.account_id
-                WHERE 1=1
-            '''
-            params = []
-            
-            if account_id and len(account_id) > 0:
-                # Filtro múltiplo para contas
-                placeholders = ','.join('?' * len(account_id))
-                query += f' AND t.account_id IN ({placeholders})'
-                params.extend(account_id)
-                
-            if connection_id:
-                query += ' AND t.connection_name = ?'
-                params.append(connection_id)
-            
-            if start_date:
-                # Se o formato incluir 'T' (datetime-local), usar datetime completo
-                if 'T' in start_date:
-                    query += ' AND datetime(t.transaction_date) >= datetime(?)'
-                else:
-                    query += ' AND date(t.transaction_date) >= ?'
-                params.append(start_date)
-            
-            if end_date:
-                # Se o formato incluir 'T' (datetime-local), usar datetime completo
-                if 'T' in end_date:
-                    query += ' AND datetime(t.transaction_date) <= datetime(?)'
-                else:
-                    query += ' AND date(t.transaction_date) <= ?'
-                params.append(end_date)
-            
-            if category:
-                query += ' AND t.category = ?'
-                params.append(category)
-
-            if description_filter:
-                # Permite lista de descrições (OR) ou string única
-                if isinstance(description_filter, list):
-                    cleaned = [d.strip() for d in description_filter if d and d.strip()]
-                    if cleaned:
-                        # Limita quantidade para evitar query excessivamente longa
-                        cleaned = cleaned[:25]
-                        conds = []
-                        for d in cleaned:
-                            conds.append('LOWER(t.description) LIKE LOWER(?)')
-                            params.append(f'%{d}%')
-                        query += ' AND (' + ' OR '.join(conds) + ')'
-                elif isinstance(description_filter, str) and description_filter.strip():
-                    query += ' AND LOWER(t.description) LIKE LOWER(?)'
-                    params.append(f'%{description_filter.strip()}%')
-            
-            if user_category and len(user_category) > 0:
-                # Filtro múltiplo para categorias de usuário
-                conditions = []
-                for cat in user_category:
-                    if cat == '__sem_categoria__':
-                        conditions.append('(t.user_category IS NULL OR t.user_category = "")')
-                    else:
-                        conditions.append('t.user_category = ?')
-                        params.append(cat)
-                
-                if conditions:
-                    query += f' AND ({" OR ".join(conditions)})'
-            
-            if user_subcategory and len(user_subcategory) > 0:
-                # Filtro múltiplo para subcategorias de usuário
-                conditions = []
-                for subcat in user_subcategory:
-                    if subcat == '__sem_subcategoria__':
-                        conditions.append('(t.user_subcategory IS NULL OR t.user_subcategory = "")')
-                    else:
-                        conditions.append('t.user_subcategory = ?')
-                        params.append(subcat)
-                
-                if conditions:
-                    query += f' AND ({" OR ".join(conditions)})'
-            
-            if modification_start_date:
-                # Se o formato incluir 'T' (datetime-local), usar datetime completo
-                if 'T' in modification_start_date:
-                    query += ' AND datetime(t.modification_date) >= datetime(?)'
-                else:
-                    query += ' AND date(t.modification_date) >= ?'
-                params.append(modification_start_date)
-            
-            if modification_end_date:
-                # Se o formato incluir 'T' (datetime-local), usar datetime completo
-                if 'T' in modification_end_date:
-                    query += ' AND datetime(t.modification_date) <= datetime(?)'
-                else:
-                    query += ' AND date(t.modification_date) <= ?'
-                params.append(modification_end_date)
-            
-            if verification_filter and len(verification_filter) > 0:
-                # Filtro múltiplo para status de verificação
-                conditions = []
-                for status in verification_filter:
-                    if status == 'verified':
-                        conditions.append('t.verified = 1')
-                    elif status == 'not_verified':
-                        conditions.append('(t.verified = 0 OR t.verified IS NULL)')
-                    elif status == 'with_conflicts':
-                        conditions.append('t.conflict_detected = 1')
-                
-                if conditions:
-                    query += f' AND ({" OR ".join(conditions)})'
-            
-            if type_filter and len(type_filter) > 0:
-                # Filtro múltiplo para tipo de transação
-                conditions = []
-                for trans_type in type_filter:
-                    if trans_type in ['CREDIT', 'DEBIT']:
-                        conditions.append('t.type = ?')
-                        params.append(trans_type)
-                
-                if conditions:
-                    query += f' AND ({" OR ".join(conditions)})'
-            
-            query += ' ORDER BY t.transaction_date DESC LIMIT ?'
-            params.append(limit)
+            query, params = self._build_transactions_query(
+                limit=limit, account_id=account_id, connection_id=connection_id,
+                start_date=start_date, end_date=end_date, category=category,
+                user_category=user_category, user_subcategory=user_subcategory,
+                modification_start_date=modification_start_date,
+                modification_end_date=modification_end_date,
+                verification_filter=verification_filter, type_filter=type_filter,
+                description_filter=description_filter
+            )
             
             cursor.execute(query, params)
 
-            transactions = []
-            for row in cursor.fetchall():
-                # row indices after adding account_custom_name:
-                # 0 id, 1 account_id, 2 original stored account_name, 3 amount, 4 description,
-                # 5 transaction_date, 6 category, 7 type, 8 creation_date, 9 modification_date,
-                # 10 connection_name, 11 account_full_name (a.name), 12 account_custom_name,
-                # 13 date_only, 14 time_only, 15 verified, 16 conflict_detected, 17 conflict_log,
-                # 18 ignorar_transacao, 19 manual_modification, 20 user_category, 21 user_subcategory,
-                # 22 user1_percent, 23 user2_percent
-                display_account_name = row[12] if row[12] else (row[11] or row[2])
-                # Calcula dia da semana (Seg, Ter, Qua, Qui, Sex, Sáb, Dom) baseado em date_only
-                weekday_label = ''
-                try:
-                    from datetime import datetime as _dt
-                    if row[13]:
-                        wd = _dt.strptime(row[13], '%Y-%m-%d').weekday()  # Monday=0
-                        weekday_map = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
-                        weekday_label = weekday_map[wd]
-                except Exception:
-                    pass
-                transactions.append({
-                    'id': row[0],
-                    'account_id': row[1],
-                    'account_name': display_account_name,
-                    'amount': row[3],
-                    'description': row[4],
-                    'transaction_date': row[5],
-                    'category': row[6],
-                    'type': row[7],
-                    'creation_date': row[8],
-                    'modification_date': row[9],
-                    'connection_name': row[10] or 'N/A',
-                    'account_full_name': row[11] or row[2],
-                    'account_custom_name': row[12],
-                    'date_only': row[13],
-                    'time_only': row[14],
-                    'weekday': weekday_label,
-                    'verified': row[15],
-                    'conflict_detected': row[16],
-                    'conflict_log': row[17] or '',
-                    'ignorar_transacao': row[18],
-                    'manual_modification': row[19],
-                    'user_category': row[20],
-                    'user_subcategory': row[21],
-                    'user1_percent': row[22],
-                    'user2_percent': row[23]
-                })
+            transactions = [self._row_to_transaction_dict(row) for row in cursor.fetchall()]
 
-            conn.close()
             return transactions
             
         except Exception as e:
             print(f"Γ¥î Erro ao buscar transa├º├╡es com informa├º├╡es de conex├úo: {e}")
             return []
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    @staticmethod
+    def encode_transactions_cursor(sort: str, direction: str, sort_key, transaction_id: str) -> str:
+        """Serializa a posição (ordenação, chave, id) da última linha em um cursor opaco"""
+        payload = json.dumps([sort, direction, sort_key, transaction_id], ensure_ascii=False)
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_transactions_cursor(cursor: str) -> Optional[tuple]:
+        """Lê um cursor de encode_transactions_cursor; retorna None se inválido"""
+        try:
+            sort, direction, sort_key, transaction_id = json.loads(
+                base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+            )
+            return sort, direction, sort_key, transaction_id
+        except Exception:
+            return None
+
+    def get_transactions_page(self, page_size: int = 100, cursor: str = None,
+                              sort: str = 'date', direction: str = 'desc', **filters) -> Dict:
+        """Página de transações com paginação por cursor (keyset) sobre (ordenação, id).
+
+        Aceita os mesmos filtros de get_transactions_with_connection_info. Retorna
+        {'transactions', 'next_cursor', 'has_more', 'sort', 'direction'}; next_cursor é None na última página.
+        """
+        if sort not in self.TRANSACTION_SORT_COLUMNS:
+            sort = 'date'
+        direction = 'asc' if str(direction).lower() == 'asc' else 'desc'
+        page_size = max(1, min(int(page_size or 100), self.TRANSACTIONS_PAGE_MAX))
+        result = {'transactions': [], 'next_cursor': None, 'has_more': False, 'sort': sort, 'direction': direction}
+
+        after = None
+        if cursor:
+            decoded = self.decode_transactions_cursor(cursor)
+            # Cursor de outra ordenação não vale para esta consulta: recomeça do início
+            if decoded and decoded[0] == sort and decoded[1] == direction:
+                after = (decoded[2], decoded[3])
+
+        conn = None
+        try:
+            conn = self._get_connection()
+            # Busca uma linha a mais para saber se existe próxima página
+            query, params = self._build_transactions_query(
+                limit=page_size + 1, sort=sort, direction=direction, after=after, **filters
+            )
+            rows = conn.execute(query, params).fetchall()
+        except Exception as e:
+            print(f"❌ Erro ao buscar página de transações: {e}")
+            return result
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        result['transactions'] = [self._row_to_transaction_dict(row) for row in rows]
+        result['has_more'] = has_more
+        if has_more and rows:
+            last = rows[-1]
+            result['next_cursor'] = self.encode_transactions_cursor(sort, direction, last[24], last[0])
+        return result
+
+    @cached_read
+    def get_transaction_counters(self) -> Dict:
+        """Contadores gerais da tela de transações em uma única agregação"""
+        counters = {'total': 0, 'verified': 0, 'not_verified': 0, 'ignored': 0, 'conflicts': 0}
+        conn = None
+        try:
+            conn = self._get_connection()
+            row = conn.execute('''
+                SELECT COUNT(*),
+                       SUM(CASE WHEN verified = 1 THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN COALESCE(verified, 0) = 0 THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN ignorar_transacao = 1 THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN conflict_detected = 1 THEN 1 ELSE 0 END)
+                FROM transactions
+            ''').fetchone()
+            counters.update({
+                'total': row[0] or 0,
+                'verified': row[1] or 0,
+                'not_verified': row[2] or 0,
+                'ignored': row[3] or 0,
+                'conflicts': row[4] or 0,
+            })
+        except Exception as e:
+            print(f"❌ Erro ao contar transações: {e}")
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+        return counters
+
+    DESCRIPTION_SUGGESTIONS_MAX = 50
+
+    @cached_read
+    def search_descriptions(self, term: str, limit: int = 20) -> List[str]:
+        """Descrições distintas que contêm term (busca do filtro de descrição), mais frequentes primeiro.
+
+        Usa o índice transactions_fts; termos com menos de FTS_MIN_TERM_LENGTH caracteres
+        não retornam sugestões, para que a lista nunca percorra a tabela inteira.
+        """
+        term = (term or '').strip()
+        limit = max(1, min(int(limit), self.DESCRIPTION_SUGGESTIONS_MAX))
+        if len(fold_accents(term)) < self.FTS_MIN_TERM_LENGTH:
+            return []
+        conn = None
+        try:
+            conn = self._get_connection()
+            rows = conn.execute('''
+                SELECT t.description FROM transactions t
+                WHERE t.rowid IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)
+                  AND t.description IS NOT NULL AND t.description != ''
+                GROUP BY t.description
+                ORDER BY COUNT(*) DESC, t.description
+                LIMIT ?
+            ''', ('description : ' + build_fts_match(term), limit)).fetchall()
+            return [row[0] for row in rows]
+        except Exception as e:
+            print(f"❌ Erro ao buscar descrições: {e}")
+            return []
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
+    @cached_read
     def get_categories(self) -> List[str]:
         """Obt├⌐m todas as categorias dispon├¡veis nas transa├º├╡es"""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -910,17 +2131,20 @@ class Database:
             ''')
             
             categories = [row[0] for row in cursor.fetchall()]
-            conn.close()
             return categories
             
         except Exception as e:
             print(f"Γ¥î Erro ao buscar categorias: {e}")
             return []
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     def get_transaction_by_id(self, transaction_id: str) -> Dict:
         """Busca uma transa├º├úo espec├¡fica pelo ID"""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -933,7 +2157,6 @@ class Database:
             ''', (transaction_id,))
             
             row = cursor.fetchone()
-            conn.close()
             
             if row:
                 return {
@@ -957,13 +2180,17 @@ class Database:
         except Exception as e:
             print(f"Γ¥î Erro ao buscar transa├º├úo: {e}")
             return None
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     def update_transaction(self, transaction_id: str, amount: float, description: str, 
                           category: str, transaction_date: str, account_id: str = None, 
                           transaction_type: str = None) -> bool:
         """Atualiza uma transação específica - preserva segundos originais se data não mudou"""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Busca a transação atual para comparar a data
@@ -971,7 +2198,6 @@ class Database:
             current_result = cursor.fetchone()
             
             if not current_result:
-                conn.close()
                 return False
             
             current_date = current_result[0]
@@ -999,8 +2225,10 @@ class Database:
             final_amount = abs(amount)
             
             # Monta a query de atualização - marca como modificação manual
-            query_parts = ['amount = ?', 'description = ?', 'category = ?', 'transaction_date = ?', 'modification_date = ?']
-            params = [final_amount, description, category, final_transaction_date, brasilia_time]
+            query_parts = ['amount = ?', 'description = ?', 'category = ?', 'transaction_date = ?', 'modification_date = ?',
+                           'tx_day = date(?)', "tx_ts = CAST(strftime('%s', ?) AS INTEGER)"]
+            params = [final_amount, description, category, final_transaction_date, brasilia_time,
+                      final_transaction_date, final_transaction_date]
             
             # Se transaction_type foi fornecido, adiciona na query
             if transaction_type:
@@ -1017,8 +2245,9 @@ class Database:
                 query_parts.extend(['account_id = ?', 'account_name = ?'])
                 params.extend([account_id, account_name])
             
-            # Sempre marca como modificação manual
-            query_parts.append('manual_modification = 1')
+            # Sempre marca como modificação manual; sem impressão digital a próxima sincronização
+            # compara a linha campo a campo
+            query_parts.extend(['manual_modification = 1', 'content_hash = NULL'])
             
             # Monta a query final
             query = f'''
@@ -1034,40 +2263,60 @@ class Database:
             rows_affected = cursor.rowcount
             
             conn.commit()
-            conn.close()
             
             return rows_affected > 0
             
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"Γ¥î Erro ao atualizar transa├º├úo: {e}")
             return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     def get_statistics(self) -> Dict:
         """Obt├⌐m estat├¡sticas gerais"""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Total de contas e saldo
             cursor.execute('SELECT COUNT(*), SUM(balance) FROM accounts')
             accounts_count, total_balance = cursor.fetchone()
             
-            # Total de transa├º├╡es
-            cursor.execute('SELECT COUNT(*) FROM transactions')
+            # Total de transa├º├╡es (agregado mensal: O(meses))
+            cursor.execute('SELECT SUM(tx_count) FROM monthly_rollup')
             transactions_count = cursor.fetchone()[0]
             
             # Receitas e despesas (├║ltimos 30 dias)
-            # Com valores armazenados sempre como absolutos, usamos o campo type para determinar direção
+            # Com valores armazenados sempre como absolutos, usamos o campo type para determinar direção.
+            # Meses inteiros após o mês inicial vêm do monthly_rollup; o mês inicial (parcial)
+            # é somado direto de transactions pela faixa de transaction_date (idx_transactions_date_id).
             cursor.execute('''
+                WITH bounds AS (
+                    SELECT date('now', '-30 days') AS start_day,
+                           substr(date('now', '-30 days'), 1, 7) AS start_month,
+                           date('now', '-30 days', 'start of month', '+1 month') AS next_month_day
+                ),
+                partial AS (
+                    SELECT type, amount FROM transactions, bounds
+                    WHERE transaction_date >= date(bounds.start_day, '-1 day')
+                      AND transaction_date < date(bounds.next_month_day, '+1 day')
+                      AND tx_day >= bounds.start_day AND tx_day < bounds.next_month_day
+                ),
+                whole_months AS (
+                    SELECT type, total_amount AS amount FROM monthly_rollup, bounds
+                    WHERE month > bounds.start_month
+                )
                 SELECT 
                     SUM(CASE WHEN type = 'CREDIT' THEN amount ELSE 0 END) as income,
                     SUM(CASE WHEN type = 'DEBIT' THEN amount ELSE 0 END) as expense
-                FROM transactions 
-                WHERE date(transaction_date) >= date('now', '-30 days')
+                FROM (SELECT type, amount FROM partial UNION ALL SELECT type, amount FROM whole_months)
             ''')
             income, expense = cursor.fetchone()
             
-            conn.close()
             
             monthly_income = income or 0
             monthly_expense = expense or 0
@@ -1083,11 +2332,15 @@ class Database:
         except Exception as e:
             print(f"Γ¥î Erro ao buscar estat├¡sticas: {e}")
             return {}
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     def update_modification_date(self, table: str, record_id: str) -> bool:
         """Atualiza a data de modifica├º├úo de um registro espec├¡fico"""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Usar hor├írio de Bras├¡lia
@@ -1113,17 +2366,22 @@ class Database:
                 ''', (current_timestamp, record_id))
             
             conn.commit()
-            conn.close()
             return True
             
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"Γ¥î Erro ao atualizar data de modifica├º├úo: {e}")
             return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     def update_account(self, account_id: str, **kwargs) -> bool:
         """Atualiza uma conta e sua data de modifica├º├úo"""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Constr├│i query dinamicamente baseada nos kwargs
@@ -1145,19 +2403,43 @@ class Database:
                 cursor.execute(query, params)
                 
                 conn.commit()
-                conn.close()
                 return True
             
             return False
             
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"Γ¥î Erro ao atualizar conta: {e}")
             return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def update_account_custom_name(self, account_id: str, custom_name: str | None) -> bool:
+        """Atualiza somente o nome customizado da conta (None remove o nome customizado)"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute('UPDATE accounts SET custom_name = ?, modification_date = ? WHERE id = ?',
+                           (custom_name, datetime.now().isoformat(), account_id))
+            conn.commit()
+            return True
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            print(f"❌ Erro ao atualizar nome customizado da conta: {e}")
+            return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     def save_sync_data_incremental(self, item_id: str, accounts: List[Dict], transactions: List[Dict]) -> bool:
         """Salva dados de sincroniza├º├úo de forma incremental (apenas novos ou modificados)"""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             current_timestamp = datetime.now().isoformat()
@@ -1331,12 +2613,13 @@ class Database:
                         cursor.execute('''
                             UPDATE transactions 
                             SET account_id=?, account_name=?, amount=?, description=?, transaction_date=?, 
+                                tx_day=date(?), tx_ts=CAST(strftime('%s', ?) AS INTEGER),
                                 category=?, type=?, item_id=?, connection_name=?, modification_date=?, 
                                 conflict_detected=0, manual_modification=0
                             WHERE id=?
                         ''', (
                             transaction.get('accountId'), transaction.get('account_name'),
-                            new_amount, new_description, transaction_date,
+                            new_amount, new_description, transaction_date, transaction_date, transaction_date,
                             transaction.get('category'), transaction.get('type'), item_id,
                             transaction.get('connection_name', 'N/A'), current_timestamp, transaction_id
                         ))
@@ -1348,255 +2631,1158 @@ class Database:
                     transaction_date = convert_iso_to_standard_format(transaction.get('date'))
                     cursor.execute('''
                         INSERT INTO transactions 
-                        (id, account_id, account_name, amount, description, transaction_date, category, type, item_id, connection_name, creation_date, modification_date, manual_modification)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+                        (id, account_id, account_name, amount, description, transaction_date, tx_day, tx_ts, category, type, item_id, connection_name, creation_date, modification_date, manual_modification)
+                        VALUES (?, ?, ?, ?, ?, ?, date(?), CAST(strftime('%s', ?) AS INTEGER), ?, ?, ?, ?, ?, ?, 0)
                     ''', (
                         transaction_id, transaction.get('accountId'), transaction.get('account_name'),
-                        abs(transaction.get('amount', 0) or 0), transaction.get('description'), transaction_date,
+                        abs(transaction.get('amount', 0) or 0), transaction.get('description'),
+                        transaction_date, transaction_date, transaction_date,
                         transaction.get('category'), transaction.get('type'), item_id,
                         transaction.get('connection_name', 'N/A'), current_timestamp, current_timestamp
                     ))
                     transactions_inserted += 1
             
             conn.commit()
-            conn.close()
-            
-            # Log detalhado da sincroniza├º├úo incremental
-            connections_processed = len(set(t.get('connection_name', 'N/A') for t in transactions)) if transactions else 0
-            print(f"≡ƒôè Sincroniza├º├úo incremental conclu├¡da: {connections_processed} conex├╡es processadas")
-            print(f"   ≡ƒÆ│ Contas: {accounts_inserted} novas, {accounts_updated} atualizadas, {accounts_unchanged} inalteradas")
-            print(f"   ≡ƒÆ░ Transa├º├╡es: {transactions_inserted} novas, {transactions_updated} atualizadas, {transactions_unchanged} inalteradas")
-            if conflicts_detected > 0:
-                print(f"   ΓÜá∩╕Å Conflitos: {conflicts_detected} transa├º├╡es com conflitos detectados")
-            
+            
+            # Log detalhado da sincroniza├º├úo incremental
+            connections_processed = len(set(t.get('connection_name', 'N/A') for t in transactions)) if transactions else 0
+            print(f"≡ƒôè Sincroniza├º├úo incremental conclu├¡da: {connections_processed} conex├╡es processadas")
+            print(f"   ≡ƒÆ│ Contas: {accounts_inserted} novas, {accounts_updated} atualizadas, {accounts_unchanged} inalteradas")
+            print(f"   ≡ƒÆ░ Transa├º├╡es: {transactions_inserted} novas, {transactions_updated} atualizadas, {transactions_unchanged} inalteradas")
+            if conflicts_detected > 0:
+                print(f"   ΓÜá∩╕Å Conflitos: {conflicts_detected} transa├º├╡es com conflitos detectados")
+            
+            return True
+            
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            print(f"Γ¥î Erro na sincroniza├º├úo incremental: {e}")
+            return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    @staticmethod
+    def _select_existing_by_ids(cursor: sqlite3.Cursor, table: str, columns: str, ids: List[str]) -> List[tuple]:
+        """Busca linhas existentes de table para os ids informados via join com tabela temporária.
+
+        Evita listas IN (?, ?, ...) em lotes; o primeiro campo de columns deve ser o id.
+        """
+        if not ids:
+            return []
+        Database._fill_lookup_ids(cursor, ids)
+        qualified = ', '.join(f'{table}.{col.strip()}' for col in columns.split(','))
+        cursor.execute(f'SELECT {qualified} FROM sync_lookup_ids CROSS JOIN {table} ON {table}.id = sync_lookup_ids.id')
+        rows = cursor.fetchall()
+        cursor.execute('DELETE FROM sync_lookup_ids')
+        return rows
+
+    def save_sync_data_incremental_with_stats(self, item_id: str, accounts: List[Dict], transactions: List[Dict],
+                                              record_history: bool = True, stage_new: bool = False) -> Dict:
+        """Salva dados de sincroniza├º├úo de forma incremental e retorna estat├¡sticas detalhadas
+
+        Com record_history=False (gravação em lotes de uma sincronização em andamento) não registra
+        sync_history nem imprime o resumo; o chamador usa record_sync_history ao final. Com stage_new
+        as transações novas vão para sync_staged_transactions e só entram em transactions em
+        merge_staged_transactions (as existentes são atualizadas na hora).
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            # Usar hor├írio de Bras├¡lia
+            current_timestamp = get_brasilia_time()
+
+            # Toda a escrita em uma única transação explícita (trava de escrita desde o início)
+            if conn.in_transaction:
+                conn.commit()
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            # Registra a sincroniza├º├úo
+            if record_history:
+                cursor.execute('''
+                    INSERT INTO sync_history (item_id, accounts_count, transactions_count, modification_date)
+                    VALUES (?, ?, ?, ?)
+                ''', (item_id, len(accounts), len(transactions), current_timestamp))
+            
+            # Conexão (tabela connections) das contas e transações gravadas
+            connection_row = cursor.execute('SELECT id FROM connections WHERE item_id = ?', (item_id,)).fetchone()
+            connection_id = connection_row[0] if connection_row else None
+
+            # Estat├¡sticas para retorno
+            stats = {
+                'accounts_inserted': 0,
+                'accounts_updated': 0,
+                'accounts_unchanged': 0,
+                'transactions_inserted': 0,
+                'transactions_updated': 0,
+                'transactions_unchanged': 0,
+                'transactions_skipped': 0,
+                'transactions_compared': 0
+            }
+            
+            # -------------------------------------------------------------
+            # OTIMIZAÇÃO: Pré-carrega contas e transações existentes (join com tabela temporária)
+            # e aplica as mudanças em lote (executemany)
+            # -------------------------------------------------------------
+            existing_accounts = {
+                row[0]: {'name': row[1], 'balance': row[2], 'currency_code': row[3]}
+                for row in self._select_existing_by_ids(
+                    cursor, 'accounts', 'id, name, balance, currency_code',
+                    [a.get('id') for a in accounts if a.get('id')]
+                )
+            }
+
+            account_updates = []
+            account_inserts = []
+            for account in accounts:
+                account_id = account.get('id')
+                if not account_id:
+                    continue
+                existing = existing_accounts.get(account_id)
+                new_name = account.get('name')
+                new_balance = account.get('balance', 0)
+                new_currency = account.get('currencyCode', 'BRL')
+                if existing:
+                    has_changes = (
+                        existing['name'] != new_name or
+                        abs((existing['balance'] or 0) - new_balance) > 0.01 or
+                        existing['currency_code'] != new_currency
+                    )
+                    if has_changes:
+                        account_updates.append((
+                            new_name, account.get('type'), account.get('subtype'), new_balance, new_currency,
+                            account.get('item_id', item_id),  # Usa item_id da conta se existir
+                            account.get('connection_name', 'N/A'), connection_id, current_timestamp, account_id
+                        ))
+                        stats['accounts_updated'] += 1
+                    else:
+                        stats['accounts_unchanged'] += 1
+                else:
+                    account_inserts.append((
+                        account_id, new_name, account.get('type'), account.get('subtype'), new_balance, new_currency,
+                        account.get('item_id', item_id), account.get('connection_name', 'N/A'), connection_id,
+                        current_timestamp, current_timestamp
+                    ))
+                    # Evita inserir duas vezes se a conta vier repetida
+                    existing_accounts[account_id] = {'name': new_name, 'balance': new_balance, 'currency_code': new_currency}
+                    stats['accounts_inserted'] += 1
+
+            if account_updates:
+                cursor.executemany('''
+                    UPDATE accounts
+                    SET name=?, type=?, subtype=?, balance=?, currency_code=?,
+                        item_id=?, connection_name=?, connection_id=?, modification_date=?
+                    WHERE id=?
+                ''', account_updates)
+            if account_inserts:
+                cursor.executemany('''
+                    INSERT INTO accounts
+                    (id, name, type, subtype, balance, currency_code, item_id, connection_name, connection_id, creation_date, modification_date)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', account_inserts)
+
+            existing_transactions = {
+                row[0]: {
+                    'amount': row[1],
+                    'description': row[2],
+                    'transaction_date': row[3],
+                    'verified': row[4],
+                    'type': row[5],
+                    'category': row[6],
+                    'merchant_name': row[7],
+                    'content_hash': row[8]
+                }
+                for row in self._select_existing_by_ids(
+                    cursor, 'transactions',
+                    'id, amount, description, transaction_date, verified, type, category, merchant_name, content_hash',
+                    [t.get('id') for t in transactions if t.get('id')]
+                )
+            }
+
+            # Conjuntos de mudança aplicados em lote ao final
+            transaction_upserts = []
+            conflict_updates = []
+            # Estabelecimento (merchant) só alimenta a busca textual: atualizado à parte,
+            # sem contar como alteração da transação
+            merchant_updates = []
+            # Existentes sem mudança gravável: só atualiza a impressão digital
+            fingerprint_updates = []
+            seen_ids = set()
+
+            for transaction in transactions:
+                transaction_id = transaction.get('id')
+                if not transaction_id:
+                    continue
+                if transaction_id in seen_ids:
+                    # Repetida no mesmo lote: já tratada acima
+                    stats['transactions_unchanged'] += 1
+                    continue
+                seen_ids.add(transaction_id)
+                existing = existing_transactions.get(transaction_id)
+                content_hash = transaction_content_hash(transaction)
+                updated_at = transaction.get('updatedAt')
+                if existing and existing.get('content_hash') == content_hash:
+                    # Mesma impressão digital: nada mudou na API desde a última escrita
+                    stats['transactions_skipped'] += 1
+                    stats['transactions_unchanged'] += 1
+                    continue
+
+                new_amount = abs(transaction.get('amount', 0) or 0)
+                new_description = transaction.get('description')
+                new_date_raw = transaction.get('date')
+                new_type = transaction.get('type')
+                new_category = transaction.get('category')
+                new_merchant = (transaction.get('merchant') or {}).get('name')
+                # Converte data apenas uma vez
+                new_date_converted = convert_iso_to_standard_format(new_date_raw)
+                upsert_row = (
+                    transaction_id, transaction.get('accountId'), transaction.get('account_name'), new_amount,
+                    new_description, new_date_converted, new_date_converted, new_date_converted, new_category, new_type,
+                    transaction.get('item_id', item_id), transaction.get('connection_name', 'N/A'), connection_id,
+                    new_merchant, content_hash, updated_at, current_timestamp, current_timestamp
+                )
+
+                if existing:
+                    stats['transactions_compared'] += 1
+                    if new_merchant and new_merchant != existing.get('merchant_name'):
+                        merchant_updates.append((new_merchant, transaction_id))
+                    is_verified = existing.get('verified', 0)
+                    existing_amount = existing.get('amount', 0)
+                    existing_description = existing.get('description')
+                    existing_date = existing.get('transaction_date')
+                    existing_type = existing.get('type')
+                    existing_category = existing.get('category')
+
+                    has_changes = (
+                        abs(existing_amount - new_amount) > 0.01 or
+                        existing_description != new_description or
+                        (existing_date != new_date_converted and
+                         normalize_date_for_comparison(existing_date) != normalize_date_for_comparison(new_date_converted)) or
+                        existing_type != new_type or
+                        existing_category != new_category
+                    )
+
+                    if is_verified:
+                        # Verificada: nunca sobrescreve, apenas registra o conflito
+                        if has_changes:
+                            conflict_log = generate_conflict_log(
+                                {
+                                    'amount': existing_amount,
+                                    'description': existing_description,
+                                    'date': existing_date,
+                                    'type': existing_type,
+                                    'category': existing_category
+                                },
+                                {
+                                    'amount': new_amount,
+                                    'description': new_description,
+                                    'date': new_date_converted,
+                                    'type': new_type,
+                                    'category': new_category
+                                }
+                            )
+                            # Sem impressão digital: o conflito volta a ser avaliado a cada sincronização
+                            conflict_updates.append((conflict_log, transaction_id))
+                            stats['conflicts_detected'] = stats.get('conflicts_detected', 0) + 1
+                        else:
+                            fingerprint_updates.append((content_hash, updated_at, transaction_id))
+                        stats['transactions_unchanged'] += 1
+                        continue
+
+                    # Não verificada - atualiza apenas se mudou
+                    if has_changes:
+                        transaction_upserts.append(upsert_row)
+                        stats['transactions_updated'] += 1
+                    else:
+                        fingerprint_updates.append((content_hash, updated_at, transaction_id))
+                        stats['transactions_unchanged'] += 1
+                else:
+                    transaction_upserts.append(upsert_row)
+                    stats['transactions_inserted'] += 1
+
+            if stage_new:
+                # Novas esperam o fim da sincronização (uma inserção ordenada para todos os lotes)
+                staged = [row for row in transaction_upserts if row[0] not in existing_transactions]
+                if staged:
+                    cursor.executemany(f'''
+                        INSERT OR REPLACE INTO sync_staged_transactions
+                        (sync_item_id, {self.STAGED_TRANSACTION_COLUMNS})
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', [(item_id, *row[:6], *row[8:]) for row in staged])
+                    transaction_upserts = [row for row in transaction_upserts if row[0] in existing_transactions]
+
+            # Lote grande: a linha em sync_bulk_mode (só visível nesta transação) desativa os triggers
+            # por linha de transactions, e transactions_fts/monthly_rollup são mantidos por conjunto,
+            # antes e depois da escrita: existentes alteradas por sync_lookup_ids, novas pelo rowid
+            # (maior que o último antes da escrita)
+            bulk_mode = len(transaction_upserts) + len(merchant_updates) >= self.BULK_SYNC_TRIGGER_THRESHOLD
+            dropped_indexes = []
+            if bulk_mode:
+                last_rowid = cursor.execute('SELECT COALESCE(MAX(rowid), 0) FROM transactions').fetchone()[0]
+                self._fill_lookup_ids(cursor, [row[0] for row in transaction_upserts if row[0] in existing_transactions]
+                                      + [row[1] for row in merchant_updates])
+                self._monthly_rollup_apply_lookup(cursor, '-')
+                cursor.execute('INSERT OR IGNORE INTO sync_bulk_mode (active) VALUES (1)')
+                # Muitas novas em relação ao histórico: inserir com os índices secundários custa uma
+                # inserção aleatória em cada um por linha; removê-los e recriá-los ao final ordena cada
+                # índice uma vez (o total de transações vem do agregado mensal, sem ler a tabela)
+                inserted = stats['transactions_inserted']
+                total = cursor.execute('SELECT COALESCE(SUM(tx_count), 0) FROM monthly_rollup').fetchone()[0]
+                if inserted >= self.BULK_SYNC_TRIGGER_THRESHOLD and inserted * self.BULK_SYNC_INDEX_REBUILD_RATIO >= total:
+                    dropped_indexes = self._drop_transaction_indexes(cursor)
+
+            if transaction_upserts:
+                # Novas entram com INSERT; existentes não verificadas são atualizadas no ON CONFLICT.
+                # O WHERE do DO UPDATE mantém a proteção das verificadas mesmo se o status mudou
+                # entre a leitura e a escrita. creation_date e merchant_name das existentes são preservados.
+                cursor.executemany('''
+                    INSERT INTO transactions
+                    (id, account_id, account_name, amount, description, transaction_date, tx_day, tx_ts, category, type, item_id, connection_name, connection_id, merchant_name, content_hash, pluggy_updated_at, creation_date, modification_date, manual_modification)
+                    VALUES (?, ?, ?, ?, ?, ?, date(?), CAST(strftime('%s', ?) AS INTEGER), ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+                    ON CONFLICT(id) DO UPDATE SET
+                        account_id=excluded.account_id, account_name=excluded.account_name, amount=excluded.amount,
+                        description=excluded.description, transaction_date=excluded.transaction_date,
+                        tx_day=excluded.tx_day, tx_ts=excluded.tx_ts,
+                        category=excluded.category, type=excluded.type, item_id=excluded.item_id,
+                        connection_name=excluded.connection_name, connection_id=excluded.connection_id,
+                        content_hash=excluded.content_hash,
+                        pluggy_updated_at=excluded.pluggy_updated_at, modification_date=excluded.modification_date,
+                        conflict_detected=0, manual_modification=0
+                    WHERE COALESCE(transactions.verified, 0) = 0
+                ''', transaction_upserts)
+            if conflict_updates:
+                cursor.executemany('''
+                    UPDATE transactions
+                    SET conflict_detected = 1, conflict_log = ?
+                    WHERE id = ?
+                ''', conflict_updates)
+            if merchant_updates:
+                cursor.executemany('UPDATE transactions SET merchant_name = ? WHERE id = ?', merchant_updates)
+            if fingerprint_updates:
+                cursor.executemany(
+                    'UPDATE transactions SET content_hash = ?, pluggy_updated_at = ? WHERE id = ?',
+                    fingerprint_updates
+                )
+
+            if bulk_mode:
+                self._recreate_transaction_indexes(cursor, dropped_indexes)
+                cursor.execute('DELETE FROM sync_bulk_mode')
+                self._monthly_rollup_apply_lookup(cursor, '+', last_rowid)
+                self._transactions_fts_refresh_lookup(cursor, last_rowid)
+                cursor.execute('DELETE FROM sync_lookup_ids')
+            
+            conn.commit()
+            if not record_history:
+                return {'success': True, 'stats': stats, 'message': 'Lote gravado com sucesso'}
+            
+            # Log detalhado da sincroniza├º├úo incremental
+            connections_processed = len(set(t.get('connection_name', 'N/A') for t in transactions)) if transactions else 0
+            print(f"≡ƒôè Sincroniza├º├úo incremental conclu├¡da: {connections_processed} conex├╡es processadas")
+            print(f"   ≡ƒÆ│ Contas: {stats['accounts_inserted']} novas, {stats['accounts_updated']} atualizadas, {stats['accounts_unchanged']} inalteradas")
+            print(f"   ≡ƒÆ░ Transa├º├╡es: {stats['transactions_inserted']} novas, {stats['transactions_updated']} atualizadas, {stats['transactions_unchanged']} inalteradas")
+            print(f"   🔎 Impressão digital: {stats['transactions_skipped']} ignoradas sem alteração, {stats['transactions_compared']} comparadas campo a campo")
+            if stats.get('conflicts_detected', 0) > 0:
+                print(f"   ΓÜá∩╕Å Conflitos: {stats['conflicts_detected']} transa├º├╡es com conflitos detectados")
+            
+            return {
+                'success': True,
+                'stats': stats,
+                'message': 'Sincroniza├º├úo incremental conclu├¡da com sucesso'
+            }
+            
+        except Exception as e:
+            print(f"Γ¥î Erro na sincroniza├º├úo incremental: {e}")
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+            return {
+                'success': False,
+                'message': f'Erro na sincroniza├º├úo: {e}',
+                'stats': {}
+            }
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    STAGED_TRANSACTION_COLUMNS = ('id, account_id, account_name, amount, description, transaction_date, category, type, '
+                                  'item_id, connection_name, connection_id, merchant_name, content_hash, '
+                                  'pluggy_updated_at, creation_date, modification_date')
+
+    def discard_staged_transactions(self, item_id: str) -> bool:
+        """Descarta as transações em espera de uma sincronização anterior do item que não terminou"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            conn.execute('DELETE FROM sync_staged_transactions WHERE sync_item_id = ?', (item_id,))
+            conn.commit()
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao descartar transações em espera de {item_id}: {e}")
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+            return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def merge_staged_transactions(self, item_id: str) -> Dict:
+        """Insere em transactions, numa transação e em ordem de (transaction_date, id), as transações novas
+        gravadas com stage_new, e as remove da espera.
+
+        Acima de BULK_SYNC_TRIGGER_THRESHOLD usa a manutenção em conjunto de
+        save_sync_data_incremental_with_stats (e recria os índices secundários se as novas forem muitas
+        em relação ao histórico). Retorna {'success', 'merged'}.
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            if conn.in_transaction:
+                conn.commit()
+            cursor.execute('BEGIN IMMEDIATE')
+            staged = cursor.execute(
+                'SELECT COUNT(*) FROM sync_staged_transactions WHERE sync_item_id = ?', (item_id,)
+            ).fetchone()[0]
+            bulk_mode = staged >= self.BULK_SYNC_TRIGGER_THRESHOLD
+            dropped_indexes = []
+            if bulk_mode:
+                last_rowid = cursor.execute('SELECT COALESCE(MAX(rowid), 0) FROM transactions').fetchone()[0]
+                # Gravadas por outro caminho enquanto esperavam: atualizadas pelo ON CONFLICT
+                self._fill_lookup_ids(cursor, [row[0] for row in cursor.execute('''
+                    SELECT s.id FROM sync_staged_transactions s CROSS JOIN transactions t ON t.id = s.id
+                    WHERE s.sync_item_id = ?
+                ''', (item_id,)).fetchall()])
+                self._monthly_rollup_apply_lookup(cursor, '-')
+                cursor.execute('INSERT OR IGNORE INTO sync_bulk_mode (active) VALUES (1)')
+                total = cursor.execute('SELECT COALESCE(SUM(tx_count), 0) FROM monthly_rollup').fetchone()[0]
+                if staged * self.BULK_SYNC_INDEX_REBUILD_RATIO >= total:
+                    dropped_indexes = self._drop_transaction_indexes(cursor)
+            cursor.execute(f'''
+                INSERT INTO transactions
+                ({self.STAGED_TRANSACTION_COLUMNS}, tx_day, tx_ts, manual_modification)
+                SELECT {self.STAGED_TRANSACTION_COLUMNS}, date(transaction_date),
+                       CAST(strftime('%s', transaction_date) AS INTEGER), 0
+                FROM sync_staged_transactions
+                WHERE sync_item_id = ?
+                ORDER BY transaction_date, id
+                ON CONFLICT(id) DO UPDATE SET
+                    account_id=excluded.account_id, account_name=excluded.account_name, amount=excluded.amount,
+                    description=excluded.description, transaction_date=excluded.transaction_date,
+                    tx_day=excluded.tx_day, tx_ts=excluded.tx_ts,
+                    category=excluded.category, type=excluded.type, item_id=excluded.item_id,
+                    connection_name=excluded.connection_name, connection_id=excluded.connection_id,
+                    content_hash=excluded.content_hash,
+                    pluggy_updated_at=excluded.pluggy_updated_at, modification_date=excluded.modification_date,
+                    conflict_detected=0, manual_modification=0
+                WHERE COALESCE(transactions.verified, 0) = 0
+            ''', (item_id,))
+            cursor.execute('DELETE FROM sync_staged_transactions WHERE sync_item_id = ?', (item_id,))
+            if bulk_mode:
+                self._recreate_transaction_indexes(cursor, dropped_indexes)
+                cursor.execute('DELETE FROM sync_bulk_mode')
+                self._monthly_rollup_apply_lookup(cursor, '+', last_rowid)
+                self._transactions_fts_refresh_lookup(cursor, last_rowid)
+                cursor.execute('DELETE FROM sync_lookup_ids')
+            conn.commit()
+            return {'success': True, 'merged': staged}
+        except Exception as e:
+            print(f"❌ Erro ao gravar transações em espera de {item_id}: {e}")
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+            return {'success': False, 'merged': 0, 'message': f'Erro ao salvar no banco de dados: {e}'}
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def record_sync_history(self, item_id: str, accounts_count: int, transactions_count: int) -> bool:
+        """Registra em sync_history uma sincronização gravada em lotes (contagens totais recebidas)"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            conn.execute('''
+                INSERT INTO sync_history (item_id, accounts_count, transactions_count, modification_date)
+                VALUES (?, ?, ?, ?)
+            ''', (item_id, accounts_count, transactions_count, get_brasilia_time()))
+            conn.commit()
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao registrar histórico de sincronização: {e}")
+            return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    CONNECTION_FIELDS = ('item_id', 'bank_name', 'status', 'oauth_url', 'expires_at', 'data_since',
+                         'created_at', 'last_updated')
+
+    def get_connections(self, status: Optional[str] = None) -> Dict[str, Dict]:
+        """Conexões cadastradas (item_id -> dados, com connection_id), na ordem de cadastro"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            sql = f"SELECT id, {', '.join(self.CONNECTION_FIELDS)} FROM connections"
+            params = ()
+            if status is not None:
+                sql += ' WHERE status = ?'
+                params = (status,)
+            rows = conn.execute(sql + ' ORDER BY id', params).fetchall()
+            return {row[1]: self._connection_row_to_dict(row) for row in rows}
+        except Exception as e:
+            print(f"❌ Erro ao carregar conexões: {e}")
+            return {}
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def get_connection(self, item_id: str) -> Optional[Dict]:
+        """Uma conexão pelo item_id (None se não cadastrada)"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            row = conn.execute(
+                f"SELECT id, {', '.join(self.CONNECTION_FIELDS)} FROM connections WHERE item_id = ?", (item_id,)
+            ).fetchone()
+            return self._connection_row_to_dict(row) if row else None
+        except Exception as e:
+            print(f"❌ Erro ao carregar conexão {item_id}: {e}")
+            return None
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def _connection_row_to_dict(self, row) -> Dict:
+        data = dict(zip(self.CONNECTION_FIELDS, row[1:]))
+        data['connection_id'] = row[0]
+        return data
+
+    def _connection_values(self, item_id: str, data: Dict) -> List:
+        """Valores de CONNECTION_FIELDS para INSERT (status padrão 'active')"""
+        values = {**data, 'item_id': item_id, 'status': data.get('status') or 'active'}
+        return [values.get(field) for field in self.CONNECTION_FIELDS]
+
+    def save_connection(self, connection: Dict) -> Optional[int]:
+        """Insere ou substitui os dados de uma conexão (mesmo id se o item_id já existir); retorna o id.
+
+        Contas e transações do item_id que estavam sem connection_id passam a apontar para ela.
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            values = self._connection_values(connection['item_id'], connection)
+            conn.execute(f'''
+                INSERT INTO connections ({', '.join(self.CONNECTION_FIELDS)})
+                VALUES ({', '.join('?' for _ in self.CONNECTION_FIELDS)})
+                ON CONFLICT (item_id) DO UPDATE SET
+                    {', '.join(f'{field} = excluded.{field}' for field in self.CONNECTION_FIELDS[1:])}
+            ''', values)
+            connection_id = conn.execute(
+                'SELECT id FROM connections WHERE item_id = ?', (connection['item_id'],)
+            ).fetchone()[0]
+            self._link_connection_rows(conn, connection['item_id'])
+            conn.commit()
+            return connection_id
+        except Exception as e:
+            print(f"❌ Erro ao salvar conexão: {e}")
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+            return None
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def import_connections(self, connections: Dict[str, Dict]) -> Optional[int]:
+        """Importação única do antigo JSON de conexões: insere as ausentes (as já cadastradas não são
+        alteradas) e preenche connection_id de contas e transações pelo item_id.
+
+        Retorna quantas entraram, ou None em caso de erro.
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            imported_at = get_brasilia_time()
+            cursor = conn.executemany(f'''
+                INSERT OR IGNORE INTO connections ({', '.join(self.CONNECTION_FIELDS)})
+                VALUES ({', '.join('?' for _ in self.CONNECTION_FIELDS)})
+            ''', [
+                # Conexões antigas sem datas recebem a da importação (a tela de conexões as exibe)
+                self._connection_values(item_id, {
+                    **data,
+                    'created_at': data.get('created_at') or imported_at,
+                    'last_updated': data.get('last_updated') or data.get('created_at') or imported_at
+                })
+                for item_id, data in connections.items()
+            ])
+            imported = cursor.rowcount
+            conn.commit()
+            for table in ('accounts', 'transactions'):
+                self._run_chunked_backfill(
+                    conn, f'{table}.connection_id', table,
+                    'connection_id = (SELECT c.id FROM connections c WHERE c.item_id = ' + table + '.item_id)',
+                    'connection_id IS NULL AND item_id IN (SELECT item_id FROM connections)'
+                )
+            return imported
+        except Exception as e:
+            print(f"❌ Erro ao importar conexões: {e}")
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+            return None
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    @staticmethod
+    def _link_connection_rows(conn: sqlite3.Connection, item_id: str):
+        """Aponta para a conexão do item_id as contas/transações dele ainda sem connection_id"""
+        for table in ('accounts', 'transactions'):
+            conn.execute(f'''
+                UPDATE {table} SET connection_id = (SELECT id FROM connections WHERE item_id = ?)
+                WHERE item_id = ? AND connection_id IS NULL
+            ''', (item_id, item_id))
+
+    def update_connection(self, item_id: str, **fields) -> bool:
+        """Atualiza campos de CONNECTION_FIELDS de uma conexão; False se ela não existe"""
+        fields = {key: value for key, value in fields.items() if key in self.CONNECTION_FIELDS[1:]}
+        if not fields:
+            return False
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.execute(
+                f"UPDATE connections SET {', '.join(f'{key} = ?' for key in fields)} WHERE item_id = ?",
+                (*fields.values(), item_id)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+        except Exception as e:
+            print(f"❌ Erro ao atualizar conexão {item_id}: {e}")
+            return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def delete_connection(self, item_id: str, remove_data: bool = False) -> Optional[Dict]:
+        """Remove a conexão; com remove_data apaga também suas contas e transações (por connection_id).
+
+        Retorna {'accounts_removed', 'transactions_removed'} ou None se a conexão não existe. Sem
+        remove_data os dados ficam no histórico com connection_id NULL.
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT id FROM connections WHERE item_id = ?', (item_id,)).fetchone()
+            if not row:
+                conn.rollback()
+                return None
+            removed = {'accounts_removed': 0, 'transactions_removed': 0}
+            if remove_data:
+                # Filhos antes das contas (foreign_keys=ON): transações e divisões que apontam para elas
+                removed['transactions_removed'] = conn.execute('''
+                    DELETE FROM transactions WHERE connection_id = ?
+                       OR account_id IN (SELECT id FROM accounts WHERE connection_id = ?)
+                ''', (row[0], row[0])).rowcount
+                conn.execute(
+                    'DELETE FROM account_splits WHERE account_id IN (SELECT id FROM accounts WHERE connection_id = ?)',
+                    (row[0],)
+                )
+                removed['accounts_removed'] = conn.execute(
+                    'DELETE FROM accounts WHERE connection_id = ?', (row[0],)
+                ).rowcount
+            conn.execute('DELETE FROM connections WHERE id = ?', (row[0],))
+            conn.commit()
+            return removed
+        except Exception as e:
+            print(f"❌ Erro ao remover conexão {item_id}: {e}")
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+            return None
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def delete_all_connections(self) -> bool:
+        """Remove todas as conexões (dados financeiros mantidos, com connection_id NULL)"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            conn.execute('DELETE FROM connections')
+            conn.commit()
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao remover conexões: {e}")
+            return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    @cached_read
+    def get_connection_stats(self) -> Dict[str, Dict]:
+        """Estatísticas de todas as conexões em uma consulta agrupada (item_id -> contas, saldo,
+        transações, primeira e última data).
+
+        As transações são agregadas pelo índice (connection_id, tx_day), sem ler a tabela.
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            rows = conn.execute('''
+                WITH tx AS (
+                    SELECT connection_id, COUNT(*) AS transactions,
+                           MIN(tx_day) AS first_transaction, MAX(tx_day) AS last_transaction
+                    FROM transactions
+                    WHERE connection_id IS NOT NULL
+                    GROUP BY connection_id
+                ),
+                acc AS (
+                    SELECT connection_id, COUNT(*) AS accounts, SUM(balance) AS total_balance
+                    FROM accounts
+                    WHERE connection_id IS NOT NULL
+                    GROUP BY connection_id
+                )
+                SELECT c.item_id, c.id, COALESCE(acc.accounts, 0), COALESCE(acc.total_balance, 0),
+                       COALESCE(tx.transactions, 0), tx.first_transaction, tx.last_transaction
+                FROM connections c
+                LEFT JOIN acc ON acc.connection_id = c.id
+                LEFT JOIN tx ON tx.connection_id = c.id
+                ORDER BY c.id
+            ''').fetchall()
+            return {
+                row[0]: {
+                    'connection_id': row[1],
+                    'accounts': row[2],
+                    'total_balance': row[3],
+                    'transactions': row[4],
+                    'first_transaction': row[5],
+                    'last_transaction': row[6]
+                }
+                for row in rows
+            }
+        except Exception as e:
+            print(f"❌ Erro ao buscar estatísticas das conexões: {e}")
+            return {}
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def get_sync_watermarks(self, item_id: str) -> Dict[str, Dict]:
+        """Retorna as marcas d'água de sincronização das contas de uma conexão, por account_id"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            rows = conn.execute('''
+                SELECT account_id, last_transaction_date, data_since, last_synced_at, last_full_sync_at
+                FROM sync_watermarks WHERE item_id = ?
+            ''', (item_id,)).fetchall()
+            return {
+                row[0]: {
+                    'last_transaction_date': row[1],
+                    'data_since': row[2],
+                    'last_synced_at': row[3],
+                    'last_full_sync_at': row[4]
+                }
+                for row in rows
+            }
+        except Exception as e:
+            print(f"❌ Erro ao carregar marcas d'água de sincronização: {e}")
+            return {}
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def save_sync_watermarks(self, item_id: str, watermarks: List[Dict]) -> bool:
+        """Grava as marcas d'água de uma conexão após a persistência da sincronização.
+
+        Cada item: account_id, last_transaction_date (YYYY-MM-DD ou None), data_since e full
+        (True quando a busca foi completa). Em busca incremental a data só avança; numa
+        reconciliação completa passa a ser a data observada.
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            now = get_brasilia_time()
+            conn.executemany('''
+                INSERT INTO sync_watermarks
+                    (item_id, account_id, last_transaction_date, data_since, last_synced_at, last_full_sync_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (item_id, account_id) DO UPDATE SET
+                    last_transaction_date = CASE
+                        WHEN excluded.last_full_sync_at IS NOT NULL THEN excluded.last_transaction_date
+                        WHEN sync_watermarks.last_transaction_date IS NULL
+                             OR excluded.last_transaction_date > sync_watermarks.last_transaction_date
+                        THEN excluded.last_transaction_date
+                        ELSE sync_watermarks.last_transaction_date
+                    END,
+                    data_since = excluded.data_since,
+                    last_synced_at = excluded.last_synced_at,
+                    last_full_sync_at = COALESCE(excluded.last_full_sync_at, sync_watermarks.last_full_sync_at)
+            ''', [
+                (item_id, w['account_id'], w.get('last_transaction_date'), w.get('data_since'), now,
+                 now if w.get('full') else None)
+                for w in watermarks
+            ])
+            conn.commit()
+            return True
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            print(f"❌ Erro ao gravar marcas d'água de sincronização: {e}")
+            return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    # ========================================
+    #  JOBS DE SINCRONIZAÇÃO (sync_worker)
+    # ========================================
+    # status: queued -> running -> succeeded | failed
+    SYNC_JOB_FIELDS = ('status', 'phase', 'pages_fetched', 'rows_written', 'message',
+                       'result_json', 'timings_json', 'started_at', 'finished_at')
+
+    def enqueue_sync_job(self, kind: str, item_id: str = None, stale_seconds: int = 60) -> tuple[Optional[str], bool]:
+        """Enfileira um job de sincronização ('all', 'connection' ou 'connection_full'); retorna (job_id, anexado).
+
+        Se já houver job equivalente na fila ou em execução (um 'all' cobre qualquer conexão),
+        devolve o id dele com anexado=True em vez de criar outro. Jobs 'running' sem heartbeat
+        há stale_seconds são encerrados antes, para não anexar a um worker que caiu.
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute('BEGIN IMMEDIATE')
+            self._fail_stale_sync_jobs(conn, stale_seconds)
+            if kind == 'all':
+                row = conn.execute('''
+                    SELECT id FROM sync_jobs WHERE status IN ('queued', 'running') AND kind = 'all'
+                    ORDER BY created_at LIMIT 1
+                ''').fetchone()
+            else:
+                row = conn.execute('''
+                    SELECT id FROM sync_jobs WHERE status IN ('queued', 'running') AND (kind = 'all' OR item_id = ?)
+                    ORDER BY created_at LIMIT 1
+                ''', (item_id,)).fetchone()
+            if row:
+                conn.commit()
+                return row[0], True
+            job_id = uuid.uuid4().hex
+            now = get_brasilia_time()
+            conn.execute('''
+                INSERT INTO sync_jobs (id, kind, item_id, status, phase, created_at, updated_at)
+                VALUES (?, ?, ?, 'queued', 'na fila', ?, ?)
+            ''', (job_id, kind, item_id, now, now))
+            conn.commit()
+            return job_id, False
+        except Exception as e:
+            print(f"❌ Erro ao criar job de sincronização: {e}")
+            return None, False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def claim_next_sync_job(self) -> Optional[Dict]:
+        """Marca como 'running' e retorna o job mais antigo da fila (None se vazia).
+
+        BEGIN IMMEDIATE garante que dois workers (threads ou processos) não peguem o mesmo job.
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('''
+                SELECT id FROM sync_jobs WHERE status = 'queued' ORDER BY created_at, rowid LIMIT 1
+            ''').fetchone()
+            if not row:
+                conn.rollback()
+                return None
+            now = get_brasilia_time()
+            conn.execute('''
+                UPDATE sync_jobs SET status = 'running', phase = 'iniciando', started_at = ?, updated_at = ?
+                WHERE id = ?
+            ''', (now, now, row[0]))
+            conn.commit()
+            return self.get_sync_job(row[0])
+        except Exception as e:
+            print(f"❌ Erro ao obter próximo job de sincronização: {e}")
+            return None
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def update_sync_job(self, job_id: str, **fields) -> bool:
+        """Atualiza campos de um job (ver SYNC_JOB_FIELDS); result/timings podem ser dicts"""
+        conn = None
+        try:
+            for key in ('result', 'timings'):
+                if key in fields:
+                    fields[f'{key}_json'] = json.dumps(fields.pop(key), ensure_ascii=False)
+            columns = [name for name in fields if name in self.SYNC_JOB_FIELDS]
+            if not columns:
+                return False
+            conn = self._get_connection()
+            conn.execute(
+                f"UPDATE sync_jobs SET {', '.join(f'{name} = ?' for name in columns)}, updated_at = ? WHERE id = ?",
+                [fields[name] for name in columns] + [get_brasilia_time(), job_id]
+            )
+            conn.commit()
+            return True
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            print(f"❌ Erro ao atualizar job de sincronização {job_id}: {e}")
+            return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def get_sync_job(self, job_id: str) -> Optional[Dict]:
+        """Retorna um job de sincronização (result e timings já decodificados) ou None"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM sync_jobs WHERE id = ?', (job_id,)).fetchone()
+            if not row:
+                return None
+            job = dict(row)
+            job['result'] = json.loads(job.pop('result_json') or 'null')
+            job['timings'] = json.loads(job.pop('timings_json') or '{}')
+            return job
+        except Exception as e:
+            print(f"❌ Erro ao carregar job de sincronização {job_id}: {e}")
+            return None
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def get_latest_sync_job_id(self) -> Optional[str]:
+        """Id do job de sincronização mais recente (None se não houver)"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            row = conn.execute('SELECT id FROM sync_jobs ORDER BY created_at DESC, rowid DESC LIMIT 1').fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            print(f"❌ Erro ao carregar último job de sincronização: {e}")
+            return None
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    @staticmethod
+    def _fail_stale_sync_jobs(conn: sqlite3.Connection, stale_seconds: int) -> int:
+        """Marca como 'failed' jobs 'running' sem heartbeat (updated_at) há stale_seconds"""
+        limit = (datetime.strptime(get_brasilia_time(), '%Y-%m-%d %H:%M:%S')
+                 - timedelta(seconds=stale_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+        now = get_brasilia_time()
+        cursor = conn.execute('''
+            UPDATE sync_jobs
+            SET status = 'failed', phase = 'interrompido', finished_at = ?, updated_at = ?,
+                message = 'Sincronização interrompida (worker encerrado antes de concluir)'
+            WHERE status = 'running' AND updated_at < ?
+        ''', (now, now, limit))
+        return cursor.rowcount
+
+    def fail_stale_sync_jobs(self, stale_seconds: int) -> int:
+        """Encerra jobs cujo worker parou de enviar heartbeat (processo encerrado no meio do job)"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            count = self._fail_stale_sync_jobs(conn, stale_seconds)
+            conn.commit()
+            return count
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            print(f"❌ Erro ao encerrar jobs de sincronização interrompidos: {e}")
+            return 0
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    # ========================================
+    #  PERFIL DE REFRESH POR CONECTOR
+    # ========================================
+    # Peso da nova amostra na média móvel exponencial do tempo até o refresh ficar pronto
+    REFRESH_PROFILE_EWMA_WEIGHT = 0.3
+
+    def get_connector_refresh_profile(self, connector_id: str) -> Optional[Dict]:
+        """Retorna o perfil de refresh do conector (tempos em segundos) ou None"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM connector_refresh_profile WHERE connector_id = ?', (connector_id,)).fetchone()
+            return dict(row) if row else None
+        except Exception as e:
+            print(f"❌ Erro ao carregar perfil de refresh do conector {connector_id}: {e}")
+            return None
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+    def record_connector_refresh(self, connector_id: str, connector_name: str, seconds: float, outcome: str) -> bool:
+        """Registra um refresh concluído (outcome SUCCESS, ERROR ou TIMEOUT).
+
+        Só refreshes com SUCCESS entram nas estatísticas de tempo (média móvel, último e máximo).
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            ready = seconds if outcome == 'SUCCESS' else None
+            conn.execute('''
+                INSERT INTO connector_refresh_profile
+                    (connector_id, connector_name, samples, avg_ready_seconds, last_ready_seconds,
+                     max_ready_seconds, last_outcome, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (connector_id) DO UPDATE SET
+                    connector_name = excluded.connector_name,
+                    samples = connector_refresh_profile.samples + excluded.samples,
+                    avg_ready_seconds = CASE
+                        WHEN excluded.last_ready_seconds IS NULL THEN connector_refresh_profile.avg_ready_seconds
+                        WHEN connector_refresh_profile.avg_ready_seconds IS NULL THEN excluded.last_ready_seconds
+                        ELSE connector_refresh_profile.avg_ready_seconds * (1 - ?) + excluded.last_ready_seconds * ?
+                    END,
+                    last_ready_seconds = COALESCE(excluded.last_ready_seconds, connector_refresh_profile.last_ready_seconds),
+                    max_ready_seconds = MAX(COALESCE(connector_refresh_profile.max_ready_seconds, 0),
+                                            COALESCE(excluded.last_ready_seconds, 0)),
+                    last_outcome = excluded.last_outcome,
+                    updated_at = excluded.updated_at
+            ''', (connector_id, connector_name, 1 if ready is not None else 0, ready, ready, ready, outcome,
+                  get_brasilia_time(), self.REFRESH_PROFILE_EWMA_WEIGHT, self.REFRESH_PROFILE_EWMA_WEIGHT))
+            conn.commit()
             return True
-            
         except Exception as e:
-            print(f"Γ¥î Erro na sincroniza├º├úo incremental: {e}")
+            if conn is not None:
+                conn.rollback()
+            print(f"❌ Erro ao registrar refresh do conector {connector_id}: {e}")
             return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
-    def save_sync_data_incremental_with_stats(self, item_id: str, accounts: List[Dict], transactions: List[Dict]) -> Dict:
-        """Salva dados de sincroniza├º├úo de forma incremental e retorna estat├¡sticas detalhadas"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Usar hor├írio de Bras├¡lia
-            current_timestamp = get_brasilia_time()
-            
-            # Registra a sincroniza├º├úo
-            cursor.execute('''
-                INSERT INTO sync_history (item_id, accounts_count, transactions_count, modification_date)
-                VALUES (?, ?, ?, ?)
-            ''', (item_id, len(accounts), len(transactions), current_timestamp))
-            
-            # Estat├¡sticas para retorno
-            stats = {
-                'accounts_inserted': 0,
-                'accounts_updated': 0,
-                'accounts_unchanged': 0,
-                'transactions_inserted': 0,
-                'transactions_updated': 0,
-                'transactions_unchanged': 0
-            }
-            
-            # -------------------------------------------------------------
-            # OTIMIZAÇÃO: Pré-carrega contas e transações existentes
-            # -------------------------------------------------------------
-            account_ids = [a.get('id') for a in accounts if a.get('id')]
-            existing_accounts = {}
-            if account_ids:
-                # Busca todas as contas existentes de uma vez
-                placeholders = ','.join('?' * len(account_ids))
-                cursor.execute(f'SELECT id, name, balance, currency_code FROM accounts WHERE id IN ({placeholders})', account_ids)
-                for row in cursor.fetchall():
-                    existing_accounts[row[0]] = {
-                        'name': row[1],
-                        'balance': row[2],
-                        'currency_code': row[3]
-                    }
-
-            # Processa contas incrementalmente
-            for account in accounts:
-                account_id = account.get('id')
-                if not account_id:
-                    continue
-                existing = existing_accounts.get(account_id)
-                new_name = account.get('name')
-                new_balance = account.get('balance', 0)
-                new_currency = account.get('currencyCode', 'BRL')
-                if existing:
-                    has_changes = (
-                        existing['name'] != new_name or
-                        abs((existing['balance'] or 0) - new_balance) > 0.01 or
-                        existing['currency_code'] != new_currency
-                    )
-                    if has_changes:
-                        cursor.execute('''
-                            UPDATE accounts
-                            SET name=?, type=?, subtype=?, balance=?, currency_code=?,
-                                item_id=?, connection_name=?, modification_date=?
-                            WHERE id=?
-                        ''', (
-                            new_name, account.get('type'), account.get('subtype'), new_balance, new_currency,
-                            account.get('item_id', item_id),  # Usa item_id da conta se existir
-                            account.get('connection_name', 'N/A'), current_timestamp, account_id
-                        ))
-                        stats['accounts_updated'] += 1
-                    else:
-                        stats['accounts_unchanged'] += 1
-                else:
-                    cursor.execute('''
-                        INSERT INTO accounts
-                        (id, name, type, subtype, balance, currency_code, item_id, connection_name, creation_date, modification_date)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        account_id, new_name, account.get('type'), account.get('subtype'), new_balance, new_currency,
-                        account.get('item_id', item_id), account.get('connection_name', 'N/A'), current_timestamp, current_timestamp
-                    ))
-                    stats['accounts_inserted'] += 1
-
-            # Pré-carrega transações existentes em lotes para reduzir SELECT por transação
-            transaction_ids = [t.get('id') for t in transactions if t.get('id')]
-            existing_transactions = {}
-            if transaction_ids:
-                # SQLite limite de 999 parâmetros por instrução - processa em chunks
-                for i in range(0, len(transaction_ids), 900):
-                    chunk = transaction_ids[i:i+900]
-                    placeholders = ','.join('?' * len(chunk))
-                    cursor.execute(
-                        f'SELECT id, amount, description, transaction_date, verified, type, category FROM transactions WHERE id IN ({placeholders})',
-                        chunk
-                    )
-                    for row in cursor.fetchall():
-                        existing_transactions[row[0]] = {
-                            'amount': row[1],
-                            'description': row[2],
-                            'transaction_date': row[3],
-                            'verified': row[4],
-                            'type': row[5],
-                            'category': row[6]
-                        }
+    def save_connector_refresh_endpoints(self, connector_id: str, connector_name: str, refresh_endpoint: Optional[str],
+                                         failed_endpoints: Dict, probed: bool) -> bool:
+        """Grava os endpoints de refresh do conector (failed_endpoints: ação -> status HTTP).
 
-            for transaction in transactions:
-                transaction_id = transaction.get('id')
-                if not transaction_id:
-                    continue
-                existing = existing_transactions.get(transaction_id)
-                new_amount = abs(transaction.get('amount', 0) or 0)
-                new_description = transaction.get('description')
-                new_date_raw = transaction.get('date')
-                new_type = transaction.get('type')
-                new_category = transaction.get('category')
-                # Converte data apenas uma vez
-                new_date_converted = convert_iso_to_standard_format(new_date_raw)
+        probed=True registra uma verificação completa (reinicia o prazo de nova verificação).
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            now = get_brasilia_time()
+            conn.execute('''
+                INSERT INTO connector_refresh_profile
+                    (connector_id, connector_name, refresh_endpoint, failed_endpoints, endpoints_probed_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (connector_id) DO UPDATE SET
+                    connector_name = excluded.connector_name,
+                    refresh_endpoint = excluded.refresh_endpoint,
+                    failed_endpoints = excluded.failed_endpoints,
+                    endpoints_probed_at = COALESCE(excluded.endpoints_probed_at, connector_refresh_profile.endpoints_probed_at),
+                    updated_at = excluded.updated_at
+            ''', (connector_id, connector_name, refresh_endpoint, json.dumps(failed_endpoints),
+                  now if probed else None, now))
+            conn.commit()
+            return True
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            print(f"❌ Erro ao gravar endpoints de refresh do conector {connector_id}: {e}")
+            return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
-                if existing:
-                    is_verified = existing.get('verified', 0)
-                    existing_amount = existing.get('amount', 0)
-                    existing_description = existing.get('description')
-                    existing_date = existing.get('transaction_date')
-                    existing_type = existing.get('type')
-                    existing_category = existing.get('category')
+    # ========================================
+    #  LEASES DE SINCRONIZAÇÃO POR CONEXÃO
+    # ========================================
+    def acquire_sync_lease(self, item_id: str, owner: str, ttl_seconds: float, job_id: str = None) -> Optional[Dict]:
+        """Tenta obter a lease de sincronização da conexão.
 
-                    existing_date_normalized = normalize_date_for_comparison(existing_date)
-                    new_date_normalized = normalize_date_for_comparison(new_date_converted)
+        Retorna None se a lease foi obtida (livre, expirada ou já deste dono) ou a lease vigente
+        de outro dono (item_id, job_id, owner, expires_at).
+        """
+        conn = None
+        try:
+            conn = self._get_connection()
+            now = time.time()
+            cursor = conn.execute('''
+                INSERT INTO sync_leases (item_id, job_id, owner, acquired_at, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (item_id) DO UPDATE SET
+                    job_id = excluded.job_id,
+                    owner = excluded.owner,
+                    acquired_at = excluded.acquired_at,
+                    expires_at = excluded.expires_at
+                WHERE sync_leases.expires_at < ? OR sync_leases.owner = excluded.owner
+            ''', (item_id, job_id, owner, get_brasilia_time(), now + ttl_seconds, now))
+            holder = None
+            if cursor.rowcount != 1:
+                row = conn.execute(
+                    'SELECT item_id, job_id, owner, expires_at FROM sync_leases WHERE item_id = ?', (item_id,)
+                ).fetchone()
+                if row:
+                    holder = {'item_id': row[0], 'job_id': row[1], 'owner': row[2], 'expires_at': row[3]}
+            conn.commit()
+            return holder
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            # Sem como verificar: segue com a sincronização (comportamento anterior às leases)
+            print(f"⚠️ Erro ao obter lease de sincronização de {item_id}: {e}")
+            return None
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
-                    if is_verified:
-                        has_conflicts = (
-                            abs(existing_amount - new_amount) > 0.01 or
-                            existing_description != new_description or
-                            existing_date_normalized != new_date_normalized or
-                            existing_type != new_type or
-                            existing_category != new_category
-                        )
-                        if has_conflicts:
-                            conflict_log = generate_conflict_log(
-                                {
-                                    'amount': existing_amount,
-                                    'description': existing_description,
-                                    'date': existing_date,
-                                    'type': existing_type,
-                                    'category': existing_category
-                                },
-                                {
-                                    'amount': new_amount,
-                                    'description': new_description,
-                                    'date': new_date_converted,
-                                    'type': new_type,
-                                    'category': new_category
-                                }
-                            )
-                            cursor.execute('''
-                                UPDATE transactions
-                                SET conflict_detected = 1, conflict_log = ?
-                                WHERE id = ?
-                            ''', (conflict_log, transaction_id))
-                            stats['conflicts_detected'] = stats.get('conflicts_detected', 0) + 1
-                        stats['transactions_unchanged'] += 1
-                        continue
+    def renew_sync_leases(self, owner: str, ttl_seconds: float, job_id: str = None) -> bool:
+        """Heartbeat: prorroga as leases do dono e marca o job como vivo (updated_at)"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            conn.execute('UPDATE sync_leases SET expires_at = ? WHERE owner = ?', (time.time() + ttl_seconds, owner))
+            if job_id:
+                conn.execute(
+                    "UPDATE sync_jobs SET updated_at = ? WHERE id = ? AND status = 'running'",
+                    (get_brasilia_time(), job_id)
+                )
+            conn.commit()
+            return True
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            print(f"⚠️ Erro ao renovar leases de sincronização: {e}")
+            return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
-                    # Não verificada - verifica mudanças
-                    has_changes = (
-                        abs(existing_amount - new_amount) > 0.01 or
-                        existing_description != new_description or
-                        existing_date_normalized != new_date_normalized or
-                        existing_type != new_type or
-                        existing_category != new_category
-                    )
-                    if has_changes:
-                        cursor.execute('''
-                            UPDATE transactions
-                            SET account_id=?, account_name=?, amount=?, description=?, transaction_date=?,
-                                category=?, type=?, item_id=?, connection_name=?, modification_date=?,
-                                conflict_detected=0, manual_modification=0
-                            WHERE id=?
-                        ''', (
-                            transaction.get('accountId'), transaction.get('account_name'), new_amount, new_description,
-                            new_date_converted, new_category, new_type,
-                            transaction.get('item_id', item_id), transaction.get('connection_name', 'N/A'),
-                            current_timestamp, transaction_id
-                        ))
-                        stats['transactions_updated'] += 1
-                    else:
-                        stats['transactions_unchanged'] += 1
-                else:
-                    cursor.execute('''
-                        INSERT INTO transactions
-                        (id, account_id, account_name, amount, description, transaction_date, category, type, item_id, connection_name, creation_date, modification_date, manual_modification)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
-                    ''', (
-                        transaction_id, transaction.get('accountId'), transaction.get('account_name'), new_amount,
-                        new_description, new_date_converted, new_category, new_type,
-                        transaction.get('item_id', item_id), transaction.get('connection_name', 'N/A'),
-                        current_timestamp, current_timestamp
-                    ))
-                    stats['transactions_inserted'] += 1
-            
+    def release_sync_leases(self, owner: str, item_id: str = None) -> bool:
+        """Libera as leases do dono (todas ou só a da conexão informada)"""
+        conn = None
+        try:
+            conn = self._get_connection()
+            if item_id is None:
+                conn.execute('DELETE FROM sync_leases WHERE owner = ?', (owner,))
+            else:
+                conn.execute('DELETE FROM sync_leases WHERE owner = ? AND item_id = ?', (owner, item_id))
             conn.commit()
-            conn.close()
-            
-            # Log detalhado da sincroniza├º├úo incremental
-            connections_processed = len(set(t.get('connection_name', 'N/A') for t in transactions)) if transactions else 0
-            print(f"≡ƒôè Sincroniza├º├úo incremental conclu├¡da: {connections_processed} conex├╡es processadas")
-            print(f"   ≡ƒÆ│ Contas: {stats['accounts_inserted']} novas, {stats['accounts_updated']} atualizadas, {stats['accounts_unchanged']} inalteradas")
-            print(f"   ≡ƒÆ░ Transa├º├╡es: {stats['transactions_inserted']} novas, {stats['transactions_updated']} atualizadas, {stats['transactions_unchanged']} inalteradas")
-            if stats.get('conflicts_detected', 0) > 0:
-                print(f"   ΓÜá∩╕Å Conflitos: {stats['conflicts_detected']} transa├º├╡es com conflitos detectados")
-            
-            return {
-                'success': True,
-                'stats': stats,
-                'message': 'Sincroniza├º├úo incremental conclu├¡da com sucesso'
-            }
-            
+            return True
         except Exception as e:
-            print(f"Γ¥î Erro na sincroniza├º├úo incremental: {e}")
-            return {
-                'success': False,
-                'message': f'Erro na sincroniza├º├úo: {e}',
-                'stats': {}
-            }
+            if conn is not None:
+                conn.rollback()
+            print(f"⚠️ Erro ao liberar leases de sincronização: {e}")
+            return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     def update_transaction_verification(self, transaction_id: str, verified_status: int) -> bool:
         """
@@ -1605,7 +3791,7 @@ class Database:
         conn = None
         cursor = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             brasilia_time = get_brasilia_time()
@@ -1626,7 +3812,7 @@ class Database:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                self._release_connection(conn)
 
     def update_transaction_ignore_status(self, transaction_id: str, ignore_status: int) -> bool:
         """
@@ -1635,7 +3821,7 @@ class Database:
         conn = None
         cursor = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             brasilia_time = get_brasilia_time()
@@ -1656,7 +3842,7 @@ class Database:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                self._release_connection(conn)
 
     # ========================================
     # MÉTODOS PARA GERENCIAMENTO DE CONTAS MANUAIS
@@ -1666,7 +3852,7 @@ class Database:
                             balance: float = 0.0, currency_code: str = 'BRL') -> str:
         """Cria uma nova conta manual"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Gerar ID único para conta manual
@@ -1695,12 +3881,12 @@ class Database:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                self._release_connection(conn)
     
     def update_manual_account(self, account_id: str, **kwargs) -> bool:
         """Atualiza uma conta manual"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Verificar se é conta manual
@@ -1751,12 +3937,12 @@ class Database:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                self._release_connection(conn)
     
     def delete_manual_account_with_transactions(self, account_id: str) -> tuple[bool, str]:
         """Exclui uma conta manual e todas as suas transações"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Verificar se é conta manual
@@ -1783,7 +3969,8 @@ class Database:
                 cursor.execute('DELETE FROM transactions WHERE account_id = ?', (account_id,))
                 print(f"✅ {transaction_count} transação(ões) excluída(s) da conta {account_name}")
             
-            # Excluir a conta
+            # Excluir a conta (e sua divisão, referenciada por chave estrangeira)
+            cursor.execute('DELETE FROM account_splits WHERE account_id = ?', (account_id,))
             cursor.execute('DELETE FROM accounts WHERE id = ?', (account_id,))
             conn.commit()
             
@@ -1805,12 +3992,12 @@ class Database:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                self._release_connection(conn)
     
     def get_account_transaction_count(self, account_id: str) -> int:
         """Obtém a contagem de transações de uma conta"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -1827,12 +4014,12 @@ class Database:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                self._release_connection(conn)
     
     def delete_manual_account(self, account_id: str) -> bool:
         """Exclui uma conta manual (apenas se não houver transações)"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Verificar se é conta manual
@@ -1856,7 +4043,8 @@ class Database:
                 print(f"❌ Não é possível excluir conta {account[0]} - possui {transaction_count} transações")
                 return False
             
-            # Excluir a conta
+            # Excluir a conta (e sua divisão, referenciada por chave estrangeira)
+            cursor.execute('DELETE FROM account_splits WHERE account_id = ?', (account_id,))
             cursor.execute('DELETE FROM accounts WHERE id = ?', (account_id,))
             conn.commit()
             
@@ -1874,12 +4062,12 @@ class Database:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                self._release_connection(conn)
     
     def get_account_by_id(self, account_id: str) -> Dict:
         """Obtém uma conta específica por ID"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -1918,12 +4106,12 @@ class Database:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                self._release_connection(conn)
     
     def get_account_types(self) -> List[str]:
         """Obtém lista de tipos de conta únicos"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -1941,7 +4129,7 @@ class Database:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                self._release_connection(conn)
     
     def create_manual_transaction(self, account_id: str, amount: float, description: str, 
                                 transaction_date: str, category: str = None, 
@@ -1971,22 +4159,24 @@ class Database:
             # NOVO PADRÃO: armazenar sempre valor absoluto; direção no campo type
             amount = abs(amount)
             
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Inserir transação
             cursor.execute('''
                 INSERT INTO transactions (
-                    id, account_id, amount, description, transaction_date, 
+                    id, account_id, amount, description, transaction_date, tx_day, tx_ts,
                     category, type, item_id, connection_name, verified, 
                     ignorar_transacao, manual_modification, creation_date, modification_date
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                ) VALUES (?, ?, ?, ?, ?, date(?), CAST(strftime('%s', ?) AS INTEGER), ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
             ''', (
                 transaction_id,
                 account_id,
                 amount,
                 description,
                 transaction_date,
+                transaction_date,
+                transaction_date,
                 category,
                 transaction_type,
                 'manual',
@@ -2011,7 +4201,7 @@ class Database:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                self._release_connection(conn)
     
     def delete_transaction(self, transaction_id: str) -> tuple[bool, str]:
         """
@@ -2024,7 +4214,7 @@ class Database:
             Tupla (sucesso: bool, mensagem: str)
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Verificar se a transação existe
@@ -2059,12 +4249,13 @@ class Database:
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
+                self._release_connection(conn)
 
     # ========================================
     # MÉTODOS PARA GERENCIAR CATEGORIAS
     # ========================================
     
+    @cached_read
     def get_user_categories(self, transaction_type: str = None, active_only: bool = True) -> List[Dict]:
         """
         Busca categorias criadas pelo usuário
@@ -2076,8 +4267,9 @@ class Database:
         Returns:
             Lista de categorias com suas subcategorias
         """
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             query = '''
@@ -2114,12 +4306,14 @@ class Database:
                     'modification_date': row[9]
                 })
             
-            conn.close()
             return categories
             
         except Exception as e:
             print(f"❌ Erro ao buscar categorias: {e}")
             return []
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
     
     def create_user_category(self, name: str, transaction_type: str, subcategory: str = None, 
                            description: str = None, color: str = None, icon: str = None) -> int:
@@ -2137,8 +4331,9 @@ class Database:
         Returns:
             ID da categoria criada ou None se houver erro
         """
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             current_timestamp = get_brasilia_time()
@@ -2160,17 +4355,23 @@ class Database:
             
             category_id = cursor.lastrowid
             conn.commit()
-            conn.close()
             
             print(f"✅ Categoria criada: {name}" + (f" > {subcategory}" if subcategory else ""))
             return category_id
             
         except sqlite3.IntegrityError as e:
+            if conn is not None:
+                conn.rollback()
             print(f"❌ Categoria já existe: {name}" + (f" > {subcategory}" if subcategory else ""))
             return None
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"❌ Erro ao criar categoria: {e}")
             return None
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
     
     def update_user_category(self, category_id: int, **kwargs) -> bool:
         """
@@ -2183,8 +4384,9 @@ class Database:
         Returns:
             True se atualizado com sucesso
         """
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Campos permitidos para atualização
@@ -2211,13 +4413,17 @@ class Database:
             
             success = cursor.rowcount > 0
             conn.commit()
-            conn.close()
             
             return success
             
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"❌ Erro ao atualizar categoria: {e}")
             return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
     
     def delete_user_category(self, category_id: int) -> tuple[bool, str]:
         """
@@ -2229,8 +4435,9 @@ class Database:
         Returns:
             Tupla (sucesso: bool, mensagem: str)
         """
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Verificar se a categoria existe
@@ -2251,15 +4458,19 @@ class Database:
                 return False, "Nenhuma categoria foi excluída"
             
             conn.commit()
-            conn.close()
             
             print(f"✅ Categoria '{category_display}' foi excluída com sucesso!")
             return True, f"Categoria '{category_display}' foi excluída com sucesso!"
             
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             error_msg = f"Erro ao excluir categoria: {e}"
             print(f"❌ {error_msg}")
             return False, error_msg
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
     
     def get_categories_grouped(self, transaction_type: str = None) -> Dict:
         """
@@ -2433,8 +4644,9 @@ class Database:
         - Atualiza modification_date usando horário de Brasília (YYYY-MM-DD HH:MM:SS).
         - Mantém valores existentes quando o parâmetro correspondente é None (atualização parcial).
         """
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
 
             # Usar horário de Brasília conforme padrão do projeto
@@ -2452,13 +4664,17 @@ class Database:
 
             conn.commit()
             rows_affected = cursor.rowcount
-            conn.close()
 
             return rows_affected > 0
 
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"❌ Erro ao atualizar categoria da transação: {e}")
             return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     # ==========================
     #  DIVISÃO - PERCENTUAIS
@@ -2470,6 +4686,7 @@ class Database:
         - Garante limites 0..100 e que a soma seja 100 (ajuste fino com 2 casas).
         - Atualiza modification_date com horário de Brasília.
         """
+        conn = None
         try:
             if not transaction_id:
                 return False
@@ -2484,7 +4701,7 @@ class Database:
             if abs((p1 + p2) - 100.0) > 0.01:
                 p2 = round(100.0 - p1, 2)
 
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             current_timestamp = get_brasilia_time()
             cursor.execute('''
@@ -2494,33 +4711,42 @@ class Database:
             ''', (p1, p2, current_timestamp, transaction_id))
             conn.commit()
             updated = cursor.rowcount > 0
-            conn.close()
             return updated
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"❌ Erro ao atualizar divisão da transação {transaction_id}: {e}")
             return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
+    @cached_read
     def get_division_user_names(self) -> Dict:
         """Obtém os nomes configurados para Usuário 1 e Usuário 2."""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             cursor.execute('SELECT user1_name, user2_name FROM division_settings WHERE id = 1')
             row = cursor.fetchone()
-            conn.close()
             if not row:
                 return {'user1_name': 'Usuário 1', 'user2_name': 'Usuário 2'}
             return {'user1_name': row[0] or 'Usuário 1', 'user2_name': row[1] or 'Usuário 2'}
         except Exception as e:
             print(f"❌ Erro ao obter nomes da divisão: {e}")
             return {'user1_name': 'Usuário 1', 'user2_name': 'Usuário 2'}
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     def update_division_user_names(self, user1_name: str, user2_name: str) -> bool:
         """Atualiza os nomes dos usuários da divisão."""
+        conn = None
         try:
             user1_name = (user1_name or 'Usuário 1').strip()
             user2_name = (user2_name or 'Usuário 2').strip()
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             current_timestamp = get_brasilia_time()
             cursor.execute('''
@@ -2532,16 +4758,21 @@ class Database:
                     modification_date = excluded.modification_date
             ''', (user1_name, user2_name, current_timestamp, current_timestamp))
             conn.commit()
-            conn.close()
             return True
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"❌ Erro ao atualizar nomes da divisão: {e}")
             return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     def get_accounts_with_splits(self) -> List[Dict]:
         """Retorna contas com percentuais de divisão (default 50/50 se não definido)."""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute('''
@@ -2553,14 +4784,17 @@ class Database:
                 ORDER BY a.name COLLATE NOCASE
             ''')
             rows = cursor.fetchall()
-            conn.close()
             return [dict(row) for row in rows]
         except Exception as e:
             print(f"❌ Erro ao obter contas com divisões: {e}")
             return []
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     def upsert_account_split(self, account_id: str, user1_percent: float, user2_percent: float | None = None) -> bool:
         """Insere/atualiza percentuais de divisão para uma conta."""
+        conn = None
         try:
             if not account_id:
                 return False
@@ -2576,7 +4810,7 @@ class Database:
             if abs((p1 + p2) - 100.0) > 0.01:
                 p2 = round(100.0 - p1, 2)
 
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             current_timestamp = get_brasilia_time()
             cursor.execute('''
@@ -2588,11 +4822,15 @@ class Database:
                     modification_date = excluded.modification_date
             ''', (account_id, p1, p2, current_timestamp, current_timestamp))
             conn.commit()
-            conn.close()
             return True
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"❌ Erro ao salvar divisão da conta {account_id}: {e}")
             return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     # ========================================
     #  MAPEAMENTO DE CATEGORIAS (DE-PARA)
@@ -2602,8 +4840,9 @@ class Database:
 
         Retorna lista de categorias (dict) recém inseridas que ainda precisam de classificação.
         """
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT DISTINCT category, type FROM transactions
@@ -2611,7 +4850,6 @@ class Database:
             ''')
             existing_categories = cursor.fetchall()
             if not existing_categories:
-                conn.close()
                 return []
 
             # Buscar já mapeadas
@@ -2630,16 +4868,21 @@ class Database:
                     new_rows.append({'source_category': cat, 'transaction_type': ttype})
             if new_rows:
                 conn.commit()
-            conn.close()
             return new_rows
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"❌ Erro ao reconciliar mapeamentos de categorias: {e}")
             return []
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     def get_category_mappings(self) -> list[dict]:
         """Retorna todos os mapeamentos de categorias (API -> usuário)."""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute('''
@@ -2649,21 +4892,24 @@ class Database:
                 ORDER BY source_category COLLATE NOCASE
             ''')
             rows = [dict(r) for r in cursor.fetchall()]
-            conn.close()
             return rows
         except Exception as e:
             print(f"❌ Erro ao buscar category_mappings: {e}")
             return []
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     def update_category_mapping(self, source_category: str, transaction_type: str | None, mapped_user_category: str | None, mapped_user_subcategory: str | None) -> bool:
         """Atualiza (ou cria) mapeamento de uma categoria da API para categoria/subcategoria do usuário.
 
         Se mapped_user_category for None ou vazio, marca needs_classification=1.
         """
+        conn = None
         try:
             if not source_category:
                 return False
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             now_ts = get_brasilia_time()
             needs = 0 if (mapped_user_category and mapped_user_category.strip()) else 1
@@ -2678,31 +4924,40 @@ class Database:
             ''', (source_category, transaction_type, mapped_user_category, mapped_user_subcategory, needs, now_ts, now_ts))
             conn.commit()
             ok = cursor.rowcount > 0
-            conn.close()
             return ok
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"❌ Erro ao atualizar category_mapping: {e}")
             return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
+    @cached_read
     def count_unmapped_categories(self) -> int:
         """Retorna quantidade de categorias de API ainda não classificadas."""
+        conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             cursor.execute('SELECT COUNT(*) FROM category_mappings WHERE needs_classification = 1')
             count = cursor.fetchone()[0]
-            conn.close()
             return count or 0
         except Exception as e:
             print(f"❌ Erro ao contar unmapped categories: {e}")
             return 0
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     def delete_category_mapping(self, source_category: str, transaction_type: str | None) -> bool:
         """Remove um mapeamento específico (será recriado em próxima reconciliação se ainda existir em transações)."""
+        conn = None
         try:
             if not source_category:
                 return False
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             if transaction_type is None or transaction_type == '':
                 cursor.execute('DELETE FROM category_mappings WHERE source_category = ? AND (transaction_type IS NULL OR transaction_type = "")', (source_category,))
@@ -2710,11 +4965,15 @@ class Database:
                 cursor.execute('DELETE FROM category_mappings WHERE source_category = ? AND transaction_type = ?', (source_category, transaction_type))
             conn.commit()
             removed = cursor.rowcount > 0
-            conn.close()
             return removed
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"❌ Erro ao deletar category_mapping: {e}")
             return False
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
 
     # ========================================
     #  SUGESTÃO AUTOMÁTICA DE CATEGORIAS
@@ -2731,9 +4990,10 @@ class Database:
           2. Fallback mapeamento de-para (API->Usuário) ativo (needs_classification=0)
           3. Pode sobrescrever sugestões anteriores enquanto não verificada.
         """
+        conn = None
         try:
             import difflib
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
@@ -2881,9 +5141,10 @@ class Database:
                         print(f"⚠️ Erro ao aplicar sugestão em {tx_id}: {inner_e}")
                 conn.commit()
 
-            conn.close()
             return { 'stats': stats, 'suggestions': suggestions }
         except Exception as e:
+            if conn is not None:
+                conn.rollback()
             print(f"❌ Erro em suggest_categories_for_transactions: {e}")
             return {
                 'stats': {
@@ -2897,3 +5158,21 @@ class Database:
                 'suggestions': [],
                 'error': str(e)
             }
+        finally:
+            if conn is not None:
+                self._release_connection(conn)
+
+
+if __name__ == "__main__":
+    # Manutenção: python database.py --rebuild-rollup [db] -> reconstrói monthly_rollup
+    # (os planos de consulta de /transactions são verificados em tests/test_index_usage.py)
+    import sys
+    from config import Config
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    db_path = args[0] if args else Config.get_database_path()
+    if '--rebuild-rollup' not in sys.argv:
+        print("Uso: python database.py --rebuild-rollup [db]")
+        sys.exit(2)
+    db = Database(db_path)
+    sys.exit(0 if db.rebuild_monthly_rollup() else 1)
@@ -12,15 +12,285 @@ Requisitos:
 
 import requests
 import json
+import os
+import socket
 import time
+import threading
+import math
+import queue
+import random
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 import webbrowser
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timedelta
 from time import perf_counter
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
 from config import Config
 from oauth_manager import OAuthManager
 
 
+class SyncLeaseSet:
+    """Leases (tabela sync_leases) das conexões sincronizadas por um sync.
+
+    Garante uma sincronização por conexão entre threads e processos. Um heartbeat em thread própria
+    renova as leases (e o updated_at do job) a cada Config.SYNC_LEASE_TTL_SECONDS / 3; se o
+    processo cair, elas expiram sozinhas e o próximo sync assume a conexão.
+    """
+
+    def __init__(self, job_id=None):
+        from database import Database
+        self.db = Database()
+        self.job_id = job_id
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._thread = None
+
+    def acquire(self, item_id):
+        """Obtém a lease da conexão; retorna None se obtida ou a lease vigente de outro sync"""
+        holder = self.db.acquire_sync_lease(item_id, self.owner, Config.SYNC_LEASE_TTL_SECONDS, self.job_id)
+        if holder is None and self._thread is None:
+            self._thread = threading.Thread(target=self._heartbeat, name='sync-lease-heartbeat', daemon=True)
+            self._thread.start()
+        return holder
+
+    def _heartbeat(self):
+        while not self._stop.wait(Config.SYNC_LEASE_TTL_SECONDS / 3):
+            self.db.renew_sync_leases(self.owner, Config.SYNC_LEASE_TTL_SECONDS, self.job_id)
+
+    def close(self):
+        """Para o heartbeat e libera todas as leases"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.db.release_sync_leases(self.owner)
+
+
+class SyncBatchWriter:
+    """Grava em lotes a sincronização de uma conexão, somando as estatísticas de cada lote.
+
+    Cada lote é uma transação própria (save_sync_data_incremental_with_stats sem histórico): as
+    existentes são atualizadas na hora e as novas esperam em sync_staged_transactions. Ao final,
+    finish insere as novas de uma vez (merge_staged_transactions) e registra o sync_history com os
+    totais. Um lote com erro interrompe a gravação da conexão: as marcas d'água não avançam e a
+    próxima sincronização busca o mesmo período de novo (descartando o que ficou em espera).
+    """
+
+    def __init__(self, app, item_id):
+        from database import Database
+        self.app = app
+        self.item_id = item_id
+        self.db = Database()
+        self.stats = {}
+        self.accounts_count = 0
+        self.transactions_count = 0
+        self.persist_s = 0.0
+        self.error = None
+        self.db.discard_staged_transactions(item_id)
+
+    def write(self, accounts=None, transactions=None):
+        """Grava um lote (contas e/ou transações); retorna False se a conexão já falhou ou o lote falhou"""
+        if self.error:
+            return False
+        accounts = accounts or []
+        transactions = transactions or []
+        t_start = perf_counter()
+        result = self.db.save_sync_data_incremental_with_stats(
+            self.item_id, accounts, transactions, record_history=False, stage_new=True
+        )
+        elapsed = perf_counter() - t_start
+        self.persist_s += elapsed
+        if not result or not result.get('success'):
+            self.error = (result or {}).get('message') or 'Erro ao salvar no banco de dados'
+            return False
+        batch_stats = result.get('stats', {})
+        for key, value in batch_stats.items():
+            self.stats[key] = self.stats.get(key, 0) + value
+        self.accounts_count += len(accounts)
+        self.transactions_count += len(transactions)
+        self.app._report_progress(rows=FinanceApp._rows_written(batch_stats), timings={'persist_s': elapsed},
+                                  connection=self.item_id)
+        return True
+
+    def finish(self):
+        """Insere as transações novas em espera, registra o sync_history com os totais gravados e retorna
+        o resultado no formato de save_to_database"""
+        t_start = perf_counter()
+        merged = self.db.merge_staged_transactions(self.item_id)
+        elapsed = perf_counter() - t_start
+        self.persist_s += elapsed
+        if not merged.get('success'):
+            self.error = merged.get('message') or 'Erro ao salvar no banco de dados'
+            return {'success': False, 'stats': self.stats, 'message': self.error}
+        self.app._report_progress(timings={'persist_s': elapsed}, connection=self.item_id)
+        self.db.record_sync_history(self.item_id, self.accounts_count, self.transactions_count)
+        stats = self.stats
+        print(f"💾 Dados salvos em lotes ({self.transactions_count} transações em {self.persist_s:.2f}s)")
+        print(f"   💳 Contas: {stats.get('accounts_inserted', 0)} inseridas, {stats.get('accounts_updated', 0)} atualizadas, {stats.get('accounts_unchanged', 0)} inalteradas")
+        print(f"   💰 Transações: {stats.get('transactions_inserted', 0)} inseridas, {stats.get('transactions_updated', 0)} atualizadas, {stats.get('transactions_unchanged', 0)} inalteradas")
+        return {'success': True, 'stats': stats, 'message': 'Sincronização incremental concluída com sucesso'}
+
+
+class RefreshMonitor:
+    """Acompanha em um único laço o refresh de todas as conexões em atualização no processo.
+
+    Cada sync registra o item e espera apenas pelo seu resultado; o laço consulta GET /items/<id>
+    dos itens vencidos em paralelo, com backoff exponencial e jitter (Config.REFRESH_POLL_*),
+    trata cada resposta assim que chega e libera o item ao chegar a SUCCESS/ERROR. O tempo até ficar pronto é gravado por
+    conector (connector_refresh_profile) e define o momento da primeira consulta das próximas vezes.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._items: dict[str, dict] = {}
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=max(1, Config.SYNC_MAX_WORKERS), thread_name_prefix='refresh-poll')
+
+    def wait(self, app, item_id, connector=None) -> bool:
+        """Registra o item e bloqueia até o refresh terminar: True (sucesso/timeout) ou False (erro)"""
+        from database import Database
+        connector = connector or {}
+        connector_id = str(connector.get('id') or connector.get('name') or '')
+        profile = Database().get_connector_refresh_profile(connector_id) if connector_id else None
+        # Primeira consulta perto de metade do tempo típico do conector (sem histórico: intervalo inicial)
+        first_delay = Config.REFRESH_POLL_INITIAL_SECONDS
+        if profile and profile.get('avg_ready_seconds'):
+            first_delay = min(max(profile['avg_ready_seconds'] / 2, first_delay), Config.REFRESH_POLL_MAX_SECONDS)
+        now = perf_counter()
+        entry = {
+            'app': app,
+            'item_id': item_id,
+            'connector_id': connector_id,
+            'connector_name': connector.get('name', ''),
+            'started': now,
+            'deadline': now + Config.REFRESH_MONITOR_TIMEOUT,
+            'delay': first_delay,
+            'next_at': now + first_delay,
+            'attempt': 0,
+            'polling': False,
+            'done': threading.Event(),
+            'result': True
+        }
+        with self._cond:
+            # Item já monitorado (outro sync da mesma conexão): espera pelo mesmo resultado
+            entry = self._items.setdefault(item_id, entry)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='refresh-monitor', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        if not entry['done'].wait(Config.REFRESH_MONITOR_TIMEOUT + Config.REFRESH_POLL_MAX_SECONDS):
+            print("⚠️ Timeout na atualização, mas continuando...")
+        return entry['result']
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # Itens com consulta em andamento são reagendados pelo callback dela
+                idle = [entry for entry in self._items.values() if not entry['polling']]
+                if not idle:
+                    self._cond.wait()
+                    continue
+                now = perf_counter()
+                due = [entry for entry in idle if entry['next_at'] <= now]
+                if not due:
+                    self._cond.wait(min(entry['next_at'] for entry in idle) - now)
+                    continue
+                for entry in due:
+                    entry['polling'] = True
+            # Cada consulta é tratada assim que termina: um GET lento não atrasa os demais itens
+            for entry in due:
+                future = self._executor.submit(self._poll, entry)
+                future.add_done_callback(lambda future, entry=entry: self._polled(entry, future))
+
+    def _polled(self, entry, future):
+        try:
+            self._handle(entry, future.result())
+        finally:
+            with self._cond:
+                entry['polling'] = False
+                self._cond.notify()
+
+    @staticmethod
+    def _poll(entry):
+        """Consulta o status do item; retorna (status, execution_status) ou None se a consulta falhou"""
+        app = entry['app']
+        try:
+            response = app.api_request('GET',
+                f"{app.base_url}/items/{entry['item_id']}",
+                headers={"X-API-KEY": app.api_key}
+            )
+            if response.status_code != 200:
+                return None
+            item_data = response.json()
+            return item_data.get('status'), item_data.get('executionStatus')
+        except Exception as e:
+            print(f"❌ Erro no monitoramento de {entry['item_id']}: {e}")
+            return None
+
+    def _handle(self, entry, outcome):
+        entry['attempt'] += 1
+        now = perf_counter()
+        app = entry['app']
+        status, execution_status = outcome or (None, None)
+        if outcome:
+            print(f"📊 {entry['item_id']} Status: {status} | Execução: {execution_status}")
+
+        if status in ['CONNECTED', 'UPDATED'] and execution_status == 'SUCCESS':
+            print(f"✅ Dados atualizados com sucesso! ({now - entry['started']:.1f}s)")
+            self._finish(entry, True, 'SUCCESS')
+        elif status in ['LOGIN_ERROR', 'OUTDATED'] or execution_status == 'ERROR':
+            print("❌ Erro na atualização dos dados")
+            self._finish(entry, False, 'ERROR')
+        elif now >= entry['deadline']:
+            print("⚠️ Timeout na atualização, mas continuando...")
+            self._finish(entry, True, 'TIMEOUT')
+        else:
+            # Ainda atualizando (ou consulta falhou): backoff exponencial com jitter ("equal jitter")
+            app._report_progress(
+                phase=f"aguardando atualização na Pluggy ({entry['attempt']}ª verificação)",
+                connection=entry['item_id']
+            )
+            delay = entry['delay']
+            entry['delay'] = min(delay * 2, Config.REFRESH_POLL_MAX_SECONDS)
+            entry['next_at'] = now + delay / 2 + random.uniform(0, delay / 2)
+
+    def _finish(self, entry, result, outcome):
+        from database import Database
+        with self._cond:
+            self._items.pop(entry['item_id'], None)
+        entry['result'] = result
+        entry['done'].set()
+        if entry['connector_id']:
+            Database().record_connector_refresh(
+                entry['connector_id'], entry['connector_name'], perf_counter() - entry['started'], outcome
+            )
+
+
 class FinanceApp:
+    # Sessão HTTP única do processo: reaproveita conexões TCP/TLS entre instâncias, conexões e páginas
+    _http_session = None
+    _http_session_lock = threading.Lock()
+    # Pool compartilhado para páginas de transações (limita requisições simultâneas no processo todo)
+    _page_executor = None
+    # Endpoints de refresh de item, na ordem de tentativa (POST /items/<id>/<ação>)
+    REFRESH_ACTIONS = ['refresh', 'sync', 'update', 'execute']
+    # Monitor único dos refreshes em andamento (ver RefreshMonitor)
+    _refresh_monitor = None
+    # API key compartilhada pelo processo: chave, validade (time.time) e credenciais que a geraram
+    _api_key_cache = {'api_key': None, 'expires_at': 0.0, 'credentials': None}
+    _api_key_lock = threading.Lock()
+    _api_key_refreshing = False
+    # Status recente de itens (item_id -> (time.time da consulta, status)) e consultas em andamento
+    # (item_id -> Future), ver get_items_status
+    _item_status_cache = {}
+    _item_status_inflight = {}
+    _item_status_lock = threading.Lock()
+    # Pool próprio das consultas de status: não disputa threads com as páginas de uma sincronização
+    _item_status_executor = None
+    # Até este número de itens a consultar, as consultas rodam na própria thread da requisição
+    ITEM_STATUS_INLINE_MAX = 2
+
     def __init__(self):
         self.base_url = Config.PLUGGY_BASE_URL
         self.client_id = Config.CLIENT_ID
@@ -28,7 +298,145 @@ class FinanceApp:
         self.api_key = None
         self.current_item_id = None
         self.oauth_manager = OAuthManager()
+        # Recebe o progresso da sincronização (fase, páginas, linhas gravadas, tempos) - ver sync_worker
+        self.progress_callback = None
+        # Job de sincronização em execução (sync_worker), registrado nas leases das conexões
+        self.sync_job_id = None
+
+    @classmethod
+    def get_http_session(cls) -> requests.Session:
+        """Retorna a sessão HTTP compartilhada (keep-alive, pool de conexões, gzip), criando-a na primeira chamada"""
+        if cls._http_session is None:
+            with cls._http_session_lock:
+                if cls._http_session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=Config.HTTP_POOL_SIZE, pool_maxsize=Config.HTTP_POOL_SIZE)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+                    cls._http_session = session
+        return cls._http_session
+
+    @classmethod
+    def get_page_executor(cls) -> ThreadPoolExecutor:
+        """Retorna o pool de busca de páginas (Config.SYNC_MAX_PAGE_REQUESTS threads), criando-o na primeira chamada"""
+        if cls._page_executor is None:
+            with cls._http_session_lock:
+                if cls._page_executor is None:
+                    cls._page_executor = ThreadPoolExecutor(
+                        max_workers=max(1, Config.SYNC_MAX_PAGE_REQUESTS), thread_name_prefix='pluggy-page'
+                    )
+        return cls._page_executor
+
+    @classmethod
+    def get_item_status_executor(cls) -> ThreadPoolExecutor:
+        """Retorna o pool das consultas de status de itens (Config.ITEM_STATUS_MAX_WORKERS threads)"""
+        if cls._item_status_executor is None:
+            with cls._http_session_lock:
+                if cls._item_status_executor is None:
+                    cls._item_status_executor = ThreadPoolExecutor(
+                        max_workers=max(1, Config.ITEM_STATUS_MAX_WORKERS), thread_name_prefix='pluggy-status'
+                    )
+        return cls._item_status_executor
+
+    @classmethod
+    def get_refresh_monitor(cls) -> RefreshMonitor:
+        """Retorna o monitor de refresh do processo, criando-o na primeira chamada"""
+        if cls._refresh_monitor is None:
+            with cls._http_session_lock:
+                if cls._refresh_monitor is None:
+                    cls._refresh_monitor = RefreshMonitor()
+        return cls._refresh_monitor
+
+    def api_request(self, method: str, url: str, retry_on_401: bool = True, **kwargs) -> requests.Response:
+        """Executa uma chamada à API pela sessão compartilhada, com timeout padrão e log de latência.
+
+        Um 401 com X-API-KEY invalida a chave em cache, autentica de novo e repete a chamada uma vez.
+        """
+        kwargs.setdefault('timeout', (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT))
+        t_start = perf_counter()
+        response = self.get_http_session().request(method, url, **kwargs)
+        elapsed_ms = (perf_counter() - t_start) * 1000
+        print(f"🌐 {method} {urlsplit(url).path} → {response.status_code} em {elapsed_ms:.0f} ms")
+
+        headers = kwargs.get('headers') or {}
+        used_key = headers.get('X-API-KEY')
+        if response.status_code == 401 and retry_on_401 and used_key:
+            print("🔑 API key recusada (401) - autenticando novamente...")
+            self._invalidate_api_key(used_key)
+            if self.authenticate():
+                kwargs['headers'] = {**headers, 'X-API-KEY': self.api_key}
+                return self.api_request(method, url, retry_on_401=False, **kwargs)
+        return response
+
+    def _api_credentials(self):
+        """Identifica a origem da API key (muda se URL ou credenciais forem alteradas nas configurações)"""
+        return (self.base_url, self.client_id, self.client_secret)
+
+    def _cached_api_key(self):
+        """API key do cache do processo, se ainda válida para as credenciais atuais"""
+        cache = FinanceApp._api_key_cache
+        if cache['api_key'] and cache['credentials'] == self._api_credentials() and time.time() < cache['expires_at']:
+            return cache['api_key']
+        return None
+
+    def _request_api_key(self):
+        """Obtém uma nova API key (POST /auth) e atualiza o cache; chamar com _api_key_lock"""
+        response = self.api_request('POST',
+            f"{self.base_url}/auth",
+            headers={"Content-Type": "application/json"},
+            json={"clientId": self.client_id, "clientSecret": self.client_secret}
+        )
+        response.raise_for_status()
+        api_key = response.json().get('apiKey')
+        if api_key:
+            FinanceApp._api_key_cache = {
+                'api_key': api_key,
+                'expires_at': time.time() + Config.PLUGGY_API_KEY_TTL_SECONDS,
+                'credentials': self._api_credentials()
+            }
+        return api_key
+
+    @classmethod
+    def _invalidate_api_key(cls, api_key):
+        """Descarta a chave em cache se ainda for a informada (outra thread pode já ter renovado)"""
+        with cls._api_key_lock:
+            if cls._api_key_cache['api_key'] == api_key:
+                cls._api_key_cache = {'api_key': None, 'expires_at': 0.0, 'credentials': None}
+
+    def _refresh_api_key_ahead(self):
+        """Renova a chave em segundo plano quando faltar menos de PLUGGY_API_KEY_REFRESH_AHEAD_SECONDS"""
+        if FinanceApp._api_key_cache['expires_at'] - time.time() > Config.PLUGGY_API_KEY_REFRESH_AHEAD_SECONDS:
+            return
+        with FinanceApp._api_key_lock:
+            if FinanceApp._api_key_refreshing:
+                return
+            FinanceApp._api_key_refreshing = True
+
+        def refresh():
+            try:
+                with FinanceApp._api_key_lock:
+                    self._request_api_key()
+                print("🔄 API key renovada antecipadamente")
+            except Exception as e:
+                print(f"⚠️ Erro ao renovar API key: {e}")
+            finally:
+                FinanceApp._api_key_refreshing = False
+
+        threading.Thread(target=refresh, name='pluggy-auth-refresh', daemon=True).start()
         
+    def _report_progress(self, phase=None, pages=0, rows=0, timings=None, connection=None):
+        """Repassa o progresso ao progress_callback, se houver; falhas no callback não interrompem a sincronização.
+
+        connection (item_id) identifica a conexão quando várias são sincronizadas ao mesmo tempo.
+        """
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback(phase=phase, pages=pages, rows=rows, timings=timings, connection=connection)
+        except Exception as e:
+            print(f"⚠️ Erro ao reportar progresso: {e}")
+
     def print_header(self, title):
         """Imprime cabeçalho formatado"""
         print(f"\n{'='*60}")
@@ -45,13 +453,15 @@ class FinanceApp:
             print(f"🔄 Tentando atualizar dados da conta {item_id}...")
             
             # Primeiro verifica se é MeuPluggy (sandbox)
-            item_response = requests.get(
+            item_response = self.api_request('GET',
                 f"{self.base_url}/items/{item_id}",
                 headers={"X-API-KEY": self.api_key}
             )
             
+            connector = {}
             if item_response.status_code == 200:
                 item_data = item_response.json()
+                connector = item_data.get('connector', {})
                 connector_name = item_data.get('connector', {}).get('name', '')
                 is_sandbox = item_data.get('connector', {}).get('isSandbox', False)
                 last_updated = item_data.get('lastUpdatedAt', '')
@@ -69,19 +479,22 @@ class FinanceApp:
                     self._check_data_freshness(item_id)
                     return True
             
-            # Para conectores reais (bancos), tenta diferentes endpoints para refresh
+            # Para conectores reais (bancos), tenta os endpoints de refresh (o que funcionou antes primeiro)
             print("🏦 Banco real detectado - tentando refresh...")
-            endpoints_to_try = [
-                f"/items/{item_id}/refresh",
-                f"/items/{item_id}/sync", 
-                f"/items/{item_id}/update",
-                f"/items/{item_id}/execute"
-            ]
-            
-            for endpoint in endpoints_to_try:
+            plan = self._plan_refresh_endpoints(connector)
+            if not plan['actions']:
+                print(f"💡 Nenhum endpoint de refresh disponível para {connector.get('name', 'este conector')} (verificado em {plan['probed_at']})")
+                print("💡 Continuando com dados disponíveis...")
+                return True
+            failed_now = {}
+            tried = []
+            
+            for action in plan['actions']:
+                endpoint = f"/items/{item_id}/{action}"
+                tried.append(action)
                 print(f"🔄 Tentando: POST {endpoint}")
                 
-                response = requests.post(
+                response = self.api_request('POST',
                     f"{self.base_url}{endpoint}",
                     headers={
                         "X-API-KEY": self.api_key,
@@ -93,20 +506,25 @@ class FinanceApp:
                 
                 if response.status_code == 200:
                     print("✅ Solicitação de atualização enviada com sucesso!")
-                    return self._monitor_update_status(item_id)
+                    self._remember_refresh_endpoint(connector, plan, action, failed_now, tried)
+                    return self._monitor_update_status(item_id, connector)
                 elif response.status_code == 202:
                     print("✅ Atualização aceita e em processamento!")
-                    return self._monitor_update_status(item_id)
+                    self._remember_refresh_endpoint(connector, plan, action, failed_now, tried)
+                    return self._monitor_update_status(item_id, connector)
                 elif response.status_code == 403:
                     print(f"❌ Acesso negado para {endpoint}")
+                    failed_now[action] = 403
                     continue
                 elif response.status_code == 400:
                     print(f"❌ Requisição inválida para {endpoint}: {response.text}")
+                    failed_now[action] = 400
                     continue
                 else:
                     print(f"⚠️ Resposta inesperada {response.status_code}: {response.text}")
                     continue
             
+            self._remember_refresh_endpoint(connector, plan, None, failed_now, tried)
             print("⚠️ Nenhum endpoint de refresh funcionou")
             print("💡 Continuando com dados disponíveis...")
             return True
@@ -116,13 +534,58 @@ class FinanceApp:
             print("📝 Continuando com dados em cache...")
             return True  # Continua mesmo com erro na atualização
 
+    def _plan_refresh_endpoints(self, connector):
+        """Ordem dos endpoints de refresh a tentar, a partir do perfil do conector.
+
+        Com verificação recente (Config.REFRESH_ENDPOINT_REPROBE_DAYS): o endpoint que funcionou
+        primeiro e, em seguida, os que não retornaram 403/400. Sem perfil ou com verificação
+        vencida: todos, na ordem padrão (nova verificação).
+        """
+        from database import Database
+        plan = {'actions': list(self.REFRESH_ACTIONS), 'probing': True, 'known': None, 'failed': {}, 'probed_at': None}
+        connector_id = str(connector.get('id') or '')
+        if not connector_id:
+            return plan
+        profile = Database().get_connector_refresh_profile(connector_id) or {}
+        probed_at = profile.get('endpoints_probed_at')
+        if not probed_at or datetime.now() - datetime.strptime(probed_at[:19], '%Y-%m-%d %H:%M:%S') \
+                > timedelta(days=Config.REFRESH_ENDPOINT_REPROBE_DAYS):
+            return plan
+        known = profile.get('refresh_endpoint')
+        failed = json.loads(profile.get('failed_endpoints') or '{}')
+        plan.update(
+            actions=([known] if known else []) + [a for a in self.REFRESH_ACTIONS if a != known and a not in failed],
+            probing=False, known=known, failed=failed, probed_at=probed_at
+        )
+        return plan
+
+    def _remember_refresh_endpoint(self, connector, plan, working, failed_now, tried):
+        """Grava no perfil do conector o endpoint de refresh que funcionou e os que retornaram 403/400"""
+        from database import Database
+        connector_id = str(connector.get('id') or '')
+        if not connector_id:
+            return
+        failed = {} if plan['probing'] else dict(plan['failed'])
+        failed.update(failed_now)
+        if working:
+            failed.pop(working, None)
+            endpoint = working
+        elif plan['probing'] or plan['known'] in failed_now:
+            endpoint = None
+        else:
+            # Falha transitória (ex.: 5xx) do endpoint conhecido: mantém o registro
+            endpoint = plan['known']
+        # Nova verificação completa (ou o endpoint conhecido deixou de funcionar): reinicia o prazo
+        probed = plan['probing'] or tried[:1] != [plan['known']] or len(tried) > 1
+        Database().save_connector_refresh_endpoints(connector_id, connector.get('name', ''), endpoint, failed, probed)
+
     def _check_data_freshness(self, item_id):
         """Verifica a atualidade dos dados para MeuPluggy"""
         try:
             print("🔍 Verificando dados disponíveis...")
             
             # Verifica contas disponíveis
-            accounts_response = requests.get(
+            accounts_response = self.api_request('GET',
                 f"{self.base_url}/accounts?itemId={item_id}",
                 headers={"X-API-KEY": self.api_key}
             )
@@ -132,7 +595,7 @@ class FinanceApp:
                 print(f"💰 {len(accounts)} contas encontradas")
                 
                 # Verifica transações disponíveis
-                transactions_response = requests.get(
+                transactions_response = self.api_request('GET',
                     f"{self.base_url}/transactions?itemId={item_id}",
                     headers={"X-API-KEY": self.api_key}
                 )
@@ -154,60 +617,33 @@ class FinanceApp:
         except Exception as e:
             print(f"❌ Erro na verificação: {e}")
 
-    def _monitor_update_status(self, item_id):
-        """Monitora o status da atualização"""
+    def _monitor_update_status(self, item_id, connector=None):
+        """Aguarda o fim do refresh do item no RefreshMonitor do processo (um laço para todas as conexões)"""
         try:
             print("⏳ Monitorando progresso da atualização...")
-            
-            for attempt in range(30):  # Máximo 30 tentativas (2 minutos)
-                time.sleep(4)
-                
-                status_response = requests.get(
-                    f"{self.base_url}/items/{item_id}",
-                    headers={"X-API-KEY": self.api_key}
-                )
-                
-                if status_response.status_code == 200:
-                    item_data = status_response.json()
-                    status = item_data.get('status')
-                    execution_status = item_data.get('executionStatus')
-                    
-                    print(f"📊 Status: {status} | Execução: {execution_status}")
-                    
-                    if status in ['CONNECTED', 'UPDATED'] and execution_status == 'SUCCESS':
-                        print("✅ Dados atualizados com sucesso!")
-                        return True
-                    elif status in ['LOGIN_ERROR', 'OUTDATED'] or execution_status == 'ERROR':
-                        print("❌ Erro na atualização dos dados")
-                        return False
-                    elif status in ['UPDATING', 'LOGIN_IN_PROGRESS'] or execution_status in ['RUNNING', 'PENDING']:
-                        print(f"🔄 Ainda atualizando... (tentativa {attempt + 1}/30)")
-                        continue
-                
-                time.sleep(1)
-            
-            print("⚠️ Timeout na atualização, mas continuando...")
-            return True
+            return self.get_refresh_monitor().wait(self, item_id, connector)
             
         except Exception as e:
             print(f"❌ Erro no monitoramento: {e}")
             return True
 
     def authenticate(self):
-        """Autentica na API Pluggy"""
+        """Autentica na API Pluggy, reaproveitando a API key em cache enquanto válida"""
         self.print_step(1, "AUTENTICAÇÃO")
         
-        print("🔐 Conectando com a API Pluggy...")
-        
         try:
-            response = requests.post(
-                f"{self.base_url}/auth",
-                headers={"Content-Type": "application/json"},
-                json={"clientId": self.client_id, "clientSecret": self.client_secret}
-            )
-            response.raise_for_status()
+            # Chave do cache do processo (compartilhada por todas as instâncias), sem ida ao /auth
+            cached_key = self._cached_api_key()
+            if cached_key:
+                self.api_key = cached_key
+                print("✅ API key em cache reutilizada")
+                self._refresh_api_key_ahead()
+                return True
             
-            self.api_key = response.json().get('apiKey')
+            print("🔐 Conectando com a API Pluggy...")
+            with FinanceApp._api_key_lock:
+                # Outra thread pode ter autenticado enquanto esta aguardava
+                self.api_key = self._cached_api_key() or self._request_api_key()
             
             if not self.api_key:
                 print("❌ Erro: API Key não recebida")
@@ -220,6 +656,80 @@ class FinanceApp:
             print(f"❌ Erro na autenticação: {e}")
             return False
     
+    def get_items_status(self, item_ids, max_age=None):
+        """Status de vários itens na Pluggy (GET /items/<id>), consultados em paralelo.
+
+        Reaproveita por item o resultado de até max_age segundos atrás (padrão
+        Config.ITEM_STATUS_TTL_SECONDS), então páginas que verificam o OAuth periodicamente geram
+        no máximo uma consulta por item a cada intervalo, com a API key e a sessão HTTP compartilhadas.
+        Chamadas simultâneas para o mesmo item esperam a mesma consulta. Até ITEM_STATUS_INLINE_MAX
+        itens são consultados na thread atual; acima disso, no pool próprio de status.
+        Retorna item_id -> {'status', 'execution_status', 'connector', 'error'}; consultas com erro
+        (error preenchido) não são memorizadas.
+        """
+        ttl = Config.ITEM_STATUS_TTL_SECONDS if max_age is None else max_age
+        now = time.time()
+        results = {}
+        pending = {}
+        own = []
+        with FinanceApp._item_status_lock:
+            for item_id in dict.fromkeys(item_ids):
+                cached = FinanceApp._item_status_cache.get(item_id)
+                if cached and now - cached[0] < ttl:
+                    results[item_id] = cached[1]
+                elif item_id in FinanceApp._item_status_inflight:
+                    pending[item_id] = FinanceApp._item_status_inflight[item_id]
+                else:
+                    future = Future()
+                    FinanceApp._item_status_inflight[item_id] = future
+                    pending[item_id] = future
+                    own.append(item_id)
+
+        if own:
+            if not self.authenticate():
+                for item_id in own:
+                    self._resolve_item_status(item_id, {'error': 'Erro na autenticação'})
+            elif len(own) <= self.ITEM_STATUS_INLINE_MAX:
+                for item_id in own:
+                    self._resolve_item_status(item_id)
+            else:
+                executor = self.get_item_status_executor()
+                for item_id in own:
+                    executor.submit(self._resolve_item_status, item_id)
+
+        for item_id, future in pending.items():
+            results[item_id] = future.result()
+        return results
+
+    def _resolve_item_status(self, item_id, status=None):
+        """Conclui a consulta em andamento do item: memoriza o status (se sem erro) e acorda quem espera"""
+        if status is None:
+            status = self._fetch_item_status(item_id)
+        with FinanceApp._item_status_lock:
+            if not status.get('error'):
+                FinanceApp._item_status_cache[item_id] = (time.time(), status)
+            future = FinanceApp._item_status_inflight.pop(item_id)
+        future.set_result(status)
+
+    def _fetch_item_status(self, item_id):
+        """GET /items/<id> resumido para get_items_status (erros no campo error)"""
+        try:
+            response = self.api_request('GET',
+                f"{self.base_url}/items/{item_id}",
+                headers={"X-API-KEY": self.api_key}
+            )
+            if response.status_code != 200:
+                return {'error': f'HTTP {response.status_code}'}
+            item_data = response.json()
+            return {
+                'status': item_data.get('status'),
+                'execution_status': item_data.get('executionStatus'),
+                'connector': (item_data.get('connector') or {}).get('name'),
+                'error': None
+            }
+        except Exception as e:
+            return {'error': str(e)}
+
     def create_oauth_connection(self):
         """Cria uma conexão OAuth com o Meu Pluggy"""
         self.print_step(2, "CRIAÇÃO DA CONEXÃO OAUTH")
@@ -228,7 +738,7 @@ class FinanceApp:
         
         try:
             # Cria item OAuth
-            response = requests.post(
+            response = self.api_request('POST',
                 f"{self.base_url}/items",
                 headers={"Content-Type": "application/json", "X-API-KEY": self.api_key},
                 json={"connectorId": 200, "parameters": {}}  # 200 = MeuPluggy
@@ -259,7 +769,7 @@ class FinanceApp:
         
         for attempt in range(max_attempts):
             try:
-                response = requests.get(
+                response = self.api_request('GET',
                     f"{self.base_url}/items/{self.current_item_id}",
                     headers={"X-API-KEY": self.api_key}
                 )
@@ -314,7 +824,7 @@ class FinanceApp:
         # Verifica se a autorização foi concluída
         for attempt in range(max_attempts):
             try:
-                response = requests.get(
+                response = self.api_request('GET',
                     f"{self.base_url}/items/{self.current_item_id}",
                     headers={"X-API-KEY": self.api_key}
                 )
@@ -354,7 +864,7 @@ class FinanceApp:
         self.print_step(4, "BUSCANDO CONTAS BANCÁRIAS")
         
         try:
-            response = requests.get(
+            response = self.api_request('GET',
                 f"{self.base_url}/accounts",
                 headers={"X-API-KEY": self.api_key},
                 params={"itemId": self.current_item_id}
@@ -409,7 +919,7 @@ class FinanceApp:
                 page_size = 500  # Máximo por página
                 
                 while True:
-                    response = requests.get(
+                    response = self.api_request('GET',
                         f"{self.base_url}/transactions",
                         headers={"X-API-KEY": self.api_key},
                         params={
@@ -488,7 +998,7 @@ class FinanceApp:
         print(f"   🔴 Total de saídas: R$ {abs(expense):.2f}")
         print(f"   📊 Saldo líquido: R$ {income + expense:.2f}")
     
-    def save_to_database(self, accounts, transactions):
+    def save_to_database(self, accounts, transactions, item_id=None):
         """Salva dados no banco de dados e retorna estatísticas detalhadas"""
         try:
             from database import Database
@@ -496,7 +1006,7 @@ class FinanceApp:
             
             # Chama a sincronização incremental que retorna estatísticas
             result = db.save_sync_data_incremental_with_stats(
-                item_id=self.current_item_id,
+                item_id=item_id or self.current_item_id,
                 accounts=accounts,
                 transactions=transactions
             )
@@ -516,8 +1026,93 @@ class FinanceApp:
             print(f"❌ Erro ao salvar no banco: {e}")
             return {'success': False, 'message': f'Erro: {e}'}
     
+    def _fetch_connection_data(self, item_id, connection_info, sink, cancelled):
+        """Fase de rede de uma conexão (refresh, contas e transações), executada em thread do pool.
+
+        Não escreve no banco: envia à fila sink, na ordem, ('accounts', item_id, contas),
+        ('transactions', item_id, lote) para cada lote de até Config.SYNC_WRITE_BATCH_SIZE transações
+        e por fim ('done', item_id, resultado). Com a fila cheia a busca espera o escritor
+        (contrapressão); cancelled interrompe a espera quando a sincronização desiste da conexão.
+        Erros ficam no resultado.
+        """
+        bank_name = connection_info.get('bank_name', f'Banco_{item_id[:8]}')
+        result = {'item_id': item_id, 'bank_name': bank_name, 'accounts_count': 0, 'transactions_count': 0,
+                  'error': None}
+        t_conn_start = perf_counter()
+        t_force = t_force_end = t_accounts_start = t_accounts_end = t_tx_start = t_tx_end = t_conn_start
+        try:
+            print(f"🔄 Sincronizando {bank_name}...")
+            # FORÇA ATUALIZAÇÃO DOS DADOS NO MEU PLUGGY PRIMEIRO
+            print(f"🚀 Atualizando dados de {bank_name}...")
+            self._report_progress(phase=f"{bank_name}: atualizando na Pluggy", connection=item_id)
+            t_force = perf_counter()
+            self.force_update_account_data(item_id)
+            t_force_end = perf_counter()
+
+            # Busca contas desta conexão (agora atualizadas)
+            t_accounts_start = perf_counter()
+            accounts = self.fetch_accounts_silent(item_id)
+            t_accounts_end = perf_counter()
+            if accounts:
+                # Adiciona informação da conexão às contas
+                for account in accounts:
+                    account['connection_name'] = bank_name
+                    account['item_id'] = item_id
+                result['accounts_count'] = len(accounts)
+                self._put_sync_message(sink, cancelled, ('accounts', item_id, accounts))
+
+                # Busca transações desta conexão (incremental a partir da marca d'água quando possível)
+                data_since = connection_info.get('data_since')
+                fetch_plan = self._plan_transaction_fetch(item_id, accounts, data_since)
+                report = {}
+                self._report_progress(phase=f"{bank_name}: buscando e gravando transações", connection=item_id)
+                t_tx_start = perf_counter()
+                for batch in self.iter_transaction_batches(accounts, item_id, fetch_plan=fetch_plan, report=report):
+                    # Adiciona informação da conexão às transações
+                    for transaction in batch:
+                        transaction['connection_name'] = bank_name
+                        transaction['item_id'] = item_id
+                    self._put_sync_message(sink, cancelled, ('transactions', item_id, batch))
+                t_tx_end = perf_counter()
+                result['transactions_count'] = report.get('transactions_count', 0)
+                result['watermarks'] = self._build_watermarks(
+                    accounts, report.get('latest_dates', {}), fetch_plan, data_since,
+                    report.get('failed_account_ids', set())
+                )
+        except Exception as e:
+            result['error'] = str(e)
+        t_conn_end = perf_counter()
+        result['elapsed'] = t_conn_end - t_conn_start
+        self._report_progress(timings={
+            'refresh_s': t_force_end - t_force,
+            'accounts_s': t_accounts_end - t_accounts_start,
+            'transactions_s': t_tx_end - t_tx_start
+        }, connection=item_id)
+        print(
+            f"⏱️ Tempo {bank_name}: force={t_force_end - t_force:.2f}s contas={t_accounts_end - t_accounts_start:.2f}s transações={t_tx_end - t_tx_start:.2f}s total={result['elapsed']:.2f}s"
+        )
+        self._put_sync_message(sink, cancelled, ('done', item_id, result))
+        return result
+
+    @staticmethod
+    def _put_sync_message(sink, cancelled, message):
+        """Coloca uma mensagem na fila do escritor, esperando vaga; desiste se a sincronização foi cancelada"""
+        while not cancelled.is_set():
+            try:
+                sink.put(message, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        raise RuntimeError('sincronização cancelada')
+
     def sync_existing_connection(self):
-        """Sincroniza dados usando conexões OAuth existentes com atualização forçada"""
+        """Sincroniza dados usando conexões OAuth existentes com atualização forçada.
+
+        A fase de rede de cada conexão roda em paralelo (até Config.SYNC_MAX_WORKERS) e entrega contas e
+        lotes de transações por uma fila limitada (Config.SYNC_WRITE_QUEUE_BATCHES); esta thread é o
+        único escritor e grava cada lote assim que chega. A memória fica limitada pelo tamanho do lote,
+        não pelo histórico da conexão. Uma conexão lenta ou com erro não impede que as demais sejam salvas.
+        """
         try:
             t0_total = perf_counter()
             # Verifica se tem conexões válidas
@@ -525,97 +1120,147 @@ class FinanceApp:
                 return False, "Nenhuma conexão OAuth válida encontrada"
             
             # Autentica
+            self._report_progress(phase='autenticando')
             if not self.authenticate():
                 return False, "Erro na autenticação"
             
-            # Busca dados de todas as conexões ativas
-            all_accounts = []
-            all_transactions = []
+            from database import Database
             active_connections = self.oauth_manager.get_active_connections()
+            max_workers = max(1, min(Config.SYNC_MAX_WORKERS, len(active_connections)))
+            
+            print(f"🚀 Iniciando sincronização com atualização forçada para {len(active_connections)} conexão(ões) ({max_workers} em paralelo)...")
+            
+            stats = {}
+            failures = []
+            persisted = 0
+            any_accounts = False
+            t_db_total = 0.0
+            last_error = None
+            # Uma sincronização por conexão: conexões já em andamento em outro sync ficam de fora
+            leases = SyncLeaseSet(self.sync_job_id)
+            leased_connections = {}
+            for item_id, connection_info in active_connections.items():
+                holder = leases.acquire(item_id)
+                if holder:
+                    bank_name = connection_info.get('bank_name', f'Banco_{item_id[:8]}')
+                    print(f"⏳ {bank_name} já está sendo sincronizada (job {holder.get('job_id') or holder.get('owner')}) - ignorada")
+                    failures.append(f"{bank_name} (já em sincronização)")
+                    continue
+                leased_connections[item_id] = connection_info
+            # Prazo total: cada "rodada" de max_workers conexões tem até SYNC_CONNECTION_TIMEOUT
+            deadline = Config.SYNC_CONNECTION_TIMEOUT * math.ceil(max(len(leased_connections), 1) / max_workers)
+            sink = queue.Queue(maxsize=max(1, Config.SYNC_WRITE_QUEUE_BATCHES))
+            cancelled = threading.Event()
+            writers = {}
+            finished = set()
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sync')
+            futures = {
+                executor.submit(self._fetch_connection_data, item_id, connection_info, sink, cancelled): item_id
+                for item_id, connection_info in leased_connections.items()
+            }
+            t_deadline = perf_counter() + deadline
+            try:
+                while len(finished) < len(futures):
+                    remaining = t_deadline - perf_counter()
+                    if remaining <= 0:
+                        for item_id in futures.values():
+                            if item_id not in finished:
+                                bank_name = active_connections[item_id].get('bank_name', f'Banco_{item_id[:8]}')
+                                print(f"⏰ {bank_name} excedeu o tempo limite da sincronização - ignorada nesta rodada")
+                                failures.append(f"{bank_name} (tempo limite excedido)")
+                        break
+                    try:
+                        kind, item_id, payload = sink.get(timeout=min(remaining, 1.0))
+                    except queue.Empty:
+                        # Thread encerrada sem o aviso de fim (não deveria ocorrer): não espera o prazo
+                        for future, item_id in futures.items():
+                            if future.done() and item_id not in finished and sink.empty():
+                                finished.add(item_id)
+                                failures.append(f"{leased_connections[item_id].get('bank_name', item_id)} ({future.exception()})")
+                        continue
+
+                    if kind == 'accounts':
+                        # Salva no banco (único escritor), lote a lote
+                        any_accounts = True
+                        bank_name = leased_connections[item_id].get('bank_name', f'Banco_{item_id[:8]}')
+                        self._report_progress(phase=f"{bank_name}: gravando", connection=item_id)
+                        writers[item_id] = SyncBatchWriter(self, item_id)
+                        writers[item_id].write(accounts=payload)
+                    elif kind == 'transactions':
+                        writer = writers.get(item_id)
+                        if writer is not None:
+                            writer.write(transactions=payload)
+                    else:
+                        finished.add(item_id)
+                        data = payload
+                        writer = writers.get(item_id)
+                        if writer is not None:
+                            t_db_total += writer.persist_s
+                        if data['error']:
+                            failures.append(f"{data['bank_name']} ({data['error']})")
+                            continue
+                        if writer is None:
+                            continue
+                        if writer.error:
+                            last_error = writer.error
+                            failures.append(f"{data['bank_name']} ({last_error})")
+                            continue
+                        t_finish = perf_counter()
+                        result = writer.finish()
+                        t_db_total += perf_counter() - t_finish
+                        if not result.get('success'):
+                            last_error = writer.error
+                            failures.append(f"{data['bank_name']} ({last_error})")
+                            continue
+                        persisted += 1
+                        for key, value in result.get('stats', {}).items():
+                            stats[key] = stats.get(key, 0) + value
+                        # Marca d'água só avança depois que todos os lotes foram gravados
+                        if data.get('watermarks'):
+                            Database().save_sync_watermarks(item_id, data['watermarks'])
+            finally:
+                cancelled.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+                leases.close()
+            
+            if not leased_connections:
+                return False, "Todas as conexões já estão em sincronização"
+            if not any_accounts:
+                return False, "Nenhuma conta encontrada nas conexões"
+            if not persisted:
+                return False, last_error or 'Erro ao salvar no banco de dados'
             
-            print(f"🚀 Iniciando sincronização com atualização forçada para {len(active_connections)} conexão(ões)...")
+            connections_count = len(active_connections)
             
-            for item_id, connection_info in active_connections.items():
-                bank_name = connection_info.get('bank_name', f'Banco_{item_id[:8]}')
-                print(f"🔄 Sincronizando {bank_name}...")
-                t_conn_start = perf_counter()
-                # FORÇA ATUALIZAÇÃO DOS DADOS NO MEU PLUGGY PRIMEIRO
-                print(f"🚀 Atualizando dados de {bank_name}...")
-                t_force = perf_counter()
-                self.force_update_account_data(item_id)
-                t_force_end = perf_counter()
-                
-                # Usa item_id específico
-                self.current_item_id = item_id
-                
-                # Busca contas desta conexão (agora atualizadas)
-                t_accounts_start = perf_counter()
-                accounts = self.fetch_accounts_silent()
-                t_accounts_end = perf_counter()
-                if accounts:
-                    # Adiciona informação da conexão às contas
-                    for account in accounts:
-                        account['connection_name'] = bank_name
-                        account['item_id'] = item_id
-                    all_accounts.extend(accounts)
-                    
-                    # Busca transações desta conexão
-                    t_tx_start = perf_counter()
-                    transactions = self.fetch_transactions_silent(accounts)
-                    t_tx_end = perf_counter()
-                    if transactions:
-                        # Adiciona informação da conexão às transações
-                        for transaction in transactions:
-                            transaction['connection_name'] = bank_name
-                            transaction['item_id'] = item_id
-                        all_transactions.extend(transactions)
-                t_conn_end = perf_counter()
-                print(
-                    f"⏱️ Tempo {bank_name}: force={t_force_end - t_force:.2f}s contas={t_accounts_end - t_accounts_start:.2f}s transações={(t_tx_end - t_tx_start) if 't_tx_end' in locals() else 0:.2f}s total={t_conn_end - t_conn_start:.2f}s"
-                )
+            # Monta mensagem detalhada com estatísticas
+            accounts_msg = f"{stats.get('accounts_inserted', 0)} novas, {stats.get('accounts_updated', 0)} atualizadas, {stats.get('accounts_unchanged', 0)} inalteradas"
+            transactions_msg = f"{stats.get('transactions_inserted', 0)} novas, {stats.get('transactions_updated', 0)} atualizadas, {stats.get('transactions_unchanged', 0)} inalteradas"
             
-            if not all_accounts:
-                return False, "Nenhuma conta encontrada nas conexões"
+            message = f"Sincronização incremental concluída: {connections_count} conexões processadas\n"
+            message += f"💳 Contas: {accounts_msg}\n"
+            message += f"💰 Transações: {transactions_msg}"
             
-            # Salva no banco
-            t_db_start = perf_counter()
-            result = self.save_to_database(all_accounts, all_transactions)
-            t_db_end = perf_counter()
+            # Adiciona informação de conflitos se houver
+            conflicts_count = stats.get('conflicts_detected', 0)
+            if conflicts_count > 0:
+                message += f"\n⚠️ Conflitos: {conflicts_count} transações com conflitos detectados"
+            if failures:
+                message += f"\n❌ Falhas: {'; '.join(failures)}"
             
-            if result and result.get('success'):
-                stats = result.get('stats', {})
-                connections_count = len(active_connections)
-                
-                # Monta mensagem detalhada com estatísticas
-                accounts_msg = f"{stats.get('accounts_inserted', 0)} novas, {stats.get('accounts_updated', 0)} atualizadas, {stats.get('accounts_unchanged', 0)} inalteradas"
-                transactions_msg = f"{stats.get('transactions_inserted', 0)} novas, {stats.get('transactions_updated', 0)} atualizadas, {stats.get('transactions_unchanged', 0)} inalteradas"
-                
-                message = f"Sincronização incremental concluída: {connections_count} conexões processadas\n"
-                message += f"💳 Contas: {accounts_msg}\n"
-                message += f"💰 Transações: {transactions_msg}"
-                
-                # Adiciona informação de conflitos se houver
-                conflicts_count = stats.get('conflicts_detected', 0)
-                if conflicts_count > 0:
-                    message += f"\n⚠️ Conflitos: {conflicts_count} transações com conflitos detectados"
-                
-                total_time = perf_counter() - t0_total
-                message += f"\n⏱️ Tempo total: {total_time:.2f}s (persistência {t_db_end - t_db_start:.2f}s)"
-                return True, message
-            else:
-                error_msg = result.get('message', 'Erro ao salvar no banco de dados') if result else 'Erro ao salvar no banco de dados'
-                return False, error_msg
+            total_time = perf_counter() - t0_total
+            message += f"\n⏱️ Tempo total: {total_time:.2f}s (persistência {t_db_total:.2f}s)"
+            return True, message
                 
         except Exception as e:
             return False, f"Erro na sincronização: {e}"
     
-    def fetch_accounts_silent(self):
-        """Busca contas sem output no console"""
+    def fetch_accounts_silent(self, item_id=None):
+        """Busca contas sem output no console (item_id padrão: conexão atual)"""
         try:
-            response = requests.get(
+            response = self.api_request('GET',
                 f"{self.base_url}/accounts",
                 headers={"X-API-KEY": self.api_key},
-                params={"itemId": self.current_item_id}
+                params={"itemId": item_id or self.current_item_id}
             )
             response.raise_for_status()
             
@@ -625,75 +1270,241 @@ class FinanceApp:
         except Exception:
             return []
     
-    def fetch_transactions_silent(self, accounts):
-        """Busca transações sem output no console - TODAS as transações com paginação.
+    def _plan_transaction_fetch(self, item_id, accounts, data_since=None, force_full=False):
+        """Define, por conta, a data inicial da busca ('from') e se ela é uma reconciliação completa.
 
-        Aplica filtro opcional por data inicial (data_since) definido por conexão.
+        Incremental: from = max(data_since, marca d'água - Config.SYNC_WATERMARK_OVERLAP_DAYS).
+        Completa (from = data_since): conta sem marca d'água, data_since alterado, última
+        reconciliação completa há mais de Config.SYNC_FULL_RECONCILE_DAYS dias ou force_full
+        (pedido explícito do usuário).
         """
-        t_accounts_loop_start = perf_counter()
-        all_transactions: list[dict] = []
-        connections = self.oauth_manager.load_all_connections()
-
+        from database import Database
+        watermarks = Database().get_sync_watermarks(item_id)
+        now = datetime.now()
+        plan = {}
         for account in accounts:
-            try:
-                print(f"📊 Buscando TODAS transações de {account.get('name', 'Conta')}...")
-                account_transactions: list[dict] = []
-                page = 1
-                page_size = 500
-                while True:
-                    t_page_start = perf_counter()
-                    response = requests.get(
-                        f"{self.base_url}/transactions",
-                        headers={"X-API-KEY": self.api_key},
-                        params={
-                            "itemId": self.current_item_id,
-                            "accountId": account.get('id'),
-                            "pageSize": page_size,
-                            "page": page
-                        }
-                    )
-                    response.raise_for_status()
-                    data = response.json()
-                    transactions = data.get('results', [])
-                    total_results = data.get('totalResults', 0)
-                    if not transactions:
-                        break
+            account_id = account.get('id')
+            watermark = watermarks.get(account_id)
+            full = (
+                force_full
+                or not watermark
+                or not watermark.get('last_transaction_date')
+                or not watermark.get('last_full_sync_at')
+                or watermark.get('data_since') != data_since
+                or now - datetime.strptime(watermark['last_full_sync_at'][:19], '%Y-%m-%d %H:%M:%S')
+                > timedelta(days=Config.SYNC_FULL_RECONCILE_DAYS)
+            )
+            date_from = data_since
+            if not full:
+                overlap_start = (
+                    datetime.strptime(watermark['last_transaction_date'][:10], '%Y-%m-%d')
+                    - timedelta(days=Config.SYNC_WATERMARK_OVERLAP_DAYS)
+                ).strftime('%Y-%m-%d')
+                date_from = max(overlap_start, data_since) if data_since else overlap_start
+            plan[account_id] = {'from': date_from, 'full': full}
+            mode = 'reconciliação completa' if full else f'incremental desde {date_from}'
+            print(f"🕒 {account.get('name', 'Conta')}: {mode}")
+        return plan
 
-                    filtered = []
-                    for tr in transactions:
-                        tr['account_name'] = account.get('name', 'Conta')
-                        tr['account_id'] = account.get('id')
-                        item_id_local = self.current_item_id
-                        data_since = None
-                        if item_id_local and item_id_local in connections:
-                            data_since = connections[item_id_local].get('data_since')
-                        if data_since and tr.get('date') and tr['date'][:10] < data_since:
-                            continue
-                        filtered.append(tr)
-                    account_transactions.extend(filtered)
+    @staticmethod
+    def _rows_written(stats):
+        """Linhas efetivamente gravadas (inseridas + atualizadas) segundo as estatísticas da sincronização"""
+        return sum(stats.get(key, 0) for key in (
+            'accounts_inserted', 'accounts_updated', 'transactions_inserted', 'transactions_updated'
+        ))
+
+    @staticmethod
+    def _track_latest_dates(latest, transactions):
+        """Atualiza latest (account_id -> maior data YYYY-MM-DD recebida) com as transações e o retorna"""
+        for tr in transactions:
+            account_id = tr.get('account_id') or tr.get('accountId')
+            day = (tr.get('date') or '')[:10]
+            if day and day > latest.get(account_id, ''):
+                latest[account_id] = day
+        return latest
+
+    @staticmethod
+    def _build_watermarks(accounts, latest, fetch_plan, data_since, failed_account_ids):
+        """Monta as marcas d'água (maior data recebida por conta, ver _track_latest_dates) das contas buscadas com sucesso"""
+        return [
+            {
+                'account_id': account.get('id'),
+                'last_transaction_date': latest.get(account.get('id')),
+                'data_since': data_since,
+                'full': fetch_plan.get(account.get('id'), {}).get('full', True)
+            }
+            for account in accounts
+            if account.get('id') not in failed_account_ids
+        ]
+
+    def _fetch_transactions_page(self, item_id, account, page, page_size, data_since, date_from=None):
+        """Busca uma página de transações de uma conta; retorna (transações filtradas, total de páginas)"""
+        t_page_start = perf_counter()
+        params = {
+            "itemId": item_id,
+            "accountId": account.get('id'),
+            "pageSize": page_size,
+            "page": page
+        }
+        if date_from:
+            # Filtro no servidor: só transações a partir desta data (YYYY-MM-DD)
+            params["from"] = date_from
+        response = self.api_request('GET',
+            f"{self.base_url}/transactions",
+            headers={"X-API-KEY": self.api_key},
+            params=params
+        )
+        response.raise_for_status()
+        data = response.json()
+        transactions = data.get('results', [])
+        total_results = data.get('totalResults', 0)
+        total_pages = data.get('totalPages') or -(-total_results // page_size)
+        if len(transactions) < page_size:
+            total_pages = min(total_pages, page) if total_pages else page
+
+        filtered = []
+        for tr in transactions:
+            tr['account_name'] = account.get('name', 'Conta')
+            tr['account_id'] = account.get('id')
+            if data_since and tr.get('date') and tr['date'][:10] < data_since:
+                continue
+            filtered.append(tr)
+
+        t_page_end = perf_counter()
+        print(
+            f"   📄 {account.get('name', 'Conta')} página {page}/{max(total_pages, 1)}: {len(filtered)}/{len(transactions)} válidas (Total na conta: {total_results}) em {t_page_end - t_page_start:.2f}s"
+        )
+        return filtered, total_pages
 
-                    t_page_end = perf_counter()
+    def _iter_transaction_pages(self, accounts, item_id, data_since, fetch_plan, failed):
+        """Gera (índice da conta, página, transações filtradas) à medida que as páginas chegam.
+
+        A primeira página de cada conta informa o total; as demais (e as outras contas) são buscadas
+        em paralelo pelo pool compartilhado, com no máximo Config.SYNC_MAX_PAGE_REQUESTS páginas em
+        andamento. Novas páginas só são pedidas quando o consumidor pede o próximo item, então um
+        consumidor lento segura a busca. Contas com erro entram em failed e deixam de ser buscadas.
+        """
+        page_size = 500
+        window = max(1, Config.SYNC_MAX_PAGE_REQUESTS)
+        executor = self.get_page_executor()
+        to_fetch = deque((index, 1) for index in range(len(accounts)))
+        pending = {}
+        while to_fetch or pending:
+            while to_fetch and len(pending) < window:
+                index, page = to_fetch.popleft()
+                if index in failed:
+                    continue
+                account = accounts[index]
+                if page == 1:
+                    print(f"📊 Buscando TODAS transações de {account.get('name', 'Conta')}...")
+                date_from = (fetch_plan or {}).get(account.get('id'), {}).get('from', data_since)
+                future = executor.submit(self._fetch_transactions_page, item_id, account, page, page_size,
+                                         data_since, date_from)
+                pending[future] = (index, page)
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, page = pending.pop(future)
+                if index in failed:
+                    continue
+                try:
+                    filtered, total_pages = future.result()
+                except Exception as e:
+                    # Mesmo comportamento do laço sequencial: a conta com erro fica de fora
+                    failed.add(index)
                     print(
-                        f"   📄 Página {page}: {len(filtered)}/{len(transactions)} válidas (Total na conta: {len(account_transactions)}/{total_results}) em {t_page_end - t_page_start:.2f}s"
+                        f"   ❌ Erro ao buscar transações de {accounts[index].get('name', 'Conta')}: {e}"
                     )
-                    if len(transactions) < page_size:
-                        break
-                    page += 1
+                    continue
+                self._report_progress(pages=1, connection=item_id)
+                if page == 1:
+                    to_fetch.extend((index, next_page) for next_page in range(2, total_pages + 1))
+                yield index, page, filtered
 
-                all_transactions.extend(account_transactions)
-                print(
-                    f"   ✅ {len(account_transactions)} transações carregadas (após filtro) para {account.get('name', 'Conta')}"
-                )
-            except Exception as e:
-                print(
-                    f"   ❌ Erro ao buscar transações de {account.get('name', 'Conta')}: {e}"
-                )
+    def fetch_transactions_silent(self, accounts, item_id=None, fetch_plan=None, report=None):
+        """Busca transações sem output no console - TODAS as transações com paginação.
+
+        Aplica filtro opcional por data inicial (data_since) definido por conexão.
+        item_id padrão: conexão atual.
+        fetch_plan (ver _plan_transaction_fetch) define a data inicial por conta; sem ele a busca
+        começa em data_since. report, se informado, recebe 'failed_account_ids'.
+        As páginas são buscadas em paralelo (ver _iter_transaction_pages). O resultado mantém a ordem
+        das contas e das páginas, sem transações repetidas (a paginação por offset pode repetir itens).
+        Carrega o histórico inteiro em memória: sincronizações grandes usam iter_transaction_batches.
+        """
+        t_accounts_loop_start = perf_counter()
+        all_transactions: list[dict] = []
+        item_id = item_id or self.current_item_id
+        data_since = (self.oauth_manager.get_connection_info(item_id) or {}).get('data_since') if item_id else None
+
+        # Páginas recebidas por conta (índice em accounts) e contas com erro
+        pages: dict[int, dict[int, list[dict]]] = {index: {} for index in range(len(accounts))}
+        failed: set[int] = set()
+        for index, page, filtered in self._iter_transaction_pages(accounts, item_id, data_since, fetch_plan, failed):
+            pages[index][page] = filtered
+
+        seen_ids = set()
+        for index, account in enumerate(accounts):
+            if index in failed:
                 continue
+            account_transactions: list[dict] = []
+            for page in sorted(pages[index]):
+                for tr in pages[index][page]:
+                    transaction_id = tr.get('id')
+                    if transaction_id is not None:
+                        if transaction_id in seen_ids:
+                            continue
+                        seen_ids.add(transaction_id)
+                    account_transactions.append(tr)
+            all_transactions.extend(account_transactions)
+            print(
+                f"   ✅ {len(account_transactions)} transações carregadas (após filtro) para {account.get('name', 'Conta')}"
+            )
 
+        if report is not None:
+            report['failed_account_ids'] = {accounts[index].get('id') for index in failed}
         print(
             f"🎯 TOTAL FINAL: {len(all_transactions)} transações de todas as contas (após filtros) em {perf_counter() - t_accounts_loop_start:.2f}s"
         )
         return all_transactions
+
+    def iter_transaction_batches(self, accounts, item_id=None, fetch_plan=None, report=None, batch_size=None):
+        """Versão em fluxo de fetch_transactions_silent: gera lotes de até batch_size transações
+        (padrão Config.SYNC_WRITE_BATCH_SIZE) na ordem em que as páginas chegam.
+
+        Só o lote atual e as páginas em andamento ficam em memória. Repetições entre lotes não são
+        removidas (a gravação por id é idempotente). Uma conta que falha no meio mantém os lotes já
+        entregues, mas entra em report['failed_account_ids'] (sua marca d'água não avança).
+        report, se informado, recebe também 'latest_dates' (ver _track_latest_dates) e
+        'transactions_count'.
+        """
+        t_start = perf_counter()
+        batch_size = max(1, batch_size or Config.SYNC_WRITE_BATCH_SIZE)
+        item_id = item_id or self.current_item_id
+        data_since = (self.oauth_manager.get_connection_info(item_id) or {}).get('data_since') if item_id else None
+
+        failed: set[int] = set()
+        latest: dict[str, str] = {}
+        total = 0
+        batch: list[dict] = []
+        for _, _, filtered in self._iter_transaction_pages(accounts, item_id, data_since, fetch_plan, failed):
+            self._track_latest_dates(latest, filtered)
+            total += len(filtered)
+            batch.extend(filtered)
+            while len(batch) >= batch_size:
+                yield batch[:batch_size]
+                batch = batch[batch_size:]
+        if batch:
+            yield batch
+
+        if report is not None:
+            report['failed_account_ids'] = {accounts[index].get('id') for index in failed}
+            report['latest_dates'] = latest
+            report['transactions_count'] = total
+        print(
+            f"🎯 TOTAL FINAL: {total} transações de todas as contas (após filtros) em {perf_counter() - t_start:.2f}s"
+        )
     
     def get_oauth_status(self):
         """Retorna status da conexão OAuth"""
@@ -785,7 +1596,7 @@ class FinanceApp:
             
             # Primeiro, vamos listar os conectores para encontrar o Meu Pluggy
             print("🔍 Buscando conector do Meu Pluggy...")
-            connectors_response = requests.get(
+            connectors_response = self.api_request('GET',
                 f"{self.base_url}/connectors",
                 headers={"X-API-KEY": self.api_key}
             )
@@ -824,7 +1635,7 @@ class FinanceApp:
             
             print(f"📤 Enviando payload: {payload}")
             
-            response = requests.post(
+            response = self.api_request('POST',
                 f"{self.base_url}/items",
                 headers={"X-API-KEY": self.api_key, "Content-Type": "application/json"},
                 json=payload,
@@ -884,7 +1695,7 @@ class FinanceApp:
         last_status = None
         for attempt in range(30):  # até ~60s
             try:
-                response = requests.get(
+                response = self.api_request('GET',
                     f"{self.base_url}/items/{item_id}",
                     headers={"X-API-KEY": self.api_key},
                     timeout=15
@@ -921,7 +1732,7 @@ class FinanceApp:
                         # Recriar rapidamente uma única vez
                         if attempt < 5:  # só se aconteceu cedo
                             try:
-                                recreate = requests.post(
+                                recreate = self.api_request('POST',
                                     f"{self.base_url}/items",
                                     headers={"X-API-KEY": self.api_key, "Content-Type": "application/json"},
                                     json={"connectorId": 200, "parameters": {}, "clientUserId": f"retry_{int(time.time())}"},
@@ -944,9 +1755,27 @@ class FinanceApp:
         print("❌ Timeout aguardando URL OAuth (sem sucesso)")
         return None
     
-    def sync_single_connection(self, item_id: str):
-        """Sincroniza uma conexão específica com atualização forçada"""
+    def sync_single_connection(self, item_id: str, full: bool = False):
+        """Sincroniza uma conexão específica com atualização forçada (uma por vez por conexão, ver SyncLeaseSet).
+
+        A busca de transações é incremental (ver _plan_transaction_fetch); full força a reconciliação
+        completa de todas as contas.
+        """
+        leases = SyncLeaseSet(self.sync_job_id)
+        holder = leases.acquire(item_id)
+        if holder:
+            print(f"⏳ Conexão {item_id} já está sendo sincronizada (job {holder.get('job_id') or holder.get('owner')})")
+            return False
+        try:
+            return self._sync_single_connection(item_id, full)
+        finally:
+            leases.close()
+
+    def _sync_single_connection(self, item_id: str, full: bool = False):
+        """Corpo de sync_single_connection, executado com a lease da conexão"""
         try:
+            t_start = perf_counter()
+            self._report_progress(phase='autenticando')
             if not self.authenticate():
                 print("❌ Erro na autenticação")
                 return False
@@ -955,13 +1784,15 @@ class FinanceApp:
             
             # FORÇA ATUALIZAÇÃO DOS DADOS NO MEU PLUGGY PRIMEIRO
             print("🚀 Atualizando dados no Meu Pluggy...")
+            self._report_progress(phase='atualizando na Pluggy', connection=item_id)
             update_success = self.force_update_account_data(item_id)
+            t_refresh_end = perf_counter()
             
             if not update_success:
                 print("⚠️ Falha na atualização forçada, mas continuando...")
             
             # Verifica status da conexão após atualização
-            response = requests.get(
+            response = self.api_request('GET',
                 f"{self.base_url}/items/{item_id}",
                 headers={"X-API-KEY": self.api_key}
             )
@@ -980,83 +1811,62 @@ class FinanceApp:
             print("✅ Dados atualizados! Buscando contas e transações...")
             
             # Busca contas (agora com dados atualizados)
-            accounts_response = requests.get(
+            accounts_response = self.api_request('GET',
                 f"{self.base_url}/accounts",
                 headers={"X-API-KEY": self.api_key},
                 params={"itemId": item_id}
             )
             
+            # Dados da conexão lidos uma vez (nome e filtro de data valem para todas as páginas)
+            connection_info = self.oauth_manager.get_connection_info(item_id) or {}
+            bank_name = connection_info.get('bank_name', f'Banco_{item_id[:8]}')
+            data_since = connection_info.get('data_since')
+
             accounts = []
             if accounts_response.status_code == 200:
                 accounts_data = accounts_response.json()
                 accounts = accounts_data.get('results', [])
                 
                 # Adiciona informações da conexão
-                connection_info = self.oauth_manager.get_connection_info(item_id)
-                bank_name = connection_info.get('bank_name', f'Banco_{item_id[:8]}') if connection_info else f'Banco_{item_id[:8]}'
-                
                 for account in accounts:
                     account['connection_name'] = bank_name
                     account['item_id'] = item_id
 
-            # Busca TODAS as transações com paginação completa
-            print("🔄 Buscando TODAS as transações com paginação...")
-            all_transactions = []
-            page = 1
-            page_size = 500
-            
-            while True:
-                transactions_response = requests.get(
-                    f"{self.base_url}/transactions",
-                    headers={"X-API-KEY": self.api_key},
-                    params={
-                        "itemId": item_id, 
-                        "pageSize": page_size,
-                        "page": page
-                    }
-                )
-                
-                if transactions_response.status_code == 200:
-                    transactions_data = transactions_response.json()
-                    transactions = transactions_data.get('results', [])
-                    total_results = transactions_data.get('totalResults', 0)
-                    
-                    if not transactions:
-                        break
-                    
-                    # Adiciona informações da conexão
-                    connection_info = self.oauth_manager.get_connection_info(item_id)
-                    bank_name = connection_info.get('bank_name', f'Banco_{item_id[:8]}') if connection_info else f'Banco_{item_id[:8]}'
-                    
-                    filtered_page = []
-                    connection_info_local = self.oauth_manager.get_connection_info(item_id)
-                    data_since = connection_info_local.get('data_since') if connection_info_local else None
-                    for transaction in transactions:
-                        # aplica filtro antes de guardar
-                        if data_since and transaction.get('date') and transaction['date'][:10] < data_since:
-                            continue
-                        transaction['connection_name'] = bank_name
-                        transaction['item_id'] = item_id
-                        filtered_page.append(transaction)
-
-                    all_transactions.extend(filtered_page)
-                    
-                    print(f"   📄 Página {page}: {len(transactions)} transações (Total: {len(all_transactions)}/{total_results})")
-                    
-                    # Se pegamos menos que o page_size, chegamos ao fim
-                    if len(transactions) < page_size:
-                        break
-                    
-                    page += 1
-                else:
-                    print(f"❌ Erro na página {page}: {transactions_response.status_code}")
-                    break
-
-            # Salva usando sincronização incremental
+            # Busca as transações por conta (incremental a partir da marca d'água, como em
+            # _fetch_connection_data), gravando em lotes à medida que chegam
+            fetch_plan = self._plan_transaction_fetch(item_id, accounts, data_since, force_full=full)
+            report = {}
+            self._report_progress(phase='buscando e gravando transações', connection=item_id)
             self.current_item_id = item_id
-            result = self.save_to_database(accounts, all_transactions)
+            writer = SyncBatchWriter(self, item_id)
+            writer.write(accounts=accounts)
+            for batch in self.iter_transaction_batches(accounts, item_id, fetch_plan=fetch_plan, report=report):
+                # Adiciona informações da conexão
+                for transaction in batch:
+                    transaction['connection_name'] = bank_name
+                    transaction['item_id'] = item_id
+                writer.write(transactions=batch)
+                if writer.error:
+                    break
+            t_end = perf_counter()
             
-            if result and result.get('success'):
+            if not writer.error:
+                self._report_progress(phase='gravando', connection=item_id)
+                result = writer.finish()
+                if not result.get('success'):
+                    return False
+                # persist_s já foi reportado lote a lote pelo writer
+                self._report_progress(timings={
+                    'refresh_s': t_refresh_end - t_start,
+                    'fetch_s': t_end - t_refresh_end - writer.persist_s
+                }, connection=item_id)
+                # Contas com erro na busca ficam de fora: suas marcas d'água ficam como estavam
+                from database import Database
+                Database().save_sync_watermarks(item_id, self._build_watermarks(
+                    accounts, report.get('latest_dates', {}), fetch_plan, data_since,
+                    report.get('failed_account_ids', set())
+                ))
+
                 # Atualiza status da conexão
                 self.oauth_manager.update_status(item_id, 'active')
                 
@@ -13,13 +13,23 @@ Sistema completo de OAuth para Meu Pluggy com suporte a múltiplas contas:
 
 import json
 import os
+import threading
 import time
 import webbrowser
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Tuple, List
 
 class OAuthManager:
-    def __init__(self, storage_file: str | None = None):
+    """Registro das conexões OAuth, guardado na tabela connections do banco do ambiente.
+
+    O antigo arquivo oauth_connections_{env}.json é importado uma única vez para o banco e
+    renomeado para <arquivo>.migrated.
+    """
+    # (arquivo JSON, banco) já verificados para a importação única neste processo
+    _imported_files: set = set()
+    _import_lock = threading.Lock()
+
+    def __init__(self, storage_file: str | None = None, db_path: str | None = None):
         # Seleciona arquivo de acordo com ambiente atual se não fornecido
         if storage_file is None:
             try:
@@ -29,21 +39,61 @@ class OAuthManager:
                 storage_file = "data/oauth_connections.json"
         self.storage_file = storage_file
         self.ensure_directory()
+        from database import Database
+        self.db = Database(db_path)
+        self._import_legacy_file()
     
     def ensure_directory(self):
         """Cria diretório se não existir"""
         directory = os.path.dirname(self.storage_file)
         if directory and not os.path.exists(directory):
             os.makedirs(directory)
+
+    def _import_legacy_file(self):
+        """Importa o JSON de conexões para a tabela connections (uma vez) e o renomeia para .migrated"""
+        key = (os.path.abspath(self.storage_file), os.path.abspath(self.db.db_path))
+        with self._import_lock:
+            if key in self._imported_files:
+                return
+            try:
+                if os.path.exists(self.storage_file):
+                    connections = self._read_legacy_file()
+                    imported = self.db.import_connections(connections)
+                    if imported is None:
+                        # Mantém o arquivo: nova tentativa na próxima inicialização
+                        return
+                    os.replace(self.storage_file, self.storage_file + '.migrated')
+                    print(f"📦 {imported} conexão(ões) importada(s) de {self.storage_file} para o banco")
+                self._imported_files.add(key)
+            except Exception as e:
+                print(f"❌ Erro ao importar conexões OAuth: {e}")
+
+    def _read_legacy_file(self) -> Dict:
+        """Lê o JSON de conexões (formato de várias conexões ou o antigo de conexão única)"""
+        with open(self.storage_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        # Se for o formato antigo (single connection), converte
+        if isinstance(data, dict) and 'item_id' in data:
+            old_data = data
+            return {
+                old_data['item_id']: {
+                    "item_id": old_data['item_id'],
+                    "bank_name": "Conta Principal",
+                    "status": old_data.get('status', 'active'),
+                    "oauth_url": old_data.get('oauth_url'),
+                    "expires_at": old_data.get('expires_at'),
+                    "created_at": old_data.get('created_at'),
+                    "last_updated": old_data.get('last_updated')
+                }
+            }
+        return data
     
     def save_oauth_data(self, item_id: str, bank_name: str = None, status: str = "active", 
                        oauth_url: str = None, expires_at: str = None):
         """Salva dados OAuth para múltiplas conexões"""
         try:
-            # Carrega conexões existentes
-            connections = self.load_all_connections()
-            
-            # Cria nova conexão
+            # Cria nova conexão (ou substitui a existente, mantendo o connection_id)
             connection_data = {
                 "item_id": item_id,
                 "bank_name": bank_name or f"Banco_{item_id[:8]}",
@@ -56,14 +106,7 @@ class OAuthManager:
                 "data_since": None
             }
             
-            # Adiciona ou atualiza conexão
-            connections[item_id] = connection_data
-            
-            # Salva todas as conexões
-            with open(self.storage_file, 'w', encoding='utf-8') as f:
-                json.dump(connections, f, indent=2, ensure_ascii=False)
-            
-            return True
+            return self.db.save_connection(connection_data) is not None
         except Exception as e:
             print(f"❌ Erro ao salvar OAuth: {e}")
             return False
@@ -79,131 +122,48 @@ class OAuthManager:
         return None
     
     def load_all_connections(self) -> Dict:
-        """Carrega todas as conexões OAuth"""
-        try:
-            if not os.path.exists(self.storage_file):
-                return {}
-            
-            with open(self.storage_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Se for o formato antigo (single connection), converte
-            if isinstance(data, dict) and 'item_id' in data:
-                old_data = data
-                new_format = {
-                    old_data['item_id']: {
-                        "item_id": old_data['item_id'],
-                        "bank_name": "Conta Principal",
-                        "status": old_data.get('status', 'active'),
-                        "oauth_url": old_data.get('oauth_url'),
-                        "expires_at": old_data.get('expires_at'),
-                        "created_at": old_data.get('created_at'),
-                        "last_updated": old_data.get('last_updated')
-                    }
-                }
-                # Salva no novo formato
-                with open(self.storage_file, 'w', encoding='utf-8') as f:
-                    json.dump(new_format, f, indent=2, ensure_ascii=False)
-                return new_format
-            
-            # Garante que cada conexão tenha o campo data_since
-            updated = False
-            for item_id, conn in data.items():
-                if 'data_since' not in conn:
-                    conn['data_since'] = None
-                    updated = True
-            if updated:
-                try:
-                    with open(self.storage_file, 'w', encoding='utf-8') as f:
-                        json.dump(data, f, indent=2, ensure_ascii=False)
-                except Exception:
-                    pass
-            return data
-        except Exception as e:
-            print(f"❌ Erro ao carregar OAuth: {e}")
-            return {}
+        """Carrega todas as conexões OAuth (item_id -> dados, incluindo connection_id)"""
+        return self.db.get_connections()
     
     def has_valid_connection(self) -> bool:
         """Verifica se há pelo menos uma conexão OAuth válida"""
-        connections = self.load_all_connections()
-        return any(
-            conn.get('status') == 'active' and conn.get('item_id')
-            for conn in connections.values()
-        )
+        connections = self.db.get_connections(status='active')
+        return any(conn.get('item_id') for conn in connections.values())
     
     def get_item_id(self) -> Optional[str]:
         """Obtém item_id da primeira conexão ativa (compatibilidade)"""
-        connections = self.load_all_connections()
-        for item_id, data in connections.items():
-            if data.get('status') == 'active':
-                return item_id
-        return None
+        return next(iter(self.db.get_connections(status='active')), None)
     
     def get_all_item_ids(self) -> List[str]:
         """Obtém todos os item_ids ativos"""
-        connections = self.load_all_connections()
-        return [
-            item_id for item_id, data in connections.items()
-            if data.get('status') == 'active'
-        ]
+        return list(self.db.get_connections(status='active'))
     
     def get_active_connections(self) -> Dict:
         """Obtém todas as conexões ativas"""
-        connections = self.load_all_connections()
-        return {
-            item_id: data for item_id, data in connections.items()
-            if data.get('status') == 'active'
-        }
+        return self.db.get_connections(status='active')
     
     def get_connection_info(self, item_id: str) -> Optional[Dict]:
         """Obtém informações de uma conexão específica"""
-        connections = self.load_all_connections()
-        return connections.get(item_id)
+        return self.db.get_connection(item_id)
     
     def update_connection_name(self, item_id: str, bank_name: str):
         """Atualiza nome da conexão"""
-        connections = self.load_all_connections()
-        if item_id in connections:
-            connections[item_id]['bank_name'] = bank_name
-            connections[item_id]['last_updated'] = datetime.now().isoformat()
-            
-            with open(self.storage_file, 'w', encoding='utf-8') as f:
-                json.dump(connections, f, indent=2, ensure_ascii=False)
-            return True
-        return False
+        return self.db.update_connection(item_id, bank_name=bank_name, last_updated=datetime.now().isoformat())
     
     def update_status(self, item_id: str, status: str):
         """Atualiza status de uma conexão específica"""
-        connections = self.load_all_connections()
-        if item_id in connections:
-            connections[item_id]['status'] = status
-            connections[item_id]['last_updated'] = datetime.now().isoformat()
-            
-            with open(self.storage_file, 'w', encoding='utf-8') as f:
-                json.dump(connections, f, indent=2, ensure_ascii=False)
-            return True
-        return False
+        return self.db.update_connection(item_id, status=status, last_updated=datetime.now().isoformat())
     
-    def remove_connection(self, item_id: str):
-        """Remove uma conexão específica"""
-        connections = self.load_all_connections()
-        if item_id in connections:
-            del connections[item_id]
-            
-            with open(self.storage_file, 'w', encoding='utf-8') as f:
-                json.dump(connections, f, indent=2, ensure_ascii=False)
-            return True
-        return False
+    def remove_connection(self, item_id: str, remove_data: bool = False) -> Optional[Dict]:
+        """Remove uma conexão específica; com remove_data apaga também suas contas e transações.
+
+        Retorna {'accounts_removed', 'transactions_removed'} ou None se a conexão não existe.
+        """
+        return self.db.delete_connection(item_id, remove_data=remove_data)
     
     def clear_oauth_data(self):
         """Remove TODAS as conexões OAuth (para reconectar tudo)"""
-        try:
-            if os.path.exists(self.storage_file):
-                os.remove(self.storage_file)
-            return True
-        except Exception as e:
-            print(f"❌ Erro ao limpar OAuth: {e}")
-            return False
+        return self.db.delete_all_connections()
     
     def get_connections_summary(self) -> Dict:
         """Obtém resumo de todas as conexões"""
@@ -239,23 +199,12 @@ class OAuthManager:
 
         data_since: string YYYY-MM-DD ou None para remover filtro.
         """
-        connections = self.load_all_connections()
-        if item_id in connections:
-            # Validação simples de formato
-            if data_since:
-                if len(data_since) != 10:
-                    return False
-                try:
-                    datetime.strptime(data_since, '%Y-%m-%d')
-                except ValueError:
-                    return False
-            connections[item_id]['data_since'] = data_since
-            connections[item_id]['last_updated'] = datetime.now().isoformat()
+        # Validação simples de formato
+        if data_since:
+            if len(data_since) != 10:
+                return False
             try:
-                with open(self.storage_file, 'w', encoding='utf-8') as f:
-                    json.dump(connections, f, indent=2, ensure_ascii=False)
-                return True
-            except Exception as e:
-                print(f"❌ Erro ao salvar data_since: {e}")
+                datetime.strptime(data_since, '%Y-%m-%d')
+            except ValueError:
                 return False
-        return False
+        return self.db.update_connection(item_id, data_since=data_since, last_updated=datetime.now().isoformat())
@@ -0,0 +1,173 @@
+"""
+Benchmark de memória da sincronização: gravação em fluxo (lotes) x histórico inteiro em memória.
+
+Gera um histórico sintético de transações (padrão: 1.000.000) servido em páginas de 500, como a
+API da Pluggy, e grava num banco temporário por dois caminhos:
+
+- fluxo:    FinanceApp.iter_transaction_batches -> SyncBatchWriter (caminho de sync_existing_connection)
+- acumulado: FinanceApp.fetch_transactions_silent -> save_to_database (carrega tudo antes de gravar)
+
+Cada modo roda em um subprocesso próprio, para que o pico de RSS (ru_maxrss) de um não contamine o
+outro; o pico do tracemalloc mede só as alocações Python feitas durante a sincronização. Sem o
+módulo resource (Windows) o relatório traz só o tracemalloc.
+
+Uso (na raiz do app):
+    python scripts/benchmark_sync_memory.py
+    python scripts/benchmark_sync_memory.py --transactions 200000 --batch-size 2000
+    python scripts/benchmark_sync_memory.py --mode fluxo
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+try:
+    import resource
+except ImportError:  # Windows: sem ru_maxrss, o relatório fica só com o tracemalloc
+    resource = None
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_SIZE = 500
+MODES = ('fluxo', 'acumulado')
+
+
+def _synthetic_app_class():
+    """FinanceApp cujas páginas de transações são geradas localmente (sem rede)"""
+    from finance_app import FinanceApp
+
+    class SyntheticFinanceApp(FinanceApp):
+        def _fetch_transactions_page(self, item_id, account, page, page_size, data_since, date_from=None):
+            total = account['synthetic_total']
+            start = (page - 1) * page_size
+            transactions = []
+            for i in range(start, min(start + page_size, total)):
+                transactions.append({
+                    'id': f"{account['id']}-tx{i:07d}",
+                    'description': f"Compra sintética {i % 997}",
+                    'amount': -((i % 9000) / 100 + 1),
+                    'date': f"20{15 + i % 10}-{1 + i % 12:02d}-{1 + i % 28:02d}T12:00:00.000Z",
+                    'type': 'DEBIT' if i % 5 else 'CREDIT',
+                    'category': f"Categoria {i % 40}",
+                    'merchant': {'name': f"Loja {i % 300}"},
+                    'accountId': account['id'],
+                    'updatedAt': '2025-01-01T00:00:00.000Z',
+                    'account_name': account['name'],
+                    'account_id': account['id'],
+                })
+            return transactions, max(1, -(-total // page_size))
+
+    return SyntheticFinanceApp
+
+
+def _rss_peak_mb():
+    """Pico de RSS do processo em MB (ru_maxrss) ou None sem o módulo resource"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_mode(mode, transactions, accounts_count, batch_size):
+    """Executa um modo no processo atual (banco em diretório temporário) e retorna as medições"""
+    workdir = tempfile.mkdtemp(prefix='sync_memory_')
+    os.makedirs(os.path.join(workdir, 'data'))
+    os.chdir(workdir)
+    sys.path.insert(0, APP_ROOT)
+
+    from config import Config
+    from finance_app import SyncBatchWriter
+    Config.SYNC_WRITE_BATCH_SIZE = batch_size
+    app = _synthetic_app_class()()
+    item_id = 'benchmark-item'
+    per_account = -(-transactions // accounts_count)
+    accounts = [
+        {
+            'id': f'acc{index}', 'name': f'Conta {index}', 'type': 'BANK', 'balance': 0, 'currencyCode': 'BRL',
+            'item_id': item_id, 'connection_name': 'Benchmark',
+            'synthetic_total': min(per_account, transactions - index * per_account)
+        }
+        for index in range(accounts_count)
+    ]
+
+    rss_before_mb = _rss_peak_mb()
+    tracemalloc.start()
+    t_start = perf_counter()
+    if mode == 'fluxo':
+        writer = SyncBatchWriter(app, item_id)
+        writer.write(accounts=accounts)
+        for batch in app.iter_transaction_batches(accounts, item_id):
+            for transaction in batch:
+                transaction['connection_name'] = 'Benchmark'
+                transaction['item_id'] = item_id
+            writer.write(transactions=batch)
+        result = writer.finish() if not writer.error else {'success': False, 'message': writer.error}
+    else:
+        all_transactions = app.fetch_transactions_silent(accounts, item_id)
+        for transaction in all_transactions:
+            transaction['connection_name'] = 'Benchmark'
+            transaction['item_id'] = item_id
+        result = app.save_to_database(accounts, all_transactions, item_id=item_id)
+    elapsed = perf_counter() - t_start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = result.get('stats', {})
+    return {
+        'mode': mode,
+        'success': bool(result.get('success')),
+        'transactions_inserted': stats.get('transactions_inserted', 0),
+        'seconds': round(elapsed, 2),
+        'tracemalloc_peak_mb': round(peak / 1024 / 1024, 1),
+        'rss_peak_mb': _rss_peak_mb(),
+        'rss_before_mb': rss_before_mb,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de memória da sincronização em lotes')
+    parser.add_argument('--transactions', type=int, default=1_000_000, help='transações sintéticas (padrão: 1000000)')
+    parser.add_argument('--accounts', type=int, default=4, help='contas entre as quais o histórico é dividido')
+    parser.add_argument('--batch-size', type=int, default=5000, help='transações por lote gravado no modo fluxo')
+    parser.add_argument('--mode', choices=MODES + ('ambos',), default='ambos')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Subprocesso: só a saída JSON na última linha interessa ao processo pai
+        measurement = run_mode(args.mode, args.transactions, args.accounts, args.batch_size)
+        print(json.dumps(measurement))
+        return
+
+    modes = MODES if args.mode == 'ambos' else (args.mode,)
+    print(f"📊 Benchmark de memória: {args.transactions} transações, {args.accounts} contas, lote de {args.batch_size}")
+    results = []
+    for mode in modes:
+        print(f"⏳ Executando modo '{mode}'...")
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', '--mode', mode,
+             '--transactions', str(args.transactions), '--accounts', str(args.accounts),
+             '--batch-size', str(args.batch_size)],
+            capture_output=True, text=True, encoding='utf-8', errors='replace'
+        )
+        lines = completed.stdout.strip().splitlines()
+        if completed.returncode != 0 or not lines:
+            print(f"❌ Modo '{mode}' falhou (código {completed.returncode}):\n{completed.stderr[-2000:]}")
+            continue
+        results.append(json.loads(lines[-1]))
+
+    print(f"\n{'modo':<10} {'ok':<4} {'inseridas':>10} {'tempo (s)':>10} {'pico tracemalloc (MB)':>22} {'pico RSS (MB)':>14}")
+    for r in results:
+        print(
+            f"{r['mode']:<10} {'sim' if r['success'] else 'não':<4} {r['transactions_inserted']:>10} {r['seconds']:>10.2f} "
+            f"{r['tracemalloc_peak_mb']:>22.1f} "
+            f"{'n/d' if r['rss_peak_mb'] is None else format(r['rss_peak_mb'], '.1f'):>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
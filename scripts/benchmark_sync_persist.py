@@ -0,0 +1,134 @@
+"""
+Benchmark de gravação da sincronização: Database.save_sync_data_incremental_with_stats.
+
+Gera um histórico sintético determinístico (padrão: 100.000 transações em 4 contas, na ordem em
+que a Pluggy entrega: por conta, da mais recente para a mais antiga) e mede, num banco temporário:
+
+- inserção:   primeira sincronização, todas as transações são novas
+- inalterado: a mesma sincronização repetida (nada mudou; impressão digital igual)
+- alterado:   uma em cada dez transações com novo valor e descrição
+
+Os casos rodam em sequência sobre o mesmo banco. Com --batch-size as transações são gravadas em
+lotes, como o SyncBatchWriter faz durante a sincronização (novas em espera, inseridas no fim por
+merge_staged_transactions); sem ele, em uma única chamada.
+
+Uso (na raiz do app):
+    python scripts/benchmark_sync_persist.py
+    python scripts/benchmark_sync_persist.py --transactions 200000 --batch-size 5000
+    python scripts/benchmark_sync_persist.py --repeat 3
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CASES = ('inserção', 'inalterado', 'alterado')
+
+
+def build_history(transactions, accounts_count, seed=42):
+    """Contas e transações sintéticas (mesma semente, mesmos dados)"""
+    rng = random.Random(seed)
+    accounts = [
+        {'id': f'acc{index}', 'name': f'Conta {index}', 'type': 'BANK', 'balance': 0, 'currencyCode': 'BRL',
+         'connection_name': 'Benchmark'}
+        for index in range(accounts_count)
+    ]
+    history = []
+    per_account = -(-transactions // accounts_count)
+    for index in range(accounts_count):
+        total = min(per_account, transactions - index * per_account)
+        # Da mais recente para a mais antiga, ~10 anos de histórico
+        for i in range(total):
+            day = total - i
+            history.append({
+                'id': f'{rng.getrandbits(64):016x}',
+                'description': f'Compra {rng.choice(("mercado", "posto", "farmácia", "padaria", "pix"))} {rng.randrange(5000)}',
+                'amount': -round(rng.uniform(1, 900), 2),
+                'date': f'{2015 + day * 10 // total}-{1 + day % 12:02d}-{1 + day % 28:02d}T{day % 24:02d}:00:00.000Z',
+                'type': 'DEBIT' if rng.random() < 0.8 else 'CREDIT',
+                'category': f'Categoria {rng.randrange(40)}',
+                'merchant': {'name': f'Loja {rng.randrange(300)}'},
+                'accountId': f'acc{index}',
+                'account_name': f'Conta {index}',
+                'connection_name': 'Benchmark',
+                'updatedAt': '2025-01-01T00:00:00.000Z',
+            })
+    return accounts, history
+
+
+def changed_history(history):
+    """Cópia do histórico com uma em cada dez transações alterada na API"""
+    changed = []
+    for i, transaction in enumerate(history):
+        if i % 10 == 0:
+            transaction = {**transaction, 'amount': transaction['amount'] - 1,
+                           'description': transaction['description'] + ' (ajuste)',
+                           'updatedAt': '2025-02-01T00:00:00.000Z'}
+        changed.append(transaction)
+    return changed
+
+
+def persist(database, item_id, accounts, transactions, batch_size):
+    """Grava como a sincronização: uma chamada, ou lotes de batch_size como o SyncBatchWriter"""
+    if not batch_size:
+        return database.save_sync_data_incremental_with_stats(item_id, accounts, transactions)
+    database.discard_staged_transactions(item_id)
+    result = database.save_sync_data_incremental_with_stats(item_id, accounts, [], record_history=False)
+    for start in range(0, len(transactions), batch_size):
+        result = database.save_sync_data_incremental_with_stats(
+            item_id, [], transactions[start:start + batch_size], record_history=False, stage_new=True)
+        if not result.get('success'):
+            return result
+    return database.merge_staged_transactions(item_id)
+
+
+def run(transactions, accounts_count, batch_size):
+    """Executa os três casos num banco novo e retorna [(caso, segundos, sucesso)]"""
+    sys.path.insert(0, APP_ROOT)
+    from database import Database, get_connection_manager
+
+    accounts, history = build_history(transactions, accounts_count)
+    workdir = tempfile.mkdtemp(prefix='sync_persist_')
+    results = []
+    try:
+        database = Database(os.path.join(workdir, 'finance_app_benchmark.db'))
+        for case, data in (('inserção', history), ('inalterado', history), ('alterado', changed_history(history))):
+            t_start = perf_counter()
+            result = persist(database, 'benchmark-item', accounts, data, batch_size)
+            results.append((case, perf_counter() - t_start, bool(result.get('success'))))
+        get_connection_manager(database.db_path).close_all()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de gravação da sincronização')
+    parser.add_argument('--transactions', type=int, default=100_000, help='transações sintéticas (padrão: 100000)')
+    parser.add_argument('--accounts', type=int, default=4, help='contas entre as quais o histórico é dividido')
+    parser.add_argument('--batch-size', type=int, default=0,
+                        help='transações por chamada (padrão: 0, todas em uma chamada)')
+    parser.add_argument('--repeat', type=int, default=1, help='repetições (cada uma em um banco novo)')
+    args = parser.parse_args()
+
+    print(f"📊 Benchmark de gravação: {args.transactions} transações, {args.accounts} contas, "
+          f"{'lotes de ' + str(args.batch_size) if args.batch_size else 'uma chamada'}")
+    timings = {case: [] for case in CASES}
+    for _ in range(args.repeat):
+        for case, seconds, success in run(args.transactions, args.accounts, args.batch_size):
+            if not success:
+                print(f"❌ Caso '{case}' falhou")
+            timings[case].append(seconds)
+
+    print(f"\n{'caso':<12} {'melhor (s)':>10} {'mediana (s)':>12}")
+    for case in CASES:
+        values = sorted(timings[case])
+        print(f"{case:<12} {values[0]:>10.2f} {values[len(values) // 2]:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
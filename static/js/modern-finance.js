@@ -608,6 +608,78 @@ window.modernSyncAccount = function() {
     }
 };
 
+// Poll a background sync job until it finishes; resolves with the job's final result
+window.waitForSyncJob = function(jobId, onProgress, intervalMs = 1500) {
+    return new Promise((resolve, reject) => {
+        const poll = () => {
+            fetch(`/api/sync_jobs/${jobId}`)
+                .then(response => response.json())
+                .then(job => {
+                    if (!job.success) {
+                        reject(job.message);
+                        return;
+                    }
+                    if (onProgress) {
+                        onProgress(job);
+                    }
+                    if (job.status === 'succeeded' || job.status === 'failed') {
+                        resolve(job.result || { success: false, message: job.message });
+                    } else {
+                        setTimeout(poll, intervalMs);
+                    }
+                })
+                .catch(reject);
+        };
+        poll();
+    });
+};
+
+// Follow a sync job through the SSE stream (live events); falls back to polling if the stream fails
+window.followSyncJob = function(jobId, onProgress) {
+    if (!window.EventSource) {
+        return waitForSyncJob(jobId, onProgress);
+    }
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`/api/sync/stream?job_id=${encodeURIComponent(jobId)}`);
+        let finished = false;
+        source.addEventListener('progress', event => {
+            const job = JSON.parse(event.data);
+            if (onProgress) {
+                onProgress(job);
+            }
+            if (job.status === 'succeeded' || job.status === 'failed') {
+                finished = true;
+                source.close();
+                resolve(job.result || { success: false, message: job.message });
+            }
+        });
+        source.onerror = () => {
+            if (finished) {
+                return;
+            }
+            source.close();
+            waitForSyncJob(jobId, onProgress).then(resolve, reject);
+        };
+    });
+};
+
+// Short progress text for a sync job (phase, pages fetched, rows written, throughput)
+window.formatSyncJobProgress = function(job) {
+    const parts = [job.phase || 'na fila'];
+    if (job.pages_fetched) {
+        parts.push(`${job.pages_fetched} páginas`);
+    }
+    if (job.rows_written) {
+        parts.push(`${job.rows_written} linhas gravadas`);
+    }
+    if (job.rows_per_s) {
+        parts.push(`${job.rows_per_s} linhas/s`);
+    } else if (job.pages_per_s) {
+        parts.push(`${job.pages_per_s} páginas/s`);
+    }
+    return parts.join(' · ');
+};
+
 // Enhanced notification system for existing alerts
 const originalAlert = window.alert;
 window.alert = function(message) {
@@ -0,0 +1,363 @@
+"""
+🧵 SYNC WORKER - SINCRONIZAÇÕES EM SEGUNDO PLANO
+===============================================
+
+Executa os jobs da tabela sync_jobs fora das requisições HTTP:
+- As rotas apenas enfileiram (enqueue_sync) e devolvem o id do job; pedidos para uma conexão
+  já na fila ou em sincronização são anexados ao job existente
+- Uma thread do próprio app (ou este arquivo como processo separado) consome a fila
+- Fase, páginas buscadas, linhas gravadas e tempos ficam no job (/api/sync_jobs/<id>)
+- Cada evento de progresso também é publicado no SyncEventBus (stream SSE /api/sync/stream)
+
+Uso como processo separado (com SYNC_WORKER_IN_PROCESS=false no app):
+    python sync_worker.py
+"""
+
+import json
+import queue
+import threading
+from datetime import datetime
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from database import Database, get_brasilia_time
+from finance_app import FinanceApp
+
+
+class SyncEventBus:
+    """Distribui os eventos de progresso dos jobs executados neste processo aos streams SSE inscritos"""
+
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[queue.Queue]] = {}
+        # Último evento de cada job em andamento (entregue a quem se inscreve no meio da execução)
+        self._last: Dict[str, Dict] = {}
+
+    def subscribe(self, job_id: str) -> queue.Queue:
+        events = queue.Queue(maxsize=self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(job_id, []).append(events)
+            if job_id in self._last:
+                events.put_nowait(self._last[job_id])
+        return events
+
+    def unsubscribe(self, job_id: str, events: queue.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, [])
+            if events in subscribers:
+                subscribers.remove(events)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    def is_running_here(self, job_id: str) -> bool:
+        """Indica se o job está em execução neste processo (já publicou eventos e não terminou)"""
+        with self._lock:
+            return job_id in self._last
+
+    def publish(self, job_id: str, event: Dict, final: bool = False):
+        with self._lock:
+            if final:
+                self._last.pop(job_id, None)
+            else:
+                self._last[job_id] = event
+            for events in self._subscribers.get(job_id, []):
+                try:
+                    events.put_nowait(event)
+                except queue.Full:
+                    # Cliente lento: descarta o evento (o próximo traz os totais atualizados)
+                    pass
+
+
+sync_event_bus = SyncEventBus()
+
+
+def _throughput(event: Dict, elapsed: Optional[float]) -> Dict:
+    """Completa o evento com tempo decorrido e vazão (páginas/s e linhas gravadas/s)"""
+    elapsed = elapsed or 0.0
+    event['elapsed_s'] = round(elapsed, 3)
+    event['pages_per_s'] = round(event.get('pages_fetched', 0) / elapsed, 2) if elapsed > 0 else 0.0
+    event['rows_per_s'] = round(event.get('rows_written', 0) / elapsed, 2) if elapsed > 0 else 0.0
+    return event
+
+
+class SyncJobProgress:
+    """progress_callback do FinanceApp: acumula o progresso (de várias threads), publica e grava no job.
+
+    Todo evento vai para o SyncEventBus; gravações no banco ocorrem a cada troca de fase ou,
+    no máximo, a cada Config.SYNC_JOB_PROGRESS_INTERVAL.
+    """
+
+    def __init__(self, db: Database, job_id: str):
+        self.db = db
+        self.job_id = job_id
+        self.phase = 'iniciando'
+        self.pages_fetched = 0
+        self.rows_written = 0
+        self.timings: Dict[str, float] = {}
+        # Progresso por conexão (item_id): fase, páginas e linhas gravadas
+        self.connections: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._t_start = perf_counter()
+
+    def __call__(self, phase=None, pages=0, rows=0, timings=None, connection=None):
+        with self._lock:
+            phase_changed = phase is not None and phase != self.phase
+            if phase is not None:
+                self.phase = phase
+            self.pages_fetched += pages
+            self.rows_written += rows
+            for key, value in (timings or {}).items():
+                self.timings[key] = round(self.timings.get(key, 0) + value, 3)
+            if connection is not None:
+                entry = self.connections.setdefault(connection, {'phase': None, 'pages': 0, 'rows': 0})
+                if phase is not None:
+                    entry['phase'] = phase
+                entry['pages'] += pages
+                entry['rows'] += rows
+            sync_event_bus.publish(self.job_id, self.event())
+            now = perf_counter()
+            if not phase_changed and now - self._last_flush < Config.SYNC_JOB_PROGRESS_INTERVAL:
+                return
+            self._last_flush = now
+            # Gravação dentro do lock: o job nunca volta para um estado anterior
+            self.db.update_sync_job(self.job_id, **self.snapshot())
+
+    def snapshot(self) -> Dict:
+        return {
+            'phase': self.phase,
+            'pages_fetched': self.pages_fetched,
+            'rows_written': self.rows_written,
+            'timings': dict(self.timings)
+        }
+
+    def event(self, status: str = 'running') -> Dict:
+        """Evento de progresso para o stream SSE (totais, por conexão e vazão)"""
+        event = {
+            'job_id': self.job_id,
+            'status': status,
+            **self.snapshot(),
+            'connections': {key: dict(value) for key, value in self.connections.items()}
+        }
+        return _throughput(event, perf_counter() - self._t_start)
+
+
+def _run_full_sync(finance_app: FinanceApp, db: Database):
+    """Sincroniza todas as conexões ativas (antigo corpo da rota /sync)"""
+    if not finance_app.oauth_manager.has_valid_connection():
+        return False, 'Nenhuma conexão OAuth configurada. Adicione conexões no painel de gerenciamento.', {
+            'redirect': '/manage_connections'
+        }
+
+    success, message = finance_app.sync_existing_connection()
+    if not success:
+        return False, message, {}
+
+    # Reconciliar categorias após sincronização completa
+    new_cats = db.reconcile_category_mappings()
+    notice = f" - {len(new_cats)} novas categorias aguardam classificação (De-Para)" if new_cats else ''
+    return True, f'✅ {message}{notice}', {}
+
+
+def _run_connection_sync(finance_app: FinanceApp, db: Database, item_id: str, full: bool = False):
+    """Sincroniza uma conexão (antigo corpo da rota /sync_connection/<item_id>); full força a reconciliação completa"""
+    result = finance_app.sync_single_connection(item_id, full=full)
+    if not result:
+        return False, 'Erro na sincronização', {}
+
+    new_cats = db.reconcile_category_mappings()
+    stats = result.get('stats', {})
+    new_notice = f"\n⚠️ {len(new_cats)} novas categorias aguardam De-Para" if new_cats else ''
+    if stats:
+        accounts_msg = f"{stats.get('accounts_inserted', 0)} novas, {stats.get('accounts_updated', 0)} atualizadas, {stats.get('accounts_unchanged', 0)} inalteradas"
+        transactions_msg = f"{stats.get('transactions_inserted', 0)} novas, {stats.get('transactions_updated', 0)} atualizadas, {stats.get('transactions_unchanged', 0)} inalteradas"
+        message = f"Sincronização incremental concluída{new_notice}\n"
+        message += f"💳 Contas: {accounts_msg}\n"
+        message += f"💰 Transações: {transactions_msg}"
+    else:
+        message = 'Sincronização iniciada com sucesso' + new_notice
+    return True, message, {
+        'accounts': result.get('accounts', 0),
+        'transactions': result.get('transactions', 0),
+        'stats': stats
+    }
+
+
+def _seconds_between(start: Optional[str], end: Optional[str]) -> Optional[float]:
+    """Diferença em segundos entre dois timestamps 'YYYY-MM-DD HH:MM:SS'"""
+    try:
+        fmt = '%Y-%m-%d %H:%M:%S'
+        return (datetime.strptime(end, fmt) - datetime.strptime(start, fmt)).total_seconds()
+    except (TypeError, ValueError):
+        return None
+
+
+def run_sync_job(job: Dict, db: Optional[Database] = None) -> bool:
+    """Executa um job já marcado como 'running' e grava o resultado final"""
+    db = db or Database()
+    progress = SyncJobProgress(db, job['id'])
+    t_start = perf_counter()
+    try:
+        finance_app = FinanceApp()
+        finance_app.progress_callback = progress
+        finance_app.sync_job_id = job['id']
+        if job['kind'] in ('connection', 'connection_full'):
+            success, message, extra = _run_connection_sync(finance_app, db, job['item_id'],
+                                                           full=job['kind'] == 'connection_full')
+        else:
+            success, message, extra = _run_full_sync(finance_app, db)
+    except Exception as e:
+        success, message, extra = False, f'Erro na sincronização: {e}', {}
+
+    snapshot = progress.snapshot()
+    snapshot['timings']['total_s'] = round(perf_counter() - t_start, 3)
+    queued_s = _seconds_between(job.get('created_at'), job.get('started_at'))
+    if queued_s is not None:
+        snapshot['timings']['queued_s'] = queued_s
+    snapshot['phase'] = 'concluído' if success else 'erro'
+    status = 'succeeded' if success else 'failed'
+    result = {'success': success, 'message': message, **extra}
+    db.update_sync_job(
+        job['id'],
+        status=status,
+        message=message,
+        result=result,
+        finished_at=get_brasilia_time(),
+        **snapshot
+    )
+    event = progress.event(status)
+    event.update(snapshot, message=message, result=result)
+    sync_event_bus.publish(job['id'], event, final=True)
+    status_icon = '✅' if success else '❌'
+    print(f"{status_icon} Job de sincronização {job['id']} finalizado em {snapshot['timings']['total_s']:.2f}s")
+    return success
+
+
+class SyncWorker:
+    """Consome a fila sync_jobs em uma thread: um job por vez, em ordem de chegada"""
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def start(self):
+        """Inicia a thread do worker (uma única por processo)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self.run_forever, name='sync-worker', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Acorda o worker sem esperar o próximo intervalo de consulta da fila"""
+        self._wakeup.set()
+
+    def run_once(self) -> bool:
+        """Executa o próximo job da fila; retorna False se a fila estiver vazia"""
+        db = Database()
+        job = db.claim_next_sync_job()
+        if not job:
+            return False
+        target = job.get('item_id') or 'todas as conexões'
+        print(f"🧵 Executando job de sincronização {job['id']} ({target})")
+        run_sync_job(job, db)
+        return True
+
+    def run_forever(self):
+        try:
+            stale = Database().fail_stale_sync_jobs(Config.SYNC_LEASE_TTL_SECONDS)
+            if stale:
+                print(f"⚠️ {stale} job(s) de sincronização interrompido(s) marcado(s) como falha")
+        except Exception as e:
+            print(f"⚠️ Erro ao verificar jobs interrompidos: {e}")
+        while True:
+            self._wakeup.clear()
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                print(f"❌ Erro no worker de sincronização: {e}")
+            self._wakeup.wait(Config.SYNC_JOB_POLL_SECONDS)
+
+
+sync_worker = SyncWorker()
+
+
+def _job_event(job: Dict) -> Dict:
+    """Evento SSE a partir do job gravado no banco (job executado por outro processo)"""
+    finished = job['status'] in ('succeeded', 'failed')
+    event = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'phase': job.get('phase'),
+        'pages_fetched': job.get('pages_fetched') or 0,
+        'rows_written': job.get('rows_written') or 0,
+        'timings': job.get('timings') or {},
+        'connections': {}
+    }
+    if finished:
+        event.update(message=job.get('message'), result=job.get('result'))
+        elapsed = event['timings'].get('total_s')
+    else:
+        elapsed = _seconds_between(job.get('started_at'), get_brasilia_time())
+    return _throughput(event, elapsed)
+
+
+def stream_sync_job_events(job_id: str) -> Iterator[str]:
+    """Gera o stream SSE de um job até ele terminar.
+
+    Jobs executados neste processo chegam pelo SyncEventBus (cada página/gravação); sem eventos
+    locais por Config.SYNC_JOB_POLL_SECONDS o estado é lido do banco (job em outro processo ou
+    ainda na fila), com comentário de keep-alive quando nada mudou.
+    """
+    events = sync_event_bus.subscribe(job_id)
+    try:
+        db = Database()
+        job = db.get_sync_job(job_id)
+        if not job:
+            yield f"event: error\ndata: {json.dumps({'message': 'Job de sincronização não encontrado'})}\n\n"
+            return
+        event = _job_event(job)
+        last_sent = None
+        while True:
+            state = (event['status'], event['phase'], event['pages_fetched'], event['rows_written'])
+            if state != last_sent:
+                last_sent = state
+                yield f"event: progress\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            if event['status'] in ('succeeded', 'failed'):
+                return
+            try:
+                event = events.get(timeout=Config.SYNC_JOB_POLL_SECONDS)
+            except queue.Empty:
+                if sync_event_bus.is_running_here(job_id):
+                    # Job local em fase longa (ex.: refresh na Pluggy): o banco só teria dados mais antigos
+                    continue
+                job = db.get_sync_job(job_id)
+                if not job:
+                    return
+                event = _job_event(job)
+    finally:
+        sync_event_bus.unsubscribe(job_id, events)
+
+
+def enqueue_sync(kind: str = 'all', item_id: str = None) -> Tuple[Optional[str], bool]:
+    """Enfileira uma sincronização ('all', 'connection' ou 'connection_full', que força a reconciliação
+    completa da conexão); retorna (job_id, anexado a job existente)"""
+    job_id, attached = Database().enqueue_sync_job(kind, item_id, stale_seconds=Config.SYNC_LEASE_TTL_SECONDS)
+    if job_id and Config.SYNC_WORKER_IN_PROCESS:
+        sync_worker.start()
+        sync_worker.wake()
+    return job_id, attached
+
+
+if __name__ == '__main__':
+    print("🧵 Sync Worker - processando a fila de sincronizações (Ctrl+C para sair)")
+    try:
+        sync_worker.run_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Worker encerrado")
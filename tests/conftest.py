@@ -0,0 +1,43 @@
+"""
+Fixtures compartilhadas: raiz do projeto no sys.path e um banco novo por teste.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database, get_connection_manager
+
+
+def make_account(index, **extra):
+    """Conta no formato recebido da Pluggy (como em save_sync_data_incremental_with_stats)"""
+    account = {'id': f'acc-{index}', 'name': f'Conta {index}', 'type': 'BANK', 'balance': 100.0 * index,
+               'currencyCode': 'BRL', 'connection_name': 'Banco'}
+    account.update(extra)
+    return account
+
+
+def make_transaction(index, account_index=0, **extra):
+    """Transação sintética determinística (data, valor e tipo variam com o índice)"""
+    transaction = {
+        'id': f'tx-{index}',
+        'description': f'compra {index}',
+        'amount': -(index % 90 + 1),
+        'date': f'2024-{1 + index % 12:02d}-{1 + index % 28:02d}T10:00:00.000Z',
+        'type': 'DEBIT',
+        'category': 'Outros',
+        'accountId': f'acc-{account_index}',
+        'account_name': f'Conta {account_index}',
+        'connection_name': 'Banco',
+    }
+    transaction.update(extra)
+    return transaction
+
+
+@pytest.fixture
+def database(tmp_path):
+    db = Database(str(tmp_path / 'finance_app_test.db'))
+    yield db
+    get_connection_manager(db.db_path).close_all()
@@ -0,0 +1,87 @@
+"""
+ConnectionManager: uma conexão por thread, reentrante (acquire/release aninhados).
+"""
+import threading
+
+from database import get_connection_manager
+
+
+def _count(conn, item_id):
+    return conn.execute('SELECT COUNT(*) FROM sync_history WHERE item_id = ?', (item_id,)).fetchone()[0]
+
+
+def test_nested_release_keeps_outer_transaction(database):
+    manager = get_connection_manager(database.db_path)
+    outer = manager.acquire()
+    try:
+        outer.execute("INSERT INTO sync_history (item_id, accounts_count, transactions_count) VALUES ('x', 0, 0)")
+        assert outer.in_transaction
+
+        # Método de Database chamado no meio da transação: mesma conexão, nada desfeito
+        inner = manager.acquire()
+        assert inner is outer
+        manager.release(inner)
+        database.get_last_sync()
+
+        assert outer.in_transaction
+        assert _count(outer, 'x') == 1
+    finally:
+        manager.release(outer)
+
+    # O release mais externo descarta o que não foi confirmado
+    conn = manager.acquire()
+    try:
+        assert not conn.in_transaction
+        assert _count(conn, 'x') == 0
+    finally:
+        manager.release(conn)
+
+
+def test_outermost_acquire_returns_clean_connection(database):
+    manager = get_connection_manager(database.db_path)
+    conn = manager.acquire()
+    conn.execute("INSERT INTO sync_history (item_id, accounts_count, transactions_count) VALUES ('y', 0, 0)")
+    manager.release(conn)
+    conn = manager.acquire()
+    try:
+        assert not conn.in_transaction
+        assert conn.row_factory is None
+        assert _count(conn, 'y') == 0
+    finally:
+        manager.release(conn)
+
+
+def test_failed_read_releases_connection(database):
+    manager = get_connection_manager(database.db_path)
+    conn = manager.acquire()
+    conn.execute('DROP TABLE category_mappings')
+    conn.commit()
+    manager.release(conn)
+    assert database.get_category_mappings() == []
+
+    # A leitura com erro devolveu a conexão: o próximo release volta a ser o mais externo
+    conn = manager.acquire()
+    conn.execute("INSERT INTO sync_history (item_id, accounts_count, transactions_count) VALUES ('z', 0, 0)")
+    manager.release(conn)
+    conn = manager.acquire()
+    try:
+        assert _count(conn, 'z') == 0
+    finally:
+        manager.release(conn)
+
+
+def test_threads_get_their_own_connection(database):
+    manager = get_connection_manager(database.db_path)
+    main = manager.acquire()
+    seen = []
+
+    def worker():
+        conn = manager.acquire()
+        seen.append(conn)
+        manager.release(conn)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    manager.release(main)
+    assert seen and seen[0] is not main
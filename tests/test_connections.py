@@ -0,0 +1,46 @@
+"""
+Remoção de conexões (Database.delete_connection).
+"""
+from conftest import make_account, make_transaction
+
+from database import get_connection_manager
+
+
+def _connection(item_id):
+    return {'item_id': item_id, 'bank_name': 'Banco', 'status': 'UPDATED', 'created_at': '2024-01-01T00:00:00'}
+
+
+def test_remove_connection_with_data_and_splits(database):
+    database.save_connection(_connection('item-a'))
+    database.save_connection(_connection('item-b'))
+    result = database.save_sync_data_incremental_with_stats(
+        'item-a', [make_account(1), make_account(2)],
+        [make_transaction(i, account_index=1 + i % 2) for i in range(10)])
+    assert result['success']
+    database.save_sync_data_incremental_with_stats(
+        'item-b', [make_account(3)], [make_transaction(100 + i, account_index=3) for i in range(4)])
+    assert database.upsert_account_split('acc-1', 70)
+    assert database.upsert_account_split('acc-3', 30)
+
+    removed = database.delete_connection('item-a', remove_data=True)
+
+    assert removed == {'accounts_removed': 2, 'transactions_removed': 10}
+    assert 'item-a' not in database.get_connections()
+    assert [row['id'] for row in database.get_accounts_with_splits()] == ['acc-3']
+    conn = get_connection_manager(database.db_path).acquire()
+    try:
+        assert conn.execute('SELECT account_id FROM account_splits').fetchall() == [('acc-3',)]
+    finally:
+        get_connection_manager(database.db_path).release(conn)
+    remaining = database.get_transactions_page(page_size=50)['transactions']
+    assert {t['id'] for t in remaining} == {f'tx-{100 + i}' for i in range(4)}
+
+
+def test_remove_connection_keeps_data_by_default(database):
+    database.save_connection(_connection('item-a'))
+    database.save_sync_data_incremental_with_stats('item-a', [make_account(1)], [make_transaction(1, account_index=1)])
+    database.upsert_account_split('acc-1', 60)
+
+    assert database.delete_connection('item-a') == {'accounts_removed': 0, 'transactions_removed': 0}
+    assert database.delete_connection('item-a') is None
+    assert [row['id'] for row in database.get_accounts_with_splits()] == ['acc-1']
@@ -0,0 +1,61 @@
+"""
+Perfil de refresh por conector: média móvel dos tempos, resultados sem sucesso e endpoints.
+"""
+import json
+
+import pytest
+
+
+def test_unknown_connector_has_no_profile(database):
+    assert database.get_connector_refresh_profile('201') is None
+
+
+def test_only_successful_refreshes_enter_the_statistics(database):
+    weight = database.REFRESH_PROFILE_EWMA_WEIGHT
+    assert database.record_connector_refresh('201', 'Banco', 10.0, 'SUCCESS')
+    assert database.record_connector_refresh('201', 'Banco', 20.0, 'SUCCESS')
+    assert database.record_connector_refresh('201', 'Banco', 300.0, 'TIMEOUT')
+
+    profile = database.get_connector_refresh_profile('201')
+    assert profile['samples'] == 2
+    assert profile['avg_ready_seconds'] == pytest.approx(10.0 * (1 - weight) + 20.0 * weight)
+    assert profile['last_ready_seconds'] == 20.0
+    assert profile['max_ready_seconds'] == 20.0
+    assert profile['last_outcome'] == 'TIMEOUT'
+
+
+def test_endpoints_keep_refresh_statistics(database):
+    database.record_connector_refresh('201', 'Banco', 12.0, 'SUCCESS')
+    assert database.save_connector_refresh_endpoints('201', 'Banco', 'PATCH /items/{id}', {'POST /items/{id}/refresh': 403},
+                                                     probed=True)
+    probed_at = database.get_connector_refresh_profile('201')['endpoints_probed_at']
+    assert probed_at
+
+    # Gravação sem nova verificação mantém a data da última
+    database.save_connector_refresh_endpoints('201', 'Banco', 'PATCH /items/{id}', {}, probed=False)
+    profile = database.get_connector_refresh_profile('201')
+    assert profile['refresh_endpoint'] == 'PATCH /items/{id}'
+    assert json.loads(profile['failed_endpoints']) == {}
+    assert profile['endpoints_probed_at'] == probed_at
+    assert profile['samples'] == 1
+    assert profile['avg_ready_seconds'] == 12.0
+
+
+def test_failed_read_releases_connection(database):
+    conn = database._get_connection()
+    conn.execute('DROP TABLE connector_refresh_profile')
+    conn.commit()
+    database._release_connection(conn)
+
+    assert database.get_connector_refresh_profile('201') is None
+
+    # Sem acquire pendente, o próximo release volta a descartar o que não foi confirmado
+    conn = database._get_connection()
+    conn.execute("INSERT INTO sync_history (item_id, accounts_count, transactions_count) VALUES ('x', 0, 0)")
+    database._release_connection(conn)
+    conn = database._get_connection()
+    try:
+        assert not conn.in_transaction
+        assert conn.row_factory is None
+    finally:
+        database._release_connection(conn)
@@ -0,0 +1,93 @@
+"""
+Planos de consulta da listagem de /transactions: cada filtro precisa usar índice.
+
+Popula um banco temporário, roda ANALYZE (para o planner decidir com estatísticas reais)
+e verifica Database.check_index_usage.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database, get_connection_manager
+
+
+def build_database(db_path):
+    """Banco com 20 contas e histórico sintético, já com estatísticas (ANALYZE)"""
+    database = Database(db_path)
+    accounts = [
+        {'id': f'acc-{i}', 'name': f'Conta {i}', 'type': 'BANK', 'balance': 0, 'currencyCode': 'BRL',
+         'connection_name': 'Banco'}
+        for i in range(20)
+    ]
+    transactions = [
+        {
+            'id': f'tx-{i}',
+            'description': ('mercado central', 'café da esquina', 'posto', 'pix recebido')[i % 4],
+            'amount': -(i % 90 + 1),
+            'date': f'20{20 + i % 5}-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00.000Z',
+            'type': 'DEBIT' if i % 3 else 'CREDIT',
+            'category': 'Outros',
+            'accountId': f'acc-{i % 20}',
+            'account_name': f'Conta {i % 20}',
+            'connection_name': f'Banco {i % 3}',
+        }
+        for i in range(5000)
+    ]
+    result = database.save_sync_data_incremental_with_stats('item-test', accounts, transactions)
+    assert result['success']
+
+    conn = get_connection_manager(database.db_path).acquire()
+    # Distribuição típica: quase tudo verificado, poucos conflitos, categorias variadas
+    conn.execute('UPDATE transactions SET verified = 1 WHERE rowid % 10 != 0')
+    conn.execute('UPDATE transactions SET conflict_detected = 1 WHERE rowid % 200 = 0')
+    conn.execute("UPDATE transactions SET user_category = 'Categoria ' || (rowid % 25), "
+                 "user_subcategory = 'Sub ' || (rowid % 4)")
+    conn.execute("UPDATE transactions SET user_category = 'Alimentação', user_subcategory = 'Mercado' "
+                 "WHERE rowid % 50 = 0")
+    conn.execute('ANALYZE')
+    conn.commit()
+    get_connection_manager(database.db_path).release(conn)
+    return database
+
+
+@pytest.fixture(scope='module')
+def db(tmp_path_factory):
+    database = build_database(str(tmp_path_factory.mktemp('index_usage') / 'finance_app_test.db'))
+    yield database
+    get_connection_manager(database.db_path).close_all()
+
+
+def test_transaction_filters_use_indexes(db):
+    results = db.check_index_usage()
+    assert results
+    failures = {r['scenario']: r['plan'] for r in results if r['full_scan']}
+    assert not failures, f'varredura completa em: {failures}'
+
+
+def test_filtered_walk_of_date_index_is_a_full_scan(db):
+    # Sem o índice de tipo, o filtro percorre idx_transactions_date_id inteiro: precisa ser apontado
+    conn = get_connection_manager(db.db_path).acquire()
+    try:
+        conn.execute('DROP INDEX idx_transactions_type_date_id')
+        conn.commit()
+        by_scenario = {r['scenario']: r for r in db.check_index_usage()}
+        assert by_scenario['tipo']['full_scan']
+        assert not by_scenario['sem filtros']['full_scan']
+    finally:
+        db.ensure_transaction_indexes(conn)
+        get_connection_manager(db.db_path).release(conn)
+        conn.commit()
+        get_connection_manager(db.db_path).release(conn)
+
+
+def test_only_managed_indexes_exist(db):
+    conn = get_connection_manager(db.db_path).acquire()
+    try:
+        names = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transactions' AND sql IS NOT NULL")}
+    finally:
+        get_connection_manager(db.db_path).release(conn)
+    assert names == {name for name, _, _ in Database.TRANSACTION_INDEXES}
@@ -0,0 +1,172 @@
+"""
+monthly_rollup e get_statistics: o agregado mantido por triggers (e pelo caminho em massa da
+sincronização) é sempre igual à agregação direta de transactions.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import make_account, make_transaction
+
+
+def _query(database, sql):
+    conn = database._get_connection()
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        database._release_connection(conn)
+
+
+def _groups(rows):
+    """(mês, conta, tipo, categoria) -> (contagem, total, ignoradas, total ignorado, verificadas), sem grupos vazios"""
+    return {
+        tuple(row[:4]): (row[4], pytest.approx(row[5]), row[6], pytest.approx(row[7]), row[8])
+        for row in rows if row[4]
+    }
+
+
+def assert_rollup_matches(database):
+    stored = _query(database, '''
+        SELECT month, account_id, type, user_category, tx_count, total_amount,
+               ignored_count, ignored_amount, verified_count
+        FROM monthly_rollup
+    ''')
+    direct = _query(database, '''
+        SELECT COALESCE(substr(tx_day, 1, 7), ''), COALESCE(account_id, ''),
+               COALESCE(type, ''), COALESCE(user_category, ''),
+               COUNT(*), SUM(COALESCE(amount, 0)),
+               SUM(COALESCE(ignorar_transacao, 0) = 1),
+               SUM(CASE WHEN COALESCE(ignorar_transacao, 0) = 1 THEN COALESCE(amount, 0) ELSE 0 END),
+               SUM(COALESCE(verified, 0) = 1)
+        FROM transactions
+        GROUP BY 1, 2, 3, 4
+    ''')
+    assert _groups(stored) == _groups(direct)
+    # Nenhum grupo com contagem negativa ou total sobrando sem transações
+    assert all(row[4] > 0 or (row[4] == 0 and abs(row[5]) < 1e-6) for row in stored)
+
+
+def assert_statistics_match(database):
+    count, income, expense = _query(database, '''
+        SELECT COUNT(*),
+               SUM(CASE WHEN type = 'CREDIT' AND tx_day >= date('now', '-30 days') THEN amount ELSE 0 END),
+               SUM(CASE WHEN type = 'DEBIT' AND tx_day >= date('now', '-30 days') THEN amount ELSE 0 END)
+        FROM transactions
+    ''')[0]
+    stats = database.get_statistics()
+    assert stats['transactions_count'] == count
+    assert stats['monthly_income'] == pytest.approx(income or 0)
+    assert stats['monthly_expense'] == pytest.approx(expense or 0)
+    assert stats['monthly_net'] == pytest.approx((income or 0) - (expense or 0))
+
+
+def assert_consistent(database):
+    assert_rollup_matches(database)
+    assert_statistics_match(database)
+
+
+def _day(offset):
+    """Data ISO da Pluggy offset dias antes de hoje (UTC, como date('now') do SQLite)"""
+    return (datetime.now(timezone.utc) - timedelta(days=offset)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def history(start, count, shift=0):
+    """Transações espalhadas pelos últimos ~4 meses, cobrindo a borda dos 30 dias"""
+    return [
+        make_transaction(
+            i, account_index=i % 3,
+            amount=round(10 + (i + shift) % 37 * 1.25, 2),
+            type='CREDIT' if (i + shift) % 4 == 0 else 'DEBIT',
+            date=_day((i * 7 + shift) % 120),
+            category=('Mercado', 'Transporte', 'Outros')[i % 3],
+        )
+        for i in range(start, start + count)
+    ]
+
+
+@pytest.fixture
+def populated(database):
+    accounts = [make_account(i) for i in range(3)]
+    assert database.save_sync_data_incremental_with_stats('item-1', accounts, history(0, 200))['success']
+    return database
+
+
+def test_insert(populated):
+    assert_consistent(populated)
+
+
+def test_edge_of_thirty_day_window(database):
+    transactions = [
+        make_transaction(1, type='CREDIT', amount=100, date=_day(29)),
+        make_transaction(2, type='CREDIT', amount=200, date=_day(30)),
+        make_transaction(3, type='DEBIT', amount=50, date=_day(31)),
+        make_transaction(4, type='DEBIT', amount=70, date=_day(0)),
+        make_transaction(5, type='DEBIT', amount=90, date=_day(65)),
+    ]
+    assert database.save_sync_data_incremental_with_stats('item-1', [make_account(0)], transactions)['success']
+    assert_consistent(database)
+
+
+def test_manual_updates(populated):
+    # Valor, tipo e mês alterados
+    assert populated.update_transaction('tx-0', 999.5, 'ajuste', 'Outros', _day(100), transaction_type='CREDIT')
+    assert populated.update_transaction('tx-5', 12.0, 'ajuste', 'Outros', _day(1), transaction_type='DEBIT')
+    for i in range(0, 40, 3):
+        assert populated.update_transaction_category(f'tx-{i}', 'Casa', 'Aluguel')
+        assert populated.update_transaction_verification(f'tx-{i + 1}', 1)
+        assert populated.update_transaction_ignore_status(f'tx-{i + 2}', 1)
+    assert populated.update_transaction_verification('tx-1', 0)
+    assert populated.update_transaction_ignore_status('tx-2', 0)
+    assert_consistent(populated)
+
+
+def test_delete(populated):
+    for i in range(0, 200, 11):
+        success, _ = populated.delete_transaction(f'tx-{i}')
+        assert success
+    assert_consistent(populated)
+
+
+def test_delete_connection_with_data(populated):
+    populated.save_connection({'item_id': 'item-2', 'bank_name': 'Outro', 'status': 'UPDATED',
+                               'created_at': '2024-01-01T00:00:00'})
+    assert populated.save_sync_data_incremental_with_stats(
+        'item-2', [make_account(9)], [make_transaction(1000 + i, account_index=9, date=_day(i)) for i in range(20)]
+    )['success']
+    assert_consistent(populated)
+
+    assert populated.delete_connection('item-2', remove_data=True)['transactions_removed'] == 20
+    assert_consistent(populated)
+
+
+def test_sync_updates(populated):
+    # Mesmos ids com valor, tipo e data novos, mais algumas transações novas
+    assert populated.save_sync_data_incremental_with_stats('item-1', [], history(100, 150, shift=3))['success']
+    assert_consistent(populated)
+
+
+def test_bulk_mode_sync(populated):
+    # Carga grande: triggers desligados, rollup aplicado por conjunto (e índices reconstruídos)
+    assert populated.save_sync_data_incremental_with_stats('item-1', [], history(150, 3000, shift=1))['success']
+    assert_consistent(populated)
+    # Segunda carga grande sobre as mesmas linhas (atualizações em massa)
+    assert populated.save_sync_data_incremental_with_stats('item-1', [], history(0, 2500, shift=2))['success']
+    assert_consistent(populated)
+
+    # Triggers religados depois do caminho em massa
+    assert populated.update_transaction('tx-10', 1.0, 'ajuste', 'Outros', _day(2), transaction_type='CREDIT')
+    success, _ = populated.delete_transaction('tx-11')
+    assert success
+    assert_consistent(populated)
+
+
+def test_staged_batches(populated):
+    # Como o SyncBatchWriter: existentes atualizadas por lote, novas em espera até o merge
+    populated.discard_staged_transactions('item-1')
+    transactions = history(100, 2400, shift=5)
+    for start in range(0, len(transactions), 700):
+        result = populated.save_sync_data_incremental_with_stats(
+            'item-1', [], transactions[start:start + 700], record_history=False, stage_new=True)
+        assert result['success']
+    assert populated.merge_staged_transactions('item-1')['success']
+    assert_consistent(populated)
@@ -0,0 +1,137 @@
+"""
+Leases de sincronização (sync_leases): uma sincronização por conexão entre threads e processos.
+"""
+import threading
+import time
+
+import pytest
+
+TTL = 60
+
+
+def holder_of(database, item_id):
+    conn = database._get_connection()
+    try:
+        row = conn.execute('SELECT owner, job_id, expires_at FROM sync_leases WHERE item_id = ?', (item_id,)).fetchone()
+    finally:
+        database._release_connection(conn)
+    return row
+
+
+def test_second_owner_sees_current_holder(database):
+    assert database.acquire_sync_lease('item-1', 'worker-a', TTL, job_id='job-a') is None
+
+    holder = database.acquire_sync_lease('item-1', 'worker-b', TTL, job_id='job-b')
+    assert holder['owner'] == 'worker-a'
+    assert holder['job_id'] == 'job-a'
+    assert holder['item_id'] == 'item-1'
+    assert holder['expires_at'] > time.time()
+    # Outra conexão continua livre
+    assert database.acquire_sync_lease('item-2', 'worker-b', TTL) is None
+
+
+def test_owner_can_reacquire_its_lease(database):
+    assert database.acquire_sync_lease('item-1', 'worker-a', 1, job_id='job-a') is None
+    expires_at = holder_of(database, 'item-1')[2]
+
+    assert database.acquire_sync_lease('item-1', 'worker-a', TTL, job_id='job-a') is None
+    assert holder_of(database, 'item-1')[2] > expires_at
+
+
+def test_concurrent_acquire_has_one_winner(database):
+    owners = [f'worker-{i}' for i in range(8)]
+    barrier = threading.Barrier(len(owners))
+    results = {}
+
+    def contend(owner):
+        barrier.wait()
+        results[owner] = database.acquire_sync_lease('item-1', owner, TTL)
+
+    threads = [threading.Thread(target=contend, args=(owner,)) for owner in owners]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    winners = [owner for owner, holder in results.items() if holder is None]
+    assert len(results) == len(owners)
+    assert len(winners) == 1
+    assert holder_of(database, 'item-1')[0] == winners[0]
+    # Os perdedores recebem o vencedor como dono
+    assert {holder['owner'] for holder in results.values() if holder} == {winners[0]}
+
+
+def test_expired_lease_is_taken_over(database):
+    assert database.acquire_sync_lease('item-1', 'worker-a', -1, job_id='job-a') is None
+
+    assert database.acquire_sync_lease('item-1', 'worker-b', TTL, job_id='job-b') is None
+    assert holder_of(database, 'item-1')[:2] == ('worker-b', 'job-b')
+    # O dono antigo não recupera a lease enquanto a nova vale
+    assert database.acquire_sync_lease('item-1', 'worker-a', TTL)['owner'] == 'worker-b'
+
+    # Nem a apaga ao liberar as suas
+    assert database.release_sync_leases('worker-a')
+    assert holder_of(database, 'item-1')[0] == 'worker-b'
+
+
+def test_renew_keeps_lease_from_expiring(database):
+    assert database.acquire_sync_lease('item-1', 'worker-a', 0.2, job_id='job-a') is None
+    assert database.renew_sync_leases('worker-a', TTL)
+    time.sleep(0.3)
+
+    assert database.acquire_sync_lease('item-1', 'worker-b', TTL)['owner'] == 'worker-a'
+
+
+def test_release_is_scoped_by_owner_and_item(database):
+    for item_id in ('item-1', 'item-2'):
+        assert database.acquire_sync_lease(item_id, 'worker-a', TTL) is None
+    assert database.acquire_sync_lease('item-3', 'worker-b', TTL) is None
+
+    assert database.release_sync_leases('worker-a', 'item-1')
+    assert holder_of(database, 'item-1') is None
+    assert holder_of(database, 'item-2')[0] == 'worker-a'
+
+    # Liberar uma conexão de outro dono não tem efeito
+    assert database.release_sync_leases('worker-a', 'item-3')
+    assert holder_of(database, 'item-3')[0] == 'worker-b'
+
+    assert database.release_sync_leases('worker-a')
+    assert holder_of(database, 'item-2') is None
+    assert holder_of(database, 'item-3')[0] == 'worker-b'
+    assert database.acquire_sync_lease('item-1', 'worker-b', TTL) is None
+
+
+@pytest.fixture
+def lease_set(database, tmp_path, monkeypatch):
+    # Importar o app grava data/app_environment.json no diretório atual
+    monkeypatch.chdir(tmp_path)
+    import database as database_module
+    import finance_app
+    monkeypatch.setattr(database_module, 'Database', lambda: database)
+    monkeypatch.setattr(finance_app.Config, 'SYNC_LEASE_TTL_SECONDS', 0.3)
+    created = []
+
+    def make(job_id=None):
+        leases = finance_app.SyncLeaseSet(job_id)
+        created.append(leases)
+        return leases
+
+    yield make
+    for leases in created:
+        leases.close()
+
+
+def test_lease_set_heartbeat_and_close(database, lease_set):
+    first, second = lease_set('job-a'), lease_set('job-b')
+    assert first.acquire('item-1') is None
+    assert first.acquire('item-2') is None
+
+    # O heartbeat renova as leases além do TTL original
+    time.sleep(0.7)
+    holder = second.acquire('item-1')
+    assert holder['job_id'] == 'job-a'
+    assert holder['owner'] == first.owner
+
+    first.close()
+    assert second.acquire('item-1') is None
+    assert second.acquire('item-2') is None
@@ -0,0 +1,85 @@
+"""
+Gravação da sincronização em lote grande: índices recriados, espera (stage_new) e consistência
+de transactions_fts/monthly_rollup com a gravação em uma única chamada.
+"""
+import sqlite3
+
+import pytest
+
+from conftest import make_account, make_transaction
+
+from database import Database
+
+
+def _history(count):
+    return [make_transaction(i, account_index=i % 3, description=f'Pão de queijo {i % 50}',
+                             merchant={'name': f'Padaria {i % 7}'}) for i in range(count)]
+
+
+def _snapshot(db):
+    conn = sqlite3.connect(db.db_path)
+    try:
+        return {
+            'transactions': conn.execute(
+                'SELECT id, amount, description, transaction_date, tx_day, tx_ts, type, merchant_name '
+                'FROM transactions ORDER BY id').fetchall(),
+            'rollup': [row[:4] + (row[4], round(row[5], 6)) + row[6:] for row in conn.execute(
+                'SELECT * FROM monthly_rollup ORDER BY 1, 2, 3, 4').fetchall()],
+            'fts': conn.execute(
+                'SELECT t.id, f.description, f.merchant FROM transactions_fts f '
+                'JOIN transactions t ON t.rowid = f.rowid ORDER BY t.id').fetchall(),
+            'indexes': {row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transactions' "
+                "AND sql IS NOT NULL").fetchall()},
+            'staged': conn.execute('SELECT COUNT(*) FROM sync_staged_transactions').fetchone()[0],
+        }
+    finally:
+        conn.close()
+
+
+def _write_batched(db, accounts, transactions, batch_size):
+    db.discard_staged_transactions('item-a')
+    assert db.save_sync_data_incremental_with_stats('item-a', accounts, [], record_history=False)['success']
+    for start in range(0, len(transactions), batch_size):
+        result = db.save_sync_data_incremental_with_stats(
+            'item-a', [], transactions[start:start + batch_size], record_history=False, stage_new=True)
+        assert result['success']
+    return db.merge_staged_transactions('item-a')
+
+
+@pytest.mark.parametrize('batch_size', [700, 5000])
+def test_staged_batches_match_single_write(tmp_path, batch_size):
+    accounts = [make_account(i) for i in range(3)]
+    first, full = _history(2500), _history(6000)
+    changed = [dict(t, amount=t['amount'] - 1) if i % 4 == 0 else t for i, t in enumerate(full)]
+
+    single = Database(str(tmp_path / 'single.db'))
+    batched = Database(str(tmp_path / 'batched.db'))
+    for transactions in (first, full, changed):
+        assert single.save_sync_data_incremental_with_stats('item-a', accounts, transactions)['success']
+        assert _write_batched(batched, accounts, transactions, batch_size)['success']
+
+    expected, actual = _snapshot(single), _snapshot(batched)
+    assert actual == expected
+    assert expected['indexes'] == {name for name, _, _ in Database.TRANSACTION_INDEXES}
+    assert expected['staged'] == 0
+    assert len(expected['fts']) == len(expected['transactions']) == 6000
+
+
+def test_bulk_insert_keeps_verified_rows(database):
+    accounts = [make_account(i) for i in range(3)]
+    database.save_sync_data_incremental_with_stats('item-a', accounts, _history(100))
+    conn = sqlite3.connect(database.db_path)
+    conn.execute("UPDATE transactions SET verified = 1, description = 'conferida' WHERE id = 'tx-1'")
+    conn.commit()
+    conn.close()
+
+    changed = [dict(t, description='nova descrição') for t in _history(5000)]
+    assert _write_batched(database, accounts, changed, 2000)['success']
+
+    conn = sqlite3.connect(database.db_path)
+    try:
+        assert conn.execute("SELECT description FROM transactions WHERE id = 'tx-1'").fetchone() == ('conferida',)
+        assert conn.execute("SELECT COUNT(*) FROM transactions WHERE description = 'nova descrição'").fetchone() == (4999,)
+    finally:
+        conn.close()
@@ -0,0 +1,188 @@
+"""
+SyncWorker / run_sync_job com um FinanceApp falso: estados do job, falhas e progresso.
+"""
+import pytest
+
+
+class StubOAuthManager:
+    def __init__(self, connected):
+        self.connected = connected
+
+    def has_valid_connection(self):
+        return self.connected
+
+
+class StubFinanceApp:
+    """Substitui FinanceApp no sync_worker; cada teste define sync (e opcionalmente connected)"""
+    sync = None
+    connected = True
+    calls = []
+
+    def __init__(self):
+        self.progress_callback = None
+        self.sync_job_id = None
+        self.oauth_manager = StubOAuthManager(self.connected)
+
+    def sync_single_connection(self, item_id, full=False):
+        self.calls.append(('connection', item_id, full))
+        return type(self).sync(self, item_id)
+
+    def sync_existing_connection(self):
+        self.calls.append(('all', None, False))
+        return type(self).sync(self, None)
+
+
+@pytest.fixture
+def worker(database, tmp_path, monkeypatch):
+    # Importar o app grava data/app_environment.json no diretório atual
+    monkeypatch.chdir(tmp_path)
+    import sync_worker
+    monkeypatch.setattr(sync_worker, 'Database', lambda: database)
+    monkeypatch.setattr(sync_worker, 'FinanceApp', StubFinanceApp)
+    monkeypatch.setattr(sync_worker.Config, 'SYNC_JOB_PROGRESS_INTERVAL', 0)
+    monkeypatch.setattr(StubFinanceApp, 'calls', [])
+    monkeypatch.setattr(StubFinanceApp, 'connected', True)
+    return sync_worker
+
+
+def _stats(inserted):
+    return {'accounts_inserted': 1, 'accounts_updated': 0, 'accounts_unchanged': 0,
+            'transactions_inserted': inserted, 'transactions_updated': 0, 'transactions_unchanged': 0}
+
+
+def test_connection_job_records_progress_and_result(worker, database, monkeypatch):
+    seen = {}
+
+    def sync(app, item_id):
+        assert app.sync_job_id == job_id
+        app.progress_callback(phase='buscando e gravando transações', connection=item_id)
+        app.progress_callback(pages=2, rows=30, connection=item_id)
+        app.progress_callback(pages=1, rows=10, timings={'fetch_s': 0.5}, connection=item_id)
+        # Progresso visível no banco enquanto o job roda
+        seen['job'] = database.get_sync_job(job_id)
+        return {'accounts': 1, 'transactions': 40, 'status': 'active', 'stats': _stats(40)}
+
+    monkeypatch.setattr(StubFinanceApp, 'sync', sync)
+    job_id, attached = database.enqueue_sync_job('connection', 'item-1')
+    assert not attached
+    assert database.get_sync_job(job_id)['status'] == 'queued'
+
+    events = worker.sync_event_bus.subscribe(job_id)
+    try:
+        assert worker.SyncWorker().run_once() is True
+    finally:
+        worker.sync_event_bus.unsubscribe(job_id, events)
+
+    running = seen['job']
+    assert running['status'] == 'running'
+    assert running['phase'] == 'buscando e gravando transações'
+    assert (running['pages_fetched'], running['rows_written']) == (3, 40)
+
+    job = database.get_sync_job(job_id)
+    assert job['status'] == 'succeeded'
+    assert job['phase'] == 'concluído'
+    assert (job['pages_fetched'], job['rows_written']) == (3, 40)
+    assert job['finished_at']
+    assert job['result']['success'] is True
+    assert job['result']['transactions'] == 40
+    assert job['result']['stats']['transactions_inserted'] == 40
+    assert job['timings']['fetch_s'] == 0.5
+    assert 'total_s' in job['timings']
+    assert StubFinanceApp.calls == [('connection', 'item-1', False)]
+
+    published = []
+    while not events.empty():
+        published.append(events.get_nowait())
+    assert published[-1]['status'] == 'succeeded'
+    assert published[-1]['connections']['item-1'] == {
+        'phase': 'buscando e gravando transações', 'pages': 3, 'rows': 40
+    }
+    assert not worker.sync_event_bus.is_running_here(job_id)
+
+    # Fila vazia
+    assert worker.SyncWorker().run_once() is False
+
+
+def test_connection_full_job_requests_full_reconcile(worker, database, monkeypatch):
+    monkeypatch.setattr(StubFinanceApp, 'sync', lambda app, item_id: {'accounts': 0, 'transactions': 0, 'stats': {}})
+    job_id, _ = database.enqueue_sync_job('connection_full', 'item-1')
+
+    assert worker.SyncWorker().run_once() is True
+
+    assert StubFinanceApp.calls == [('connection', 'item-1', True)]
+    assert database.get_sync_job(job_id)['status'] == 'succeeded'
+
+
+def test_duplicate_request_attaches_to_queued_job(worker, database, monkeypatch):
+    monkeypatch.setattr(StubFinanceApp, 'sync', lambda app, item_id: {'accounts': 0, 'transactions': 0, 'stats': {}})
+    job_id, attached = database.enqueue_sync_job('connection', 'item-1')
+    again, attached_again = database.enqueue_sync_job('connection', 'item-1')
+    assert (again, attached, attached_again) == (job_id, False, True)
+
+    assert worker.SyncWorker().run_once() is True
+    assert worker.SyncWorker().run_once() is False
+    assert len(StubFinanceApp.calls) == 1
+
+
+def test_failed_sync_marks_job_failed(worker, database, monkeypatch):
+    def sync(app, item_id):
+        app.progress_callback(pages=1, connection=item_id)
+        return False
+
+    monkeypatch.setattr(StubFinanceApp, 'sync', sync)
+    job_id, _ = database.enqueue_sync_job('connection', 'item-1')
+
+    assert worker.SyncWorker().run_once() is True
+
+    job = database.get_sync_job(job_id)
+    assert job['status'] == 'failed'
+    assert job['phase'] == 'erro'
+    assert job['message'] == 'Erro na sincronização'
+    assert job['result']['success'] is False
+    assert job['pages_fetched'] == 1
+
+
+def test_exception_in_sync_marks_job_failed(worker, database, monkeypatch):
+    def sync(app, item_id):
+        raise RuntimeError('Pluggy fora do ar')
+
+    monkeypatch.setattr(StubFinanceApp, 'sync', sync)
+    job_id, _ = database.enqueue_sync_job('connection', 'item-1')
+
+    assert worker.run_sync_job(database.claim_next_sync_job(), database) is False
+
+    job = database.get_sync_job(job_id)
+    assert job['status'] == 'failed'
+    assert 'Pluggy fora do ar' in job['message']
+    # O próximo job da fila continua sendo executado
+    monkeypatch.setattr(StubFinanceApp, 'sync', lambda app, item_id: {'accounts': 0, 'transactions': 0, 'stats': {}})
+    next_id, _ = database.enqueue_sync_job('connection', 'item-2')
+    assert worker.SyncWorker().run_once() is True
+    assert database.get_sync_job(next_id)['status'] == 'succeeded'
+
+
+def test_all_job_without_connections_fails(worker, database, monkeypatch):
+    monkeypatch.setattr(StubFinanceApp, 'connected', False)
+    monkeypatch.setattr(StubFinanceApp, 'sync', lambda app, item_id: pytest.fail('não deveria sincronizar'))
+    job_id, _ = database.enqueue_sync_job('all')
+
+    assert worker.SyncWorker().run_once() is True
+
+    job = database.get_sync_job(job_id)
+    assert job['status'] == 'failed'
+    assert job['result']['redirect'] == '/manage_connections'
+    assert StubFinanceApp.calls == []
+
+
+def test_all_job_succeeds(worker, database, monkeypatch):
+    monkeypatch.setattr(StubFinanceApp, 'sync', lambda app, item_id: (True, 'Sincronização concluída'))
+    job_id, _ = database.enqueue_sync_job('all')
+    # Um job 'all' cobre os pedidos de conexão feitos enquanto está na fila
+    assert database.enqueue_sync_job('connection', 'item-1') == (job_id, True)
+
+    assert worker.SyncWorker().run_once() is True
+
+    job = database.get_sync_job(job_id)
+    assert job['status'] == 'succeeded'
+    assert job['message'].startswith('✅ Sincronização concluída')
+    assert StubFinanceApp.calls == [('all', None, False)]
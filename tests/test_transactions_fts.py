@@ -0,0 +1,154 @@
+"""
+Busca por descrição com o índice transactions_fts: mesmos resultados de uma busca por substring
+sem acento/caixa, sugestões de search_descriptions e índice em dia após alterações e exclusões.
+"""
+import pytest
+
+from conftest import make_account, make_transaction
+from database import fold_accents
+
+DESCRIPTIONS = [
+    'Café da Esquina', 'CAFE DA ESQUINA', 'cafeteria central', 'Pão de Açúcar', 'PAO DE ACUCAR',
+    'Farmácia São João', 'Posto Ipiranga', 'pix recebido', 'Mercado', 'MERCADO LIVRE', 'Uber *Trip',
+    'uber eats', 'Ação Social', 'acao entre amigos', 'Padaria "Pão Quente"', None, '',
+]
+
+
+def reference(database, term):
+    """Ids cuja descrição ou estabelecimento contém term, ignorando acento e caixa (o que o filtro promete)"""
+    needle = fold_accents(term).lower()
+    conn = database._get_connection()
+    try:
+        rows = conn.execute('SELECT id, description, merchant_name FROM transactions').fetchall()
+    finally:
+        database._release_connection(conn)
+    return {
+        row[0] for row in rows
+        if any(needle in fold_accents(text).lower() for text in (row[1], row[2]) if text)
+    }
+
+
+def like_ids(database, term):
+    """Ids do filtro antigo: LOWER(description) LIKE LOWER('%term%')"""
+    conn = database._get_connection()
+    try:
+        rows = conn.execute('SELECT id FROM transactions WHERE LOWER(description) LIKE LOWER(?)',
+                            (f'%{term}%',)).fetchall()
+    finally:
+        database._release_connection(conn)
+    return {row[0] for row in rows}
+
+
+def filtered_ids(database, *terms):
+    rows = database.get_transactions_with_connection_info(limit=10_000, description_filter=list(terms))
+    return {row['id'] for row in rows}
+
+
+def assert_index_in_sync(database):
+    """transactions_fts tem exatamente uma linha por transação, com o texto normalizado atual"""
+    conn = database._get_connection()
+    try:
+        indexed = dict(conn.execute('SELECT rowid, description FROM transactions_fts').fetchall())
+        rows = conn.execute('SELECT rowid, description FROM transactions').fetchall()
+    finally:
+        database._release_connection(conn)
+    assert set(indexed) == {row[0] for row in rows}
+    for rowid, description in rows:
+        assert fold_accents(indexed[rowid] or '').lower() == fold_accents(description or '').lower()
+
+
+@pytest.fixture
+def populated(database):
+    transactions = [
+        make_transaction(i, description=description, merchant={'name': 'Lojas Americanas'} if i == 8 else None)
+        for i, description in enumerate(DESCRIPTIONS)
+    ]
+    assert database.save_sync_data_incremental_with_stats('item-1', [make_account(0)], transactions)['success']
+    return database
+
+
+@pytest.mark.parametrize('term', ['esquina', 'mercado', 'pix recebido', 'uber', 'ipiranga', 'ERC', 'ria'])
+def test_ascii_terms_match_like(populated, term):
+    assert filtered_ids(populated, term) == like_ids(populated, term) == reference(populated, term)
+
+
+@pytest.mark.parametrize('term', ['café', 'CAFE', 'Cafe', 'açúcar', 'ACUCAR', 'são joão', 'SAO JOAO',
+                                  'ação', 'Acao', 'pão'])
+def test_accents_and_case_are_ignored(populated, term):
+    ids = filtered_ids(populated, term)
+    assert ids
+    assert ids == reference(populated, term)
+    # O LIKE antigo só encontrava a grafia exata (SQLite não converte caixa de letras acentuadas)
+    assert like_ids(populated, term) <= ids
+
+
+@pytest.mark.parametrize('term', ['ub', 'PI', 'ç', 'x'])
+def test_short_terms_use_like(populated, term):
+    assert len(fold_accents(term)) < populated.FTS_MIN_TERM_LENGTH
+    assert filtered_ids(populated, term) == like_ids(populated, term)
+
+
+def test_several_terms_are_combined_with_or(populated):
+    expected = reference(populated, 'café') | reference(populated, 'posto') | like_ids(populated, 'ub')
+    assert filtered_ids(populated, 'café', 'posto', 'ub') == expected
+
+
+def test_merchant_is_searched(populated):
+    assert filtered_ids(populated, 'americanas') == {'tx-8'}
+
+
+def test_quotes_in_term_do_not_break_the_query(populated):
+    for term in ('"pão quente"', 'pão quente"', '"Pão', '"'):
+        assert filtered_ids(populated, term) == reference(populated, term) == {'tx-14'}
+
+
+def test_search_descriptions(populated):
+    extra = [make_transaction(100 + i, description='Café da Esquina') for i in range(3)]
+    assert populated.save_sync_data_incremental_with_stats('item-1', [], extra)['success']
+
+    suggestions = populated.search_descriptions('CAFE')
+    # Distintas, mais frequentes primeiro
+    assert suggestions[0] == 'Café da Esquina'
+    assert set(suggestions) == {'Café da Esquina', 'CAFE DA ESQUINA', 'cafeteria central'}
+    assert populated.search_descriptions('caf', limit=1) == ['Café da Esquina']
+    # Estabelecimento não entra nas sugestões de descrição
+    assert populated.search_descriptions('americanas') == []
+    assert populated.search_descriptions('ca') == []
+    assert populated.search_descriptions('  ') == []
+
+
+def test_index_follows_update_and_delete(populated):
+    assert populated.update_transaction('tx-0', 10.0, 'Supermercado Extra', 'Outros', '2024-01-01T10:00:00.000Z')
+    assert 'tx-0' not in filtered_ids(populated, 'esquina')
+    assert filtered_ids(populated, 'extra') == {'tx-0'}
+    assert 'Supermercado Extra' in populated.search_descriptions('mercado')
+    assert 'Café da Esquina' not in populated.search_descriptions('esquina')
+
+    success, _ = populated.delete_transaction('tx-9')
+    assert success
+    assert filtered_ids(populated, 'livre') == set()
+    assert 'MERCADO LIVRE' not in populated.search_descriptions('mercado')
+    assert_index_in_sync(populated)
+
+
+def test_index_follows_sync_changes(populated):
+    changed = [make_transaction(1, description='Cafeteria Nova'), make_transaction(200, description='Açougue')]
+    assert populated.save_sync_data_incremental_with_stats('item-1', [], changed)['success']
+
+    assert 'tx-1' not in filtered_ids(populated, 'esquina')
+    assert 'tx-1' in filtered_ids(populated, 'CAFETERIA')
+    assert filtered_ids(populated, 'acougue') == {'tx-200'}
+    assert_index_in_sync(populated)
+
+
+def test_index_after_bulk_sync(database):
+    words = ('Café', 'Pão', 'MERCADO', 'farmácia', 'posto')
+    transactions = [make_transaction(i, description=f'{words[i % 5]} {i}') for i in range(1500)]
+    assert database.save_sync_data_incremental_with_stats('item-1', [make_account(0)], transactions)['success']
+    # Segunda carga grande: parte atualizada, parte nova
+    transactions = [make_transaction(i, description=f'{words[(i + 1) % 5]} {i}') for i in range(750, 3000)]
+    assert database.save_sync_data_incremental_with_stats('item-1', [], transactions)['success']
+
+    assert_index_in_sync(database)
+    for term in ('cafe', 'PAO', 'Farmacia', 'mercado 12'):
+        assert filtered_ids(database, term) == reference(database, term)
@@ -0,0 +1,103 @@
+"""
+Paginação por cursor (keyset) de get_transactions_page: percorrer todas as páginas não pula nem
+repete linhas, mesmo com chaves de ordenação repetidas.
+"""
+import pytest
+
+from conftest import make_account, make_transaction
+
+TOTAL = 90
+PAGE_SIZE = 7
+
+
+@pytest.fixture
+def populated(database):
+    """Transações com poucas chaves distintas por ordenação (muitos empates resolvidos pelo id)"""
+    accounts = [make_account(0), make_account(1, name='conta b')]
+    transactions = [
+        make_transaction(
+            i, account_index=i % 2,
+            description=('Mercado', 'mercado', 'Posto', None)[i % 4],
+            amount=(i % 3) * 10,
+            type='CREDIT' if i % 5 == 0 else 'DEBIT',
+            date=f'2024-03-{1 + i % 3:02d}T10:00:00.000Z',
+        )
+        for i in range(TOTAL)
+    ]
+    assert database.save_sync_data_incremental_with_stats('item-1', accounts, transactions)['success']
+    for i in range(0, TOTAL, 4):
+        database.update_transaction_verification(f'tx-{i}', 1)
+    for i in range(0, TOTAL, 6):
+        database.update_transaction_ignore_status(f'tx-{i}', 1)
+    for i in range(0, TOTAL, 3):
+        database.update_transaction_category(f'tx-{i}', ('Casa', 'casa')[i % 2], None)
+    return database
+
+
+def walk(database, sort, direction, page_size=PAGE_SIZE, **filters):
+    """Percorre todas as páginas seguindo next_cursor; retorna os ids na ordem recebida"""
+    ids, cursor = [], None
+    for _ in range(TOTAL + 1):
+        page = database.get_transactions_page(page_size=page_size, cursor=cursor, sort=sort,
+                                              direction=direction, **filters)
+        assert (page['sort'], page['direction']) == (sort, direction)
+        assert len(page['transactions']) <= page_size
+        ids.extend(t['id'] for t in page['transactions'])
+        assert page['has_more'] == (page['next_cursor'] is not None)
+        if not page['has_more']:
+            return ids
+        cursor = page['next_cursor']
+    pytest.fail('paginação não terminou')
+
+
+@pytest.mark.parametrize('direction', ['asc', 'desc'])
+@pytest.mark.parametrize('sort', ['date', 'description', 'account', 'user_category', 'amount',
+                                  'modification_date', 'verified', 'ignored'])
+def test_walk_covers_every_row_once(populated, sort, direction):
+    ids = walk(populated, sort, direction)
+
+    assert len(ids) == len(set(ids)) == TOTAL
+    # Mesma ordem de uma página única com todas as linhas
+    single = populated.get_transactions_page(page_size=TOTAL, sort=sort, direction=direction)
+    assert not single['has_more']
+    assert ids == [t['id'] for t in single['transactions']]
+
+
+@pytest.mark.parametrize('sort, direction', [('date', 'desc'), ('amount', 'asc'), ('description', 'desc')])
+def test_walk_with_filters(populated, sort, direction):
+    filters = {'account_id': ['acc-1'], 'type_filter': ['DEBIT']}
+    ids = walk(populated, sort, direction, page_size=4, **filters)
+
+    expected = {f'tx-{i}' for i in range(TOTAL) if i % 2 == 1 and i % 5 != 0}
+    assert len(ids) == len(set(ids))
+    assert set(ids) == expected
+
+
+def test_page_size_one_still_breaks_ties(populated):
+    ids = walk(populated, 'verified', 'desc', page_size=1)
+    assert len(ids) == len(set(ids)) == TOTAL
+
+
+def test_cursor_from_another_sort_restarts(populated):
+    first = populated.get_transactions_page(page_size=PAGE_SIZE, sort='amount', direction='asc')
+    cursor = first['next_cursor']
+    assert cursor
+
+    fresh = populated.get_transactions_page(page_size=PAGE_SIZE, sort='date', direction='asc')
+    other_sort = populated.get_transactions_page(page_size=PAGE_SIZE, cursor=cursor, sort='date', direction='asc')
+    other_direction = populated.get_transactions_page(page_size=PAGE_SIZE, cursor=cursor, sort='amount',
+                                                      direction='desc')
+    fresh_desc = populated.get_transactions_page(page_size=PAGE_SIZE, sort='amount', direction='desc')
+
+    assert [t['id'] for t in other_sort['transactions']] == [t['id'] for t in fresh['transactions']]
+    assert [t['id'] for t in other_direction['transactions']] == [t['id'] for t in fresh_desc['transactions']]
+
+
+def test_invalid_cursor_and_sort_fall_back_to_first_page(populated):
+    fresh = populated.get_transactions_page(page_size=PAGE_SIZE)
+    garbage = populated.get_transactions_page(page_size=PAGE_SIZE, cursor='não é um cursor')
+    unknown = populated.get_transactions_page(page_size=PAGE_SIZE, sort='rowid; DROP TABLE transactions')
+
+    assert unknown['sort'] == 'date'
+    assert [t['id'] for t in garbage['transactions']] == [t['id'] for t in fresh['transactions']]
+    assert [t['id'] for t in unknown['transactions']] == [t['id'] for t in fresh['transactions']]